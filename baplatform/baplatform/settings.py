@@ -87,6 +87,23 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# 日历、提交状态、成绩统计、看板等缓存靠删除键 / 更新版本号失效，必须所有 Web 和 worker 进程共用一个缓存。
+# 默认的 LocMemCache 是进程内的，多进程部署时其他进程会一直读到旧数据，因此使用本机共享的文件缓存；
+# 多台服务器部署时改为 memcached（django.core.cache.backends.memcached.MemcachedCache）。
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -203,3 +220,34 @@ SECURE_HSTS_INCLUDE_SUBDOMAINS = True # 严格要求使用https协议传输
 SECURE_HSTS_PRELOAD = True # HSTS为
 SECURE_HSTS_SECONDS = 60
 SECURE_CONTENT_TYPE_NOSNIFF = True # 防止浏览器猜测资产的内容类型
+
+
+# 论坛设置
+FORUM_FEED_FANOUT_LIMIT = 2000 # 选课人数超过该值的课程不做写扩散，读取动态时再合并
+FORUM_ARCHIVE_AFTER_DAYS = 365 # 创建和最后活跃都早于该天数的帖子由 archive_posts 命令归档
+FORUM_EXPERT_CANDIDATES = 2000 # 专家推荐只在最佳答案数、回答数最多的这么多个画像中计算相似度
+FORUM_EXPERT_CACHE_SECONDS = 600 # 悬赏帖的专家推荐结果缓存时间
+
+# 后台任务设置
+JOB_RUN_IN_THREAD = False # 由 run_jobs worker 进程执行；本地开发不想另开 worker 时可设为 True，在 Web 进程的后台线程中执行
+
+# 分片上传设置
+UPLOAD_MAX_SIZE = 2 * 1024 ** 3 # 单个文件上限（字节）
+UPLOAD_CHUNK_MAX_SIZE = 16 * 1024 ** 2 # 单次追加的分片上限（字节）
+UPLOAD_EXPIRE_HOURS = 24 # 超过该时间没有写入的上传由 clean_uploads 命令清理
+UPLOAD_FINALIZE_TIMEOUT = 600 # 校验中（status=2）超过该秒数没有完成的上传视为完成请求已中断，可以重新完成
+
+# 邮件设置
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend' # 正式部署改为 django.core.mail.backends.smtp.EmailBackend
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_mail') # filebased 后端写入的目录
+EMAIL_HOST = 'localhost'
+EMAIL_PORT = 25
+EMAIL_HOST_USER = ''
+EMAIL_HOST_PASSWORD = ''
+EMAIL_USE_SSL = False
+EMAIL_TIMEOUT = 30
+DEFAULT_FROM_EMAIL = 'noreply@data.ruc.edu.cn'
+EMAIL_DIGEST_SITE_URL = 'http://data.ruc.edu.cn' # 邮件中链接的站点地址
+EMAIL_DIGEST_DEADLINE_DAYS = 3 # 摘要包含截止日期在今天起该天数内的任务
+EMAIL_DIGEST_LOOKBACK_DAYS = 1 # 从未收到过摘要的用户，只包含最近该天数内的通知
+EMAIL_DIGEST_BATCH_SIZE = 100 # 每批发送的邮件数，每批之后保存发送进度
@@ -14,10 +14,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.urls import path,include
-from baweb.views import home,admin, user, student, course, teacher, file, assignment, assignmentfile, comment, group, announce,post
+from baweb.views import home,admin, user, student, course, teacher, file, assignment, assignmentfile, comment, group, announce, post, inbox, upload
 from django.conf import settings
 from django.conf.urls.static import static
 from baweb.views import forum 
+from baweb.views import job
 
 urlpatterns = [
     #path('superadmin/', superadmin.site.urls),
@@ -36,8 +37,22 @@ urlpatterns = [
     path('teacher/<int:id>/abled', admin.teacher_abled),
     path('teacher/<int:id>/order/<int:order>/update', admin.update_torder),
     path('course/<int:id>/order/<int:order>/update', admin.update_corder),
+    path('admin/analytics', admin.analytics_overview),
+    ##后台任务进度
+    path('job/<int:id>/progress', job.job_progress),
     ##首页导航的功能
     path('home/', user.user_home),
+    path('dashboard/', user.user_dashboard),
+    path('inbox/list', inbox.inbox_list),
+    path('inbox/unread', inbox.inbox_unread),
+    path('inbox/read', inbox.inbox_read),
+
+    ##分片上传
+    path('upload/create', upload.upload_create),
+    path('upload/<uuid:key>', upload.upload_status),
+    path('upload/<uuid:key>/append', upload.upload_append),
+    path('upload/<uuid:key>/finalize', upload.upload_finalize),
+    path('upload/<uuid:key>/cancel', upload.upload_cancel),
     ####辅助home页面加载
     path('home/load/', home.home_load),
     path('account/', user.user_account),
@@ -47,6 +62,8 @@ urlpatterns = [
     path('help/', user.user_help),
     #####calendar 根据任务ddl添加到日历上
     path('remind/', assignment.remind),
+    path('calendar/events/', assignment.calendar_events),
+    path('calendar/ics/<str:token>/', assignment.calendar_ics),
     ##修改密码
     path('password/change', user.user_change_password),  
     ##个人账号的功能：个人信息的修改+头像的上传
@@ -73,6 +90,7 @@ urlpatterns = [
     path('course/<int:id>/student/import', course.student_import),
     path('course/<int:id>/student/add', course.student_add),
     path('course/<int:id>/student/list', course.student_list), 
+    path('course/<int:id>/roster', course.roster_json),
     path('course/<int:id>/student/<int:sid>/delete', course.student_delete),
     ##课件的增删改
     path('course/<int:id>/file/list', file.file_list),
@@ -106,20 +124,32 @@ urlpatterns = [
     ## 老师打分 
     path('assignment/<int:id>/student/<int:sid>/entermarks',assignmentfile.marks_enter), 
     path('assignment/<int:id>/student/<int:uid>/marks/get', assignmentfile.marks_get),
+    path('assignment/<int:id>/marks/batch', assignmentfile.marks_batch),
+    path('assignment/<int:id>/marks/import', assignmentfile.marks_import),
+    path('assignment/<int:id>/marks/stats', assignmentfile.marks_stats),
     path('assignment/<int:id>/student/<int:uid>/files/get', assignmentfile.files_get),
     ##查看成绩
     #path('course/<int:id>/marks/list',course.marks_list), 
+    path('course/<int:id>/gradebook', course.gradebook_page),
+    path('course/<int:id>/gradebook.json', course.gradebook_json),
+    path('course/<int:id>/stats', course.course_stats),
+    path('course/<int:id>/analytics', course.course_analytics),
+    path('course/<int:id>/export/gradebook.<str:fmt>', course.export_gradebook),
+    path('course/<int:id>/export/roster.<str:fmt>', course.export_roster),
+    path('assignment/<int:id>/export/status.<str:fmt>', assignmentfile.export_status),
     ##小组
     path('course/<int:id>/group/list',group.group_list), 
     path('course/<int:id>/group/add',group.group_add), 
     path('course/<int:id>/group/<int:gid>/delete', group.group_delete),
     path('group/<int:id>/member/list', group.member_list), 
     path('group/<int:id>/member/add', group.member_add),
+    path('group/<int:id>/member/search', group.member_search),
     path('group/<int:id>/member/<int:sid>/delete', group.member_delete),
     ##通知
     path('announce/add', announce.announce_add),
     path('announce/<int:id>/edit', announce.announce_edit),
     path('announce/<int:id>/delete', announce.announce_delete),
+    path('announce/<int:id>/receipts', announce.announce_receipts),
     path('ckeditor/', include('ckeditor_uploader.urls')),
     ##老师课程展示
     path("teacher/<int:id>/course/list", course.teacher_courses),
@@ -129,6 +159,7 @@ urlpatterns = [
     path('forum/course/<int:course_id>/create/', forum.post_create, name='post_create'),
     path('forum/create/', forum.post_create, name='post_create_no_course'),  # 无课程发帖
     path('forum/post/<str:post_id>/', forum.post_detail, name='post_detail'),
+    path('forum/post/<str:post_id>/events/', forum.post_events, name='post_events'),  # 实时更新（短轮询）
     path('forum/post/<str:post_id>/update/', forum.post_update, name='post_update'),
     path('forum/post/<str:post_id>/delete/', forum.post_delete, name='post_delete'),
     path('forum/post/<str:post_id>/like/', forum.post_like, name='post_like'),
@@ -140,5 +171,6 @@ urlpatterns = [
     path('forum/post/<str:post_id>/best-answer/<str:comment_id>/', forum.post_select_best_answer, name='post_select_best_answer'),
     path('forum/my/posts/', forum.my_posts, name='my_posts'),  # 我的帖子
     path('forum/my/collected/', forum.my_collected, name='my_collected'),  # 我的收藏
+    path('forum/my/feed/', forum.my_feed, name='my_feed'),  # 我的动态
     path('forum/points/ranking/', forum.points_ranking, name='points_ranking'),  # 积分排行榜
 ]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
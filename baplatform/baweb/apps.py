@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class BawebConfig(AppConfig):
     name = 'baweb'
+
+    def ready(self):
+        from baweb import signals  # noqa: F401  注册信号
+        from baweb.utils import roster  # noqa: F401  注册后台任务
+        from baweb.utils import analytics  # noqa: F401  注册事件消费者
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from baweb.utils import archive
+
+
+class Command(BaseCommand):
+    help = '把长期不活跃的帖子分批迁移到归档表（可中断，重新运行会继续）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='归档创建和最后活跃都早于该天数的帖子，默认 FORUM_ARCHIVE_AFTER_DAYS')
+        parser.add_argument('--course', type=int, help='归档该课程（如已结课）的全部帖子')
+        parser.add_argument('--batch', type=int, default=archive.BATCH_SIZE, help='每批帖子数')
+
+    def handle(self, *args, **options):
+        cutoff = None
+        if options['course'] is None or options['days'] is not None:
+            cutoff = archive.archive_cutoff(options['days'])
+        count = archive.run(cutoff, options['course'], options['batch'])
+        self.stdout.write(f'已归档 {count} 个帖子')
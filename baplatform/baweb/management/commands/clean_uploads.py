@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from baweb.utils import uploads
+
+
+class Command(BaseCommand):
+    help = '清理长时间没有写入的分片上传及其临时文件（建议定时运行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, help='清理超过该小时数没有写入的上传，默认 UPLOAD_EXPIRE_HOURS')
+
+    def handle(self, *args, **options):
+        result = uploads.collect_garbage(options['hours'])
+        self.stdout.write(f"已删除 {result['uploads']} 条上传记录、{result['files']} 个临时文件")
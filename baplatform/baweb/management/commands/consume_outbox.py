@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from baweb.utils import outbox
+
+
+class Command(BaseCommand):
+    help = '把变更事件投递给已注册的消费者，消费进度保存在 ConsumerCheckpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', action='append', dest='consumers', help='只运行指定消费者，可重复')
+        parser.add_argument('--loop', action='store_true', help='持续运行')
+        parser.add_argument('--interval', type=float, default=2, help='空闲时的轮询间隔（秒）')
+        parser.add_argument('--prune', action='store_true', help='清理所有消费者都已处理过的事件')
+
+    def handle(self, *args, **options):
+        if options['loop']:
+            outbox.run_forever(options['consumers'], options['interval'])
+            return
+        for name, count in outbox.run_consumers(options['consumers']).items():
+            self.stdout.write(f'{name}: {count} 条事件')
+        if options['prune']:
+            self.stdout.write(f'已清理 {outbox.prune()} 条事件')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from baweb.utils import purge
+
+
+class Command(BaseCommand):
+    help = '批量清理已标记删除的课程和帖子（后台线程中断时用于补做）'
+
+    def handle(self, *args, **options):
+        result = purge.purge_pending()
+        self.stdout.write(f"已清理 {result['courses']} 门课程、{result['posts']} 个帖子，共删除 {result['rows']} 行")
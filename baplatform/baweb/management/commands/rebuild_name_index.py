@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from baweb.utils import namesearch
+
+
+class Command(BaseCommand):
+    help = '重建学生和老师的姓名搜索词（拼音 / 首字母）'
+
+    def handle(self, *args, **options):
+        count = namesearch.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'已为 {count} 个用户建立姓名搜索词'))
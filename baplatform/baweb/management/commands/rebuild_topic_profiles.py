@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from baweb.utils import expertise
+
+
+class Command(BaseCommand):
+    help = '根据历史评论和最佳答案重建用户话题画像'
+
+    def handle(self, *args, **options):
+        count = expertise.rebuild_profiles()
+        self.stdout.write(self.style.SUCCESS(f'已重建 {count} 个用户画像'))
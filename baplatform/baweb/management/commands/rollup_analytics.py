@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from baweb.utils import analytics
+
+
+class Command(BaseCommand):
+    help = '把发件箱中新增的提交、帖子、评论累加到看板汇总表（--backfill 清空后从头重算）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true', help='清空汇总表后从原始表从头重算')
+        parser.add_argument('--loop', action='store_true', help='持续运行')
+        parser.add_argument('--interval', type=float, default=60, help='持续运行时的间隔（秒）')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            for source, count in analytics.backfill().items():
+                self.stdout.write(f'{source}: {count} 行')
+        else:
+            self.stdout.write(f'{analytics.run()} 条事件')
+        while options['loop']:
+            time.sleep(options['interval'])
+            analytics.run()
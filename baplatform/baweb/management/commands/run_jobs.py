@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from baweb.utils import jobs
+
+
+class Command(BaseCommand):
+    help = '执行排队中的后台任务（如名单导入），--loop 作为常驻 worker 进程运行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='持续运行')
+        parser.add_argument('--interval', type=float, default=2, help='空闲时的轮询间隔（秒）')
+
+    def handle(self, *args, **options):
+        if options['loop']:
+            jobs.run_forever(options['interval'])
+            return
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f'{requeued} 个超时任务已重新排队')
+        self.stdout.write(f'已执行 {jobs.run_pending()} 个任务')
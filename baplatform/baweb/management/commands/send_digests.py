@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from baweb.utils import digest
+
+
+class Command(BaseCommand):
+    help = '发送邮件摘要：即将截止的任务和新的课程通知（建议每天定时运行一次）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', help='邮件后端，如 django.core.mail.backends.console.EmailBackend，默认 EMAIL_BACKEND')
+        parser.add_argument('--batch', type=int, help='每批邮件数，默认 EMAIL_DIGEST_BATCH_SIZE')
+        parser.add_argument('--dry-run', action='store_true', help='只统计收件人，不发送也不记录进度')
+        parser.add_argument('--force', action='store_true', help='今天已经收到过摘要的用户也发送')
+
+    def handle(self, *args, **options):
+        result = digest.run(options['backend'], options['batch'], options['dry_run'], options['force'])
+        self.stdout.write(f"有内容的收件人 {result['recipients']} 人，已发送 {result['sent']} 封")
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0025_make_post_course_optional'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.SmallIntegerField(choices=[(1, '课程新帖'), (2, '教师发帖'), (3, '收藏的帖子有新回复')], default=1, verbose_name='推送原因')),
+                ('createdAt', models.DateTimeField(verbose_name='推送时间')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='baweb.Post', verbose_name='帖子')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='baweb.User', verbose_name='接收用户')),
+            ],
+            options={
+                'verbose_name_plural': '个人动态',
+                'ordering': ['-createdAt', '-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-createdAt'], name='baweb_feede_user_id_a9d12e_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='feedentry',
+            unique_together={('user', 'post')},
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0026_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTopicProfile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='topic_profile', serialize=False, to='baweb.User', verbose_name='用户')),
+                ('vector', models.BinaryField(help_text='float32 稀疏哈希向量，按回答内容增量累加', verbose_name='话题向量')),
+                ('answerCount', models.IntegerField(default=0, verbose_name='回答数')),
+                ('bestAnswerCount', models.IntegerField(default=0, verbose_name='最佳答案数')),
+                ('updatedAt', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name_plural': '用户话题画像',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0027_usertopicprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.SmallIntegerField(choices=[(1, '新评论'), (2, '新回复'), (3, '计数变化'), (4, '最佳答案'), (5, '评论删除')], verbose_name='事件类型')),
+                ('payload', models.TextField(help_text='JSON', verbose_name='事件内容')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='创建时间')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='live_events', to='baweb.Post', verbose_name='帖子')),
+            ],
+            options={
+                'verbose_name_plural': '帖子实时事件',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postevent',
+            index=models.Index(fields=['post', 'id'], name='baweb_poste_post_id_a2a65d_idx'),
+        ),
+    ]
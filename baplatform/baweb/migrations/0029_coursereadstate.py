@@ -0,0 +1,44 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0028_postevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseReadState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lastSeenAt', models.DateTimeField(verbose_name='上次浏览时间')),
+                ('lastSeenPostId', models.IntegerField(default=0, verbose_name='已读水位帖子ID')),
+                ('readAfter', models.TextField(blank=True, default='', help_text='逗号分隔', verbose_name='水位之后已读的帖子ID')),
+            ],
+            options={
+                'verbose_name_plural': '课程论坛阅读水位',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['course', 'id'], name='baweb_post_course__80d0d9_idx'),
+        ),
+        migrations.AddField(
+            model_name='coursereadstate',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='baweb.Course', verbose_name='课程'),
+        ),
+        migrations.AddField(
+            model_name='coursereadstate',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_read_states', to='baweb.User', verbose_name='用户'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='coursereadstate',
+            unique_together={('user', 'course')},
+        ),
+    ]
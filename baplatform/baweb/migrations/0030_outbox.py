@@ -0,0 +1,44 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0029_coursereadstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumerCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='消费者')),
+                ('position', models.BigIntegerField(default=0, verbose_name='已消费到的事件序号')),
+                ('updatedAt', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name_plural': '消费进度',
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(help_text='模型名小写，如 post、postcomment', max_length=32, verbose_name='主题')),
+                ('action', models.SmallIntegerField(choices=[(1, '创建'), (2, '更新'), (3, '删除')], verbose_name='操作')),
+                ('objectId', models.IntegerField(verbose_name='对象主键')),
+                ('payload', models.TextField(help_text='JSON', verbose_name='事件内容')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name_plural': '变更事件',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['topic', 'id'], name='baweb_outbo_topic_fb1101_idx'),
+        ),
+    ]
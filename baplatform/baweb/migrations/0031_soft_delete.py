@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0030_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='isDeleted',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='已删除'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='isDeleted',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='已删除'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0031_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPost',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('postId', models.CharField(max_length=64, unique=True, verbose_name='帖子ID')),
+                ('title', models.CharField(max_length=256, verbose_name='标题')),
+                ('tags', models.CharField(blank=True, max_length=512, verbose_name='标签')),
+                ('isAnonymous', models.BooleanField(default=False, verbose_name='是否匿名')),
+                ('createdAt', models.DateTimeField(verbose_name='创建时间')),
+                ('updatedAt', models.DateTimeField(verbose_name='最后活跃时间')),
+                ('likeCount', models.IntegerField(default=0, verbose_name='点赞数')),
+                ('collectCount', models.IntegerField(default=0, verbose_name='收藏数')),
+                ('commentCount', models.IntegerField(default=0, verbose_name='评论数')),
+                ('viewCount', models.IntegerField(default=0, verbose_name='浏览数')),
+                ('bountyPoints', models.IntegerField(default=0, verbose_name='悬赏积分')),
+                ('hasBestAnswer', models.BooleanField(default=False, verbose_name='是否有最佳答案')),
+                ('contentData', models.BinaryField(verbose_name='压缩正文')),
+                ('commentsData', models.BinaryField(help_text='zlib 压缩的 JSON 列表', verbose_name='压缩评论')),
+                ('archivedAt', models.DateTimeField(auto_now_add=True, verbose_name='归档时间')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_posts', to='baweb.User', verbose_name='作者')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='baweb.ContentCategory', verbose_name='内容分类')),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_posts', to='baweb.Course', verbose_name='所属课程')),
+            ],
+            options={
+                'verbose_name_plural': '归档帖子',
+                'ordering': ['-createdAt'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedpost',
+            index=models.Index(fields=['course', '-createdAt'], name='baweb_archi_course__969cae_idx'),
+        ),
+    ]
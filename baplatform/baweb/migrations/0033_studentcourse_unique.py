@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:23
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    '''重复导入产生的重复选课记录只保留最早的一条'''
+    StudentCourse = apps.get_model('baweb', 'StudentCourse')
+    duplicates = StudentCourse.objects.values('student_id', 'course_id') \
+        .annotate(n=Count('id'), keep=Min('id')).filter(n__gt=1)
+    for row in duplicates:
+        StudentCourse.objects.filter(student_id=row['student_id'], course_id=row['course_id']) \
+            .exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0032_archivedpost'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='studentcourse',
+            unique_together={('student', 'course')},
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0033_studentcourse_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='如 roster.students', max_length=64, verbose_name='任务类型')),
+                ('status', models.SmallIntegerField(choices=[(1, '排队中'), (2, '执行中'), (3, '已完成'), (4, '失败')], default=1, verbose_name='状态')),
+                ('params', models.TextField(default='{}', help_text='JSON', verbose_name='参数')),
+                ('file', models.FileField(blank=True, upload_to='jobs/', verbose_name='上传文件')),
+                ('processed', models.IntegerField(default=0, verbose_name='已处理行数')),
+                ('total', models.IntegerField(blank=True, null=True, verbose_name='总行数')),
+                ('result', models.TextField(blank=True, default='', help_text='JSON', verbose_name='结果')),
+                ('error', models.TextField(blank=True, default='', verbose_name='错误信息')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, verbose_name='提交时间')),
+                ('startedAt', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finishedAt', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('updatedAt', models.DateTimeField(auto_now=True, help_text='执行中作为心跳', verbose_name='最后更新时间')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='baweb.User', verbose_name='提交者')),
+            ],
+            options={
+                'verbose_name_plural': '后台任务',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'id'], name='baweb_job_status_b875f9_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0034_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('submit', '任务提交'), ('late', '逾期提交'), ('post', '发帖'), ('comment', '评论')], max_length=16, verbose_name='指标')),
+                ('granularity', models.CharField(choices=[('hour', '小时'), ('day', '天')], max_length=8, verbose_name='粒度')),
+                ('bucket', models.DateTimeField(verbose_name='时间段起点')),
+                ('count', models.IntegerField(default=0, verbose_name='次数')),
+                ('course', models.ForeignKey(blank=True, help_text='为空表示不属于任何课程的帖子和评论', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='activity_rollups', to='baweb.Course', verbose_name='课程')),
+            ],
+            options={
+                'verbose_name_plural': '教学活动汇总',
+            },
+        ),
+        migrations.CreateModel(
+            name='ActiveStudentDay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='active_days', to='baweb.Course', verbose_name='课程')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='active_days', to='baweb.User', verbose_name='用户')),
+            ],
+            options={
+                'verbose_name_plural': '活跃用户（按天）',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='activityrollup',
+            index=models.Index(fields=['granularity', 'metric', 'bucket'], name='baweb_activ_granula_18cc5c_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='activityrollup',
+            unique_together={('course', 'metric', 'granularity', 'bucket')},
+        ),
+        migrations.AddIndex(
+            model_name='activestudentday',
+            index=models.Index(fields=['day'], name='baweb_activ_day_729c64_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='activestudentday',
+            unique_together={('course', 'day', 'user')},
+        ),
+    ]
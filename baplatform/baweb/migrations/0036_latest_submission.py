@@ -0,0 +1,42 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:32
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+import django.db.models.deletion
+
+
+def fill_latest(apps, schema_editor):
+    '''为已有提交建立最新提交指针'''
+    AssignmentSubmit = apps.get_model('baweb', 'AssignmentSubmit')
+    LatestSubmission = apps.get_model('baweb', 'LatestSubmission')
+    rows = AssignmentSubmit.objects.values('assignment_id', 'student_id') \
+        .annotate(last=Max('id'), n=Count('id')).order_by()
+    LatestSubmission.objects.bulk_create([
+        LatestSubmission(assignment_id=row['assignment_id'], student_id=row['student_id'],
+                         submission_id=row['last'], count=row['n'])
+        for row in rows.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0035_activity_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestSubmission',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=1, verbose_name='提交次数')),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latest_submissions', to='baweb.Assignment', verbose_name='任务')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latest_submissions', to='baweb.StudentInfo', verbose_name='学生')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='baweb.AssignmentSubmit', verbose_name='最新提交')),
+            ],
+            options={
+                'unique_together': {('assignment', 'student')},
+            },
+        ),
+        migrations.RunPython(fill_latest, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:37
+
+import itertools
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+from pypinyin import Style, pinyin
+
+
+# 迁移中固定一份搜索词规则（与当时的 baweb/utils/namesearch.py 相同），之后修改应用代码不影响本迁移
+MAX_READINGS = 8
+MAX_TERM_LENGTH = 128
+_SEPARATORS_RE = re.compile(r"[\s'·.\-_]+")
+
+
+def _normalize(text):
+    return _SEPARATORS_RE.sub('', (text or '').lower())
+
+
+def _terms(name):
+    '''原名、全拼、首字母'''
+    name = (name or '').strip()
+    result = {_normalize(name)}
+    if name:
+        readings = pinyin(name, style=Style.NORMAL, heteronym=True, errors='default')
+        for combination in itertools.islice(itertools.product(*readings), MAX_READINGS):
+            words = [w.lower() for part in combination for w in _SEPARATORS_RE.split(part) if w]
+            result.add(''.join(words))
+            result.add(''.join(w[0] for w in words))
+    return {term[:MAX_TERM_LENGTH] for term in result if term}
+
+
+def fill_terms(apps, schema_editor):
+    '''为已有学生和老师建立姓名搜索词'''
+    NameSearchIndex = apps.get_model('baweb', 'NameSearchIndex')
+    rows = []
+    for user_type, model in ((1, 'StudentInfo'), (2, 'TeacherInfo')):
+        for user_id, name in apps.get_model('baweb', model).objects.values_list('user_id', 'name').iterator():
+            rows.extend(NameSearchIndex(user_id=user_id, type=user_type, term=term) for term in _terms(name))
+    NameSearchIndex.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0037_studentinfo_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NameSearchIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.SmallIntegerField(choices=[(1, '学生'), (2, '老师'), (3, '管理员')], verbose_name='用户类型')),
+                ('term', models.CharField(max_length=128, verbose_name='搜索词')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_terms', to='baweb.User', verbose_name='用户')),
+            ],
+            options={
+                'verbose_name_plural': '姓名搜索词',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='namesearchindex',
+            index=models.Index(fields=['type', 'term'], name='baweb_names_type_4db1d4_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='namesearchindex',
+            unique_together={('user', 'term')},
+        ),
+        migrations.RunPython(fill_terms, migrations.RunPython.noop),
+    ]
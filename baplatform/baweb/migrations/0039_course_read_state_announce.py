@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0038_name_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursereadstate',
+            name='lastSeenAnnounceId',
+            field=models.IntegerField(default=0, verbose_name='已读水位通知ID'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0039_course_read_state_announce'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.SmallIntegerField(choices=[(1, '课程通知'), (2, '帖子有新评论'), (3, '评论有新回复'), (4, '回答被选为最佳答案'), (5, '成绩已发布')], verbose_name='消息类型')),
+                ('title', models.CharField(max_length=256, verbose_name='标题')),
+                ('url', models.CharField(blank=True, max_length=256, verbose_name='链接')),
+                ('isRead', models.BooleanField(default=False, verbose_name='已读')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('actor', models.ForeignKey(blank=True, help_text='匿名评论和系统消息为空', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='baweb.User', verbose_name='触发用户')),
+                ('announce', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='baweb.Announce', verbose_name='通知')),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='baweb.Course', verbose_name='课程')),
+                ('post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='baweb.Post', verbose_name='帖子')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='baweb.User', verbose_name='接收用户')),
+            ],
+            options={
+                'verbose_name_plural': '个人消息',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-id'], name='baweb_notif_user_id_638b7c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'isRead'], name='baweb_notif_user_id_a1c19d_idx'),
+        ),
+    ]
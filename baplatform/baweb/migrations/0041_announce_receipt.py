@@ -0,0 +1,55 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_slots(apps, schema_editor):
+    '''为已有选课记录按选课先后分配名单序号'''
+    Course = apps.get_model('baweb', 'Course')
+    StudentCourse = apps.get_model('baweb', 'StudentCourse')
+    counts = {}
+    rows = []
+    for row in StudentCourse.objects.order_by('id').iterator():
+        row.slot = counts.get(row.course_id, 0)
+        counts[row.course_id] = row.slot + 1
+        rows.append(row)
+    StudentCourse.objects.bulk_update(rows, ['slot'], batch_size=500)
+    for course_id, count in counts.items():
+        Course.objects.filter(id=course_id).update(rosterSlots=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0040_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnounceReceipt',
+            fields=[
+                ('announce', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='receipt', serialize=False, to='baweb.Announce', verbose_name='通知')),
+                ('bits', models.BinaryField(default=b'', verbose_name='已读位图')),
+                ('updatedAt', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name_plural': '通知已读位图',
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rosterSlots',
+            field=models.PositiveIntegerField(default=0, verbose_name='已分配的名单序号数'),
+        ),
+        migrations.AddField(
+            model_name='studentcourse',
+            name='slot',
+            field=models.PositiveIntegerField(blank=True, help_text='课程内从 0 递增分配，退课后不复用，用于通知已读位图', null=True, verbose_name='名单序号'),
+        ),
+        migrations.RunPython(fill_slots, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='studentcourse',
+            unique_together={('student', 'course'), ('course', 'slot')},
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0041_announce_receipt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='digest_state', serialize=False, to='baweb.User', verbose_name='用户')),
+                ('lastAnnounceId', models.IntegerField(default=0, verbose_name='已发送到的通知ID')),
+                ('sentAt', models.DateTimeField(verbose_name='上次发送时间')),
+            ],
+            options={
+                'verbose_name_plural': '邮件摘要进度',
+            },
+        ),
+    ]
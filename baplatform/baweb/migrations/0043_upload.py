@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0042_digeststate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Upload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.SmallIntegerField(choices=[(1, '课件'), (2, '任务文档'), (3, '任务提交')], verbose_name='上传目标')),
+                ('fileName', models.CharField(max_length=64, verbose_name='文件名')),
+                ('title', models.CharField(blank=True, help_text='写入目标记录的 file_name，为空时用文件名', max_length=64, verbose_name='显示名')),
+                ('size', models.BigIntegerField(verbose_name='文件大小')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='已接收字节数')),
+                ('checksum', models.CharField(blank=True, help_text='算法:十六进制摘要，如 sha256:…', max_length=160, verbose_name='校验和')),
+                ('status', models.SmallIntegerField(choices=[(1, '上传中'), (2, '校验中'), (3, '已完成')], default=1, verbose_name='状态')),
+                ('objectId', models.IntegerField(blank=True, null=True, verbose_name='生成的记录ID')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updatedAt', models.DateTimeField(auto_now=True, verbose_name='最后写入时间')),
+                ('assignment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='baweb.Assignment', verbose_name='任务')),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='baweb.Course', verbose_name='课程')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='baweb.User', verbose_name='上传者')),
+            ],
+            options={
+                'verbose_name_plural': '分片上传',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='upload',
+            index=models.Index(fields=['updatedAt'], name='baweb_uploa_updated_42e54d_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def move_checkpoints(apps, schema_editor):
+    '''看板汇总改为发件箱消费者：已有的按表高水位换成从当前最后一个事件开始消费'''
+    ConsumerCheckpoint = apps.get_model('baweb', 'ConsumerCheckpoint')
+    OutboxEvent = apps.get_model('baweb', 'OutboxEvent')
+    old = ConsumerCheckpoint.objects.filter(name__startswith='rollup:')
+    if not old.exists():
+        return
+    position = OutboxEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    ConsumerCheckpoint.objects.update_or_create(name='analytics_rollup', defaults={'position': position})
+    old.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0043_upload'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_checkpoints, migrations.RunPython.noop),
+    ]
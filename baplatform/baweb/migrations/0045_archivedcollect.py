@@ -0,0 +1,27 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0044_rollup_consumer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCollect',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('createdAt', models.DateTimeField(verbose_name='收藏时间')),
+                ('archived', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collects', to='baweb.ArchivedPost', verbose_name='归档帖子')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_collects', to='baweb.User', verbose_name='收藏用户')),
+            ],
+            options={
+                'verbose_name_plural': '归档帖子收藏',
+                'unique_together': {('archived', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+import re
+
+from django.db import migrations, models
+from django.db.models import F, Q
+
+
+def fill_graded(apps, schema_editor):
+    '''已有提交：只有分数的记录、分数不为 0 的提交、发过成绩通知的学生的提交视为已打分'''
+    AssignmentSubmit = apps.get_model('baweb', 'AssignmentSubmit')
+    Notification = apps.get_model('baweb', 'Notification')
+    AssignmentSubmit.objects.filter(Q(file='') | ~Q(marks=0)).update(gradedAt=F('submit_time'))
+    for user_id, url, created_at in Notification.objects.filter(kind=5).values_list('user_id', 'url', 'createdAt'):
+        match = re.match(r'^/assignment/(\d+)/page$', url)
+        if match:
+            AssignmentSubmit.objects.filter(assignment_id=int(match.group(1)), student_id=user_id,
+                                            submit_time__lte=created_at, gradedAt__isnull=True) \
+                .update(gradedAt=created_at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0045_archivedcollect'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignmentsubmit',
+            name='gradedAt',
+            field=models.DateTimeField(blank=True, help_text='为空表示还没有打分', null=True, verbose_name='打分时间'),
+        ),
+        migrations.RunPython(fill_graded, migrations.RunPython.noop),
+    ]
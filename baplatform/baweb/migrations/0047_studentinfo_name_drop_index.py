@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baweb', '0046_assignmentsubmit_gradedat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentinfo',
+            name='name',
+            field=models.CharField(default='未知', max_length=64, verbose_name='名字'),
+        ),
+    ]
@@ -1,6 +1,24 @@
-from django.db import models
+import json
+import uuid
+import zlib
+
+from django.db import models, transaction
 from ckeditor.fields import RichTextField
 
+
+class OutboxMixin(object):
+    '''保存时开启事务，使 post_save 信号写入的 OutboxEvent 与数据变更同时提交（见 baweb/signals.py）'''
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class VisibleManager(models.Manager):
+    '''默认管理器：过滤已标记删除、等待后台清理的记录（见 baweb/utils/purge.py）'''
+    def get_queryset(self):
+        return super().get_queryset().filter(isDeleted=False)
+
+
 # Create your models here.
 class User(models.Model):
     '''用户表'''
@@ -63,6 +81,12 @@ class Course(models.Model):
     description = models.TextField(verbose_name='课程简介', max_length=1000, blank=True)
     description_richtext = RichTextField(verbose_name='课程简介', blank=True)
     order = models.IntegerField(verbose_name="课程顺序", default=0, blank=True)
+    isDeleted = models.BooleanField(verbose_name='已删除', default=False, db_index=True)
+    rosterSlots = models.PositiveIntegerField(verbose_name='已分配的名单序号数', default=0)
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
+
     def __str__(self):
         return self.name
 
@@ -123,8 +147,13 @@ class StudentCourse(models.Model):
     '''学生课程表'''
     student = models.ForeignKey(StudentInfo, verbose_name='选课学生', on_delete=models.CASCADE, related_name='course_student')
     course = models.ForeignKey(Course, verbose_name='被选课程', on_delete=models.CASCADE, related_name='student_course')
-    
-class AssignmentSubmit(models.Model):
+    slot = models.PositiveIntegerField(verbose_name='名单序号', null=True, blank=True,
+                                       help_text='课程内从 0 递增分配，退课后不复用，用于通知已读位图')
+
+    class Meta:
+        unique_together = (('student', 'course'), ('course', 'slot'))
+
+class AssignmentSubmit(OutboxMixin, models.Model):
     '''学生提交任务'''
     student = models.ForeignKey(StudentInfo, verbose_name='学生', on_delete=models.CASCADE, related_name='assignmentsubmit_student')
     assignment = models.ForeignKey(Assignment, verbose_name='所提交的任务', on_delete=models.CASCADE, related_name='submit_assignment')
@@ -132,11 +161,22 @@ class AssignmentSubmit(models.Model):
     file_name = models.CharField(verbose_name='文档名', max_length=64 ,default=file.name, blank=True)
     marks = models.SmallIntegerField(verbose_name='获得分数', default=0)
     max_marks = models.SmallIntegerField(verbose_name='最大分数', default=100)
+    gradedAt = models.DateTimeField(verbose_name='打分时间', null=True, blank=True, help_text='为空表示还没有打分')
     submit_time = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.file_name
 
+class LatestSubmission(models.Model):
+    '''每个学生在每个任务的最新一次提交（按上传顺序），由 baweb/utils/latest.py 维护'''
+    assignment = models.ForeignKey(Assignment, verbose_name='任务', on_delete=models.CASCADE, related_name='latest_submissions')
+    student = models.ForeignKey(StudentInfo, verbose_name='学生', on_delete=models.CASCADE, related_name='latest_submissions')
+    submission = models.ForeignKey(AssignmentSubmit, verbose_name='最新提交', on_delete=models.CASCADE, related_name='+')
+    count = models.IntegerField(verbose_name='提交次数', default=1)
+
+    class Meta:
+        unique_together = ('assignment', 'student')
+
 class Group(models.Model):
     '''小组表'''
     course = models.ForeignKey(Course, verbose_name='所属课程', on_delete=models.CASCADE, related_name='group_course')
@@ -155,7 +195,7 @@ class GroupMember(models.Model):
         return self.student.name
     submit_time = models.DateTimeField(auto_now=True)
 
-class Announce(models.Model):
+class Announce(OutboxMixin, models.Model):
     '''老师通知'''
     announcement = models.TextField(verbose_name="通知")
     teacher = models.ForeignKey(TeacherInfo, verbose_name="所属老师", on_delete=models.CASCADE, related_name='announce_teacher')
@@ -189,7 +229,7 @@ class ContentCategory(models.Model):
         return self.get_name_display()
 
 
-class Post(models.Model):
+class Post(OutboxMixin, models.Model):
     '''帖子/讨论表'''
     # 基本属性
     postId = models.CharField(verbose_name='帖子ID', max_length=64, unique=True, db_index=True)
@@ -228,10 +268,17 @@ class Post(models.Model):
                                    null=True, blank=True, related_name='best_answer_posts',
                                    help_text='被选为最佳答案的评论')
 
+    # 软删除：删除时只打标记，子数据由后台批量清理
+    isDeleted = models.BooleanField(verbose_name='已删除', default=False, db_index=True)
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ['-heatScore', '-createdAt']
         indexes = [
             models.Index(fields=['course', '-heatScore']),
+            models.Index(fields=['course', 'id']),
             models.Index(fields=['-createdAt']),
             models.Index(fields=['author']),
         ]
@@ -386,7 +433,7 @@ class Post(models.Model):
         return True
 
 
-class PostLike(models.Model):
+class PostLike(OutboxMixin, models.Model):
     '''帖子点赞记录表'''
     post = models.ForeignKey(Post, verbose_name='帖子', on_delete=models.CASCADE, related_name='likes')
     user = models.ForeignKey(User, verbose_name='点赞用户', on_delete=models.CASCADE)
@@ -400,7 +447,7 @@ class PostLike(models.Model):
         return f"{self.user.username} liked {self.post.title}"
 
 
-class PostCollect(models.Model):
+class PostCollect(OutboxMixin, models.Model):
     '''帖子收藏记录表'''
     post = models.ForeignKey(Post, verbose_name='帖子', on_delete=models.CASCADE, related_name='collects')
     user = models.ForeignKey(User, verbose_name='收藏用户', on_delete=models.CASCADE, related_name='collected_posts')
@@ -414,7 +461,7 @@ class PostCollect(models.Model):
         return f"{self.user.username} collected {self.post.title}"
 
 
-class PostComment(models.Model):
+class PostComment(OutboxMixin, models.Model):
     '''帖子评论表'''
     commentId = models.CharField(verbose_name='评论ID', max_length=64, unique=True, db_index=True)
     post = models.ForeignKey(Post, verbose_name='所属帖子', on_delete=models.CASCADE, related_name='post_comments')
@@ -473,3 +520,373 @@ class PostComment(models.Model):
         )
         return reply
 
+
+
+class FeedEntry(models.Model):
+    '''个人动态流表（写扩散）'''
+    reason_choices = (
+        (1, "课程新帖"),
+        (2, "教师发帖"),
+        (3, "收藏的帖子有新回复"),
+    )
+    user = models.ForeignKey(User, verbose_name='接收用户', on_delete=models.CASCADE, related_name='feed_entries')
+    post = models.ForeignKey(Post, verbose_name='帖子', on_delete=models.CASCADE, related_name='feed_entries')
+    reason = models.SmallIntegerField(verbose_name='推送原因', choices=reason_choices, default=1)
+    createdAt = models.DateTimeField(verbose_name='推送时间')
+
+    class Meta:
+        ordering = ['-createdAt', '-id']
+        unique_together = ('user', 'post')  # 同一帖子在动态流中只出现一次
+        indexes = [
+            models.Index(fields=['user', '-createdAt']),
+        ]
+        verbose_name_plural = '个人动态'
+
+    def __str__(self):
+        return f"{self.user.username} <- {self.post.title}"
+
+
+class UserTopicProfile(models.Model):
+    '''用户话题画像（用于悬赏问题的专家推荐）'''
+    user = models.OneToOneField(User, verbose_name='用户', on_delete=models.CASCADE, primary_key=True, related_name='topic_profile')
+    vector = models.BinaryField(verbose_name='话题向量', help_text='float32 稀疏哈希向量，按回答内容增量累加')
+    answerCount = models.IntegerField(verbose_name='回答数', default=0)
+    bestAnswerCount = models.IntegerField(verbose_name='最佳答案数', default=0)
+    updatedAt = models.DateTimeField(verbose_name='更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name_plural = '用户话题画像'
+
+    def __str__(self):
+        return f"profile of {self.user.username}"
+
+
+class PostEvent(models.Model):
+    '''帖子实时事件表（供详情页实时推送，短期保留）'''
+    kind_choices = (
+        (1, "新评论"),
+        (2, "新回复"),
+        (3, "计数变化"),
+        (4, "最佳答案"),
+        (5, "评论删除"),
+    )
+    post = models.ForeignKey(Post, verbose_name='帖子', on_delete=models.CASCADE, related_name='live_events')
+    kind = models.SmallIntegerField(verbose_name='事件类型', choices=kind_choices)
+    payload = models.TextField(verbose_name='事件内容', help_text='JSON')
+    createdAt = models.DateTimeField(verbose_name='创建时间', auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'id']),
+        ]
+        verbose_name_plural = '帖子实时事件'
+
+
+class CourseReadState(models.Model):
+    '''课程论坛阅读水位（每个用户每门课程一行）
+
+    lastSeenPostId 之前的帖子都视为已读；之后单独读过的帖子记在 readAfter 中。
+    lastSeenAnnounceId 之前的课程通知视为已读（浏览通知页时推进）。
+    '''
+    user = models.ForeignKey(User, verbose_name='用户', on_delete=models.CASCADE, related_name='course_read_states')
+    course = models.ForeignKey(Course, verbose_name='课程', on_delete=models.CASCADE, related_name='read_states')
+    lastSeenAt = models.DateTimeField(verbose_name='上次浏览时间')
+    lastSeenPostId = models.IntegerField(verbose_name='已读水位帖子ID', default=0)
+    readAfter = models.TextField(verbose_name='水位之后已读的帖子ID', blank=True, default='', help_text='逗号分隔')
+    lastSeenAnnounceId = models.IntegerField(verbose_name='已读水位通知ID', default=0)
+
+    class Meta:
+        unique_together = ('user', 'course')
+        verbose_name_plural = '课程论坛阅读水位'
+
+    def read_after_ids(self):
+        return {int(pid) for pid in self.readAfter.split(',') if pid}
+
+
+class OutboxEvent(models.Model):
+    '''变更事件发件箱（与业务数据在同一事务中写入，id 即事件序号）'''
+    action_choices = (
+        (1, "创建"),
+        (2, "更新"),
+        (3, "删除"),
+    )
+    topic = models.CharField(verbose_name='主题', max_length=32, help_text='模型名小写，如 post、postcomment')
+    action = models.SmallIntegerField(verbose_name='操作', choices=action_choices)
+    objectId = models.IntegerField(verbose_name='对象主键')
+    payload = models.TextField(verbose_name='事件内容', help_text='JSON')
+    createdAt = models.DateTimeField(verbose_name='创建时间', auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['topic', 'id']),
+        ]
+        verbose_name_plural = '变更事件'
+
+    def __str__(self):
+        return f"#{self.id} {self.topic} {self.get_action_display()} {self.objectId}"
+
+
+class ConsumerCheckpoint(models.Model):
+    '''事件消费者的消费进度'''
+    name = models.CharField(verbose_name='消费者', max_length=64, unique=True)
+    position = models.BigIntegerField(verbose_name='已消费到的事件序号', default=0)
+    updatedAt = models.DateTimeField(verbose_name='更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name_plural = '消费进度'
+
+    def __str__(self):
+        return f"{self.name}@{self.position}"
+
+
+class ArchivedPost(models.Model):
+    '''归档帖子表（冷数据）
+
+    超过 FORUM_ARCHIVE_AFTER_DAYS 未活跃的帖子从 Post / PostComment 迁移到这里，
+    正文和全部评论以 zlib 压缩后存储，标题和标签保留明文供搜索（见 baweb/utils/archive.py）。
+    '''
+    postId = models.CharField(verbose_name='帖子ID', max_length=64, unique=True)
+    author = models.ForeignKey(User, verbose_name='作者', on_delete=models.CASCADE, related_name='archived_posts')
+    course = models.ForeignKey(Course, verbose_name='所属课程', on_delete=models.CASCADE, related_name='archived_posts', null=True, blank=True)
+    category = models.ForeignKey(ContentCategory, verbose_name='内容分类', on_delete=models.SET_NULL, null=True, blank=True)
+    title = models.CharField(verbose_name='标题', max_length=256)
+    tags = models.CharField(verbose_name='标签', max_length=512, blank=True)
+    isAnonymous = models.BooleanField(verbose_name='是否匿名', default=False)
+    createdAt = models.DateTimeField(verbose_name='创建时间')
+    updatedAt = models.DateTimeField(verbose_name='最后活跃时间')
+    likeCount = models.IntegerField(verbose_name='点赞数', default=0)
+    collectCount = models.IntegerField(verbose_name='收藏数', default=0)
+    commentCount = models.IntegerField(verbose_name='评论数', default=0)
+    viewCount = models.IntegerField(verbose_name='浏览数', default=0)
+    bountyPoints = models.IntegerField(verbose_name='悬赏积分', default=0)
+    hasBestAnswer = models.BooleanField(verbose_name='是否有最佳答案', default=False)
+    contentData = models.BinaryField(verbose_name='压缩正文')
+    commentsData = models.BinaryField(verbose_name='压缩评论', help_text='zlib 压缩的 JSON 列表')
+    archivedAt = models.DateTimeField(verbose_name='归档时间', auto_now_add=True)
+
+    class Meta:
+        ordering = ['-createdAt']
+        indexes = [
+            models.Index(fields=['course', '-createdAt']),
+        ]
+        verbose_name_plural = '归档帖子'
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def content(self):
+        return zlib.decompress(bytes(self.contentData)).decode('utf-8')
+
+    def comment_rows(self):
+        '''解压评论，返回 dict 列表（字段见 archive.serialize_comment）'''
+        return json.loads(zlib.decompress(bytes(self.commentsData)).decode('utf-8'))
+
+
+class ArchivedCollect(models.Model):
+    '''归档帖子的收藏记录（归档时从 PostCollect 复制，收藏列表中继续显示）'''
+    archived = models.ForeignKey(ArchivedPost, verbose_name='归档帖子', on_delete=models.CASCADE, related_name='collects')
+    user = models.ForeignKey(User, verbose_name='收藏用户', on_delete=models.CASCADE, related_name='archived_collects')
+    createdAt = models.DateTimeField(verbose_name='收藏时间')
+
+    class Meta:
+        unique_together = ('archived', 'user')
+        verbose_name_plural = '归档帖子收藏'
+
+    def __str__(self):
+        return f"{self.user.username} collected {self.archived.title}"
+
+
+class Job(models.Model):
+    '''后台任务（见 baweb/utils/jobs.py）
+
+    提交后立即返回任务ID，由 run_jobs 命令所在的 worker 进程领取执行，
+    执行过程中定期写回进度，前端轮询 /job/<id>/progress 查看。
+    '''
+    status_choices = (
+        (1, "排队中"),
+        (2, "执行中"),
+        (3, "已完成"),
+        (4, "失败"),
+    )
+    kind = models.CharField(verbose_name='任务类型', max_length=64, help_text='如 roster.students')
+    owner = models.ForeignKey(User, verbose_name='提交者', on_delete=models.CASCADE, related_name='jobs')
+    status = models.SmallIntegerField(verbose_name='状态', choices=status_choices, default=1)
+    params = models.TextField(verbose_name='参数', default='{}', help_text='JSON')
+    file = models.FileField(verbose_name='上传文件', upload_to='jobs/', blank=True)
+    processed = models.IntegerField(verbose_name='已处理行数', default=0)
+    total = models.IntegerField(verbose_name='总行数', null=True, blank=True)
+    result = models.TextField(verbose_name='结果', blank=True, default='', help_text='JSON')
+    error = models.TextField(verbose_name='错误信息', blank=True, default='')
+    createdAt = models.DateTimeField(verbose_name='提交时间', auto_now_add=True)
+    startedAt = models.DateTimeField(verbose_name='开始时间', null=True, blank=True)
+    finishedAt = models.DateTimeField(verbose_name='结束时间', null=True, blank=True)
+    updatedAt = models.DateTimeField(verbose_name='最后更新时间', auto_now=True, help_text='执行中作为心跳')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+        verbose_name_plural = '后台任务'
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} {self.get_status_display()}"
+
+    def get_params(self):
+        return json.loads(self.params or '{}')
+
+    def get_result(self):
+        return json.loads(self.result) if self.result else None
+
+
+class ActivityRollup(models.Model):
+    '''教学活动汇总（按小时 / 按天计数，见 baweb/utils/analytics.py）
+
+    由 rollup_analytics 命令从提交、帖子、评论表的新增行增量累加，看板只读这张表。
+    '''
+    metric_choices = (
+        ('submit', "任务提交"),
+        ('late', "逾期提交"),
+        ('post', "发帖"),
+        ('comment', "评论"),
+    )
+    granularity_choices = (
+        ('hour', "小时"),
+        ('day', "天"),
+    )
+    course = models.ForeignKey(Course, verbose_name='课程', on_delete=models.CASCADE, related_name='activity_rollups', null=True, blank=True, help_text='为空表示不属于任何课程的帖子和评论')
+    metric = models.CharField(verbose_name='指标', max_length=16, choices=metric_choices)
+    granularity = models.CharField(verbose_name='粒度', max_length=8, choices=granularity_choices)
+    bucket = models.DateTimeField(verbose_name='时间段起点')
+    count = models.IntegerField(verbose_name='次数', default=0)
+
+    class Meta:
+        unique_together = ('course', 'metric', 'granularity', 'bucket')
+        indexes = [
+            models.Index(fields=['granularity', 'metric', 'bucket']),
+        ]
+        verbose_name_plural = '教学活动汇总'
+
+
+class ActiveStudentDay(models.Model):
+    '''每门课程每天有活动（提交、发帖、评论）的用户，一人一天一行'''
+    course = models.ForeignKey(Course, verbose_name='课程', on_delete=models.CASCADE, related_name='active_days')
+    day = models.DateField(verbose_name='日期')
+    user = models.ForeignKey(User, verbose_name='用户', on_delete=models.CASCADE, related_name='active_days')
+
+    class Meta:
+        unique_together = ('course', 'day', 'user')
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+        verbose_name_plural = '活跃用户（按天）'
+
+
+class NameSearchIndex(models.Model):
+    '''姓名搜索词（原名、全拼、拼音首字母，见 baweb/utils/namesearch.py）
+
+    学生 / 老师信息保存时重建该用户的搜索词，按 (用户类型, 搜索词) 索引做前缀范围查询。
+    '''
+    user = models.ForeignKey(User, verbose_name='用户', on_delete=models.CASCADE, related_name='name_terms')
+    type = models.SmallIntegerField(verbose_name='用户类型', choices=User.type_choices)
+    term = models.CharField(verbose_name='搜索词', max_length=128)
+
+    class Meta:
+        unique_together = ('user', 'term')
+        indexes = [
+            models.Index(fields=['type', 'term']),
+        ]
+        verbose_name_plural = '姓名搜索词'
+
+
+class Notification(models.Model):
+    '''个人消息（写扩散，见 baweb/utils/inbox.py）'''
+    kind_choices = (
+        (1, "课程通知"),
+        (2, "帖子有新评论"),
+        (3, "评论有新回复"),
+        (4, "回答被选为最佳答案"),
+        (5, "成绩已发布"),
+    )
+    user = models.ForeignKey(User, verbose_name='接收用户', on_delete=models.CASCADE, related_name='notifications')
+    kind = models.SmallIntegerField(verbose_name='消息类型', choices=kind_choices)
+    actor = models.ForeignKey(User, verbose_name='触发用户', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', help_text='匿名评论和系统消息为空')
+    course = models.ForeignKey(Course, verbose_name='课程', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    announce = models.ForeignKey(Announce, verbose_name='通知', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    post = models.ForeignKey(Post, verbose_name='帖子', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    title = models.CharField(verbose_name='标题', max_length=256)
+    url = models.CharField(verbose_name='链接', max_length=256, blank=True)
+    isRead = models.BooleanField(verbose_name='已读', default=False)
+    createdAt = models.DateTimeField(verbose_name='创建时间', auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id']),
+            models.Index(fields=['user', 'isRead']),
+        ]
+        verbose_name_plural = '个人消息'
+
+    def __str__(self):
+        return f"{self.user.username} <- {self.title}"
+
+
+class AnnounceReceipt(models.Model):
+    '''课程通知已读位图（见 baweb/utils/receipts.py）
+
+    第 i 位表示名单序号为 i 的学生（StudentCourse.slot）已读该通知。
+    '''
+    announce = models.OneToOneField(Announce, verbose_name='通知', on_delete=models.CASCADE, primary_key=True, related_name='receipt')
+    bits = models.BinaryField(verbose_name='已读位图', default=b'')
+    updatedAt = models.DateTimeField(verbose_name='更新时间', auto_now=True)
+
+    class Meta:
+        verbose_name_plural = '通知已读位图'
+
+
+class DigestState(models.Model):
+    '''邮件摘要进度（见 baweb/utils/digest.py）'''
+    user = models.OneToOneField(User, verbose_name='用户', on_delete=models.CASCADE, primary_key=True, related_name='digest_state')
+    lastAnnounceId = models.IntegerField(verbose_name='已发送到的通知ID', default=0)
+    sentAt = models.DateTimeField(verbose_name='上次发送时间')
+
+    class Meta:
+        verbose_name_plural = '邮件摘要进度'
+
+
+class Upload(models.Model):
+    '''分片上传（见 baweb/utils/uploads.py）
+
+    分片按偏移量直接写入 MEDIA_ROOT 下的临时文件，offset 为已确认接收的字节数；
+    完成并校验后文件移动到目标记录的存储位置，objectId 为生成的记录ID。
+    '''
+    target_choices = (
+        (1, "课件"),
+        (2, "任务文档"),
+        (3, "任务提交"),
+    )
+    status_choices = (
+        (1, "上传中"),
+        (2, "校验中"),
+        (3, "已完成"),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, verbose_name='上传者', on_delete=models.CASCADE, related_name='uploads')
+    target = models.SmallIntegerField(verbose_name='上传目标', choices=target_choices)
+    course = models.ForeignKey(Course, verbose_name='课程', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    assignment = models.ForeignKey(Assignment, verbose_name='任务', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    fileName = models.CharField(verbose_name='文件名', max_length=64)
+    title = models.CharField(verbose_name='显示名', max_length=64, blank=True, help_text='写入目标记录的 file_name，为空时用文件名')
+    size = models.BigIntegerField(verbose_name='文件大小')
+    offset = models.BigIntegerField(verbose_name='已接收字节数', default=0)
+    checksum = models.CharField(verbose_name='校验和', max_length=160, blank=True, help_text='算法:十六进制摘要，如 sha256:…')
+    status = models.SmallIntegerField(verbose_name='状态', choices=status_choices, default=1)
+    objectId = models.IntegerField(verbose_name='生成的记录ID', null=True, blank=True)
+    createdAt = models.DateTimeField(verbose_name='创建时间', auto_now_add=True)
+    updatedAt = models.DateTimeField(verbose_name='最后写入时间', auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updatedAt']),
+        ]
+        verbose_name_plural = '分片上传'
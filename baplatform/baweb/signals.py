@@ -0,0 +1,142 @@
+"""
+模型信号
+
+- 论坛和课程的关键模型变更时写入 OutboxEvent（见 baweb/utils/outbox.py）。
+  保存由 OutboxMixin 包在事务中，级联删除本身在事务中执行，因此事件与数据变更同时提交。
+- 任务和选课变更时使日历缓存失效（见 baweb/utils/schedule.py）。
+- 提交、选课和小组变更时使任务提交状态缓存失效（见 baweb/utils/submission.py）。
+- 提交（含打分）、任务、选课和小组变更时使成绩统计缓存失效（见 baweb/utils/gradestats.py）。
+- 新建 / 删除提交时维护最新提交指针（见 baweb/utils/latest.py）。
+- 小组和成员变更时使课程小组成员缓存失效（见 baweb/utils/groups.py）。
+- 学生 / 老师信息保存时重建姓名搜索词（见 baweb/utils/namesearch.py）。
+- 通知、帖子、任务、小组变更时更新课程的看板版本，选课、提交、阅读水位变更时删除学生的看板缓存
+  （见 baweb/utils/dashboard.py）。
+- 新选课记录分配课程内的名单序号（见 baweb/utils/receipts.py）。
+"""
+
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from baweb import models
+from baweb.utils import dashboard, gradestats, groups, latest, namesearch, outbox, receipts, schedule, submission
+
+
+OUTBOX_MODELS = (
+    models.Post,
+    models.PostComment,
+    models.PostLike,
+    models.PostCollect,
+    models.Announce,
+    models.AssignmentSubmit,
+)
+
+# 只改动这些字段的保存（如浏览数）不产生事件
+OUTBOX_IGNORED_FIELDS = {'viewCount'}
+
+
+def outbox_on_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if update_fields and set(update_fields) <= OUTBOX_IGNORED_FIELDS:
+        return
+    outbox.record(instance, outbox.CREATED if created else outbox.UPDATED)
+
+
+def outbox_on_delete(sender, instance, **kwargs):
+    outbox.record(instance, outbox.DELETED)
+
+
+# 按模型连接：不带 sender 的 post_delete 接收器会让所有模型的级联删除都逐行取出对象
+for _model in OUTBOX_MODELS:
+    post_save.connect(outbox_on_save, sender=_model, dispatch_uid=f'outbox_save_{_model._meta.model_name}')
+    post_delete.connect(outbox_on_delete, sender=_model, dispatch_uid=f'outbox_delete_{_model._meta.model_name}')
+
+
+@receiver([post_save, post_delete], sender=models.Assignment)
+def schedule_on_assignment_change(sender, instance, **kwargs):
+    schedule.invalidate_course(instance.course_id, instance.course.teacher_id)
+    submission.invalidate_assignment(instance.id)
+    gradestats.invalidate_course(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=models.StudentCourse)
+def schedule_on_enrollment_change(sender, instance, **kwargs):
+    schedule.invalidate_user(instance.student_id)
+    submission.invalidate_course(instance.course_id)
+    gradestats.invalidate_course(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=models.AssignmentSubmit)
+def submission_on_submit_change(sender, instance, **kwargs):
+    submission.invalidate_assignment(instance.assignment_id)
+    gradestats.invalidate_assignment(instance.assignment_id, instance.assignment.course_id)
+
+
+@receiver(post_save, sender=models.AssignmentSubmit)
+def latest_on_submit(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        latest.record(instance)
+
+
+@receiver(post_delete, sender=models.AssignmentSubmit)
+def latest_on_submit_delete(sender, instance, **kwargs):
+    latest.refresh(instance.assignment_id, [instance.student_id])
+
+
+@receiver([post_save, post_delete], sender=models.Group)
+def submission_on_group_change(sender, instance, **kwargs):
+    groups.invalidate_course(instance.course_id)
+    submission.invalidate_course(instance.course_id)
+    gradestats.invalidate_course(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=models.GroupMember)
+def submission_on_member_change(sender, instance, **kwargs):
+    groups.invalidate_course(instance.group.course_id)
+    submission.invalidate_course(instance.group.course_id)
+    gradestats.invalidate_course(instance.group.course_id)
+
+
+@receiver(post_save, sender=models.StudentInfo)
+@receiver(post_save, sender=models.TeacherInfo)
+def namesearch_on_info_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields and 'name' not in update_fields):
+        return
+    namesearch.index(instance.user_id, 1 if sender is models.StudentInfo else 2, instance.name)
+
+
+@receiver([post_save, post_delete], sender=models.Announce)
+@receiver([post_save, post_delete], sender=models.Assignment)
+@receiver([post_save, post_delete], sender=models.Group)
+def dashboard_on_course_change(sender, instance, **kwargs):
+    dashboard.invalidate_course(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=models.Post)
+def dashboard_on_post_change(sender, instance, update_fields=None, **kwargs):
+    if instance.course_id is None or (update_fields and set(update_fields) <= OUTBOX_IGNORED_FIELDS):
+        return
+    dashboard.invalidate_course(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=models.GroupMember)
+def dashboard_on_member_change(sender, instance, **kwargs):
+    dashboard.invalidate_course(instance.group.course_id)
+
+
+@receiver([post_save, post_delete], sender=models.StudentCourse)
+@receiver([post_save, post_delete], sender=models.AssignmentSubmit)
+def dashboard_on_student_change(sender, instance, **kwargs):
+    dashboard.invalidate_user(instance.student_id)
+
+
+@receiver(post_save, sender=models.CourseReadState)
+def dashboard_on_read(sender, instance, **kwargs):
+    dashboard.invalidate_user(instance.user_id)
+
+
+@receiver(pre_save, sender=models.StudentCourse)
+def receipts_assign_slot(sender, instance, raw=False, **kwargs):
+    if raw or instance.slot is not None:
+        return
+    instance.slot = receipts.allocate_slots(instance.course_id, 1)[0]
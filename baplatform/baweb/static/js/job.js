@@ -0,0 +1,34 @@
+/*
+ * 轮询后台任务进度（见 baweb/utils/jobs.py）
+ * WatchJob(jobId, $progress, onDone)：$progress 中显示进度，任务结束后回调 onDone(job)
+ */
+function WatchJob(jobId, $progress, onDone) {
+    function poll() {
+        $.ajax({
+            url: "/job/" + jobId + "/progress",
+            type: "get",
+            dataType: "JSON",
+            success: function (res) {
+                if (!res.status) {
+                    $progress.text(res.msg);
+                    return;
+                }
+                var job = res.job;
+                var text = job.status_display + "：已处理 " + job.processed;
+                if (job.total) {
+                    text += " / " + job.total;
+                }
+                $progress.text(text + " 行");
+                if (job.finished) {
+                    onDone(job);
+                } else {
+                    setTimeout(poll, 1000);
+                }
+            },
+            error: function () {
+                setTimeout(poll, 3000);
+            }
+        });
+    }
+    poll();
+}
@@ -1,3 +1,502 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from baweb import models
+from baweb.utils import (analytics, dashboard, digest, feed, gradebook, grading, gradestats, inbox, outbox, purge,
+                         readstate, receipts, roster, submission, uploads)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CourseTestCase(TestCase):
+    '''一门课程、一位老师、四个选课学生和一个任务'''
+
+    def setUp(self):
+        teacher = models.TeacherInfo.objects.create(
+            user=models.User.objects.create(username='t001', password='x', type=2), name='老师')
+        self.course = models.Course.objects.create(name='课程', teacher=teacher)
+        self.students = []
+        for i in range(4):
+            user = models.User.objects.create(username=f's00{i}', password='x', type=1)
+            student = models.StudentInfo.objects.create(user=user, name=f'学生{i}')
+            models.StudentCourse.objects.create(student=student, course=self.course, slot=i)
+            self.students.append(student)
+        self.assignment = models.Assignment.objects.create(
+            name='任务', course=self.course, ddl=timezone.localdate() + datetime.timedelta(days=7))
+
+    def _upload(self, student, assignment=None):
+        return models.AssignmentSubmit.objects.create(
+            student=student, assignment=assignment or self.assignment, file='submission/a.pdf', file_name='a.pdf')
+
+
+class GradingTests(CourseTestCase):
+    '''批量打分（grading.apply_marks）与任务提交状态（submission.assignment_status）'''
+
+    def _created_events(self):
+        return list(models.OutboxEvent.objects.filter(topic='assignmentsubmit', action=outbox.CREATED)
+                    .values_list('objectId', flat=True))
+
+    def test_apply_marks_updates_uploads_and_creates_grade_only_rows(self):
+        upload = self._upload(self.students[0])
+        before = set(self._created_events())
+        result = grading.apply_marks(self.assignment, [
+            {'student': self.students[0].user_id, 'marks': 90},
+            {'student': self.students[1].user_id, 'marks': 80, 'max_marks': 120},
+        ])
+        self.assertTrue(result['ok'])
+        self.assertEqual((result['graded'], result['updated'], result['created']), (2, 1, 1))
+        upload.refresh_from_db()
+        self.assertEqual((upload.marks, upload.max_marks), (90, 100))
+        grade_only = models.AssignmentSubmit.objects.get(assignment=self.assignment, student=self.students[1])
+        self.assertEqual((grade_only.file.name, grade_only.marks, grade_only.max_marks), ('', 80, 120))
+        self.assertEqual(set(self._created_events()) - before, {grade_only.id})
+        self.assertEqual(models.Notification.objects.filter(kind=5).count(), 2)
+
+    def test_apply_marks_twice_does_not_duplicate(self):
+        entries = [{'student': self.students[1].user_id, 'marks': 80}]
+        grading.apply_marks(self.assignment, entries)
+        before = len(self._created_events())
+        result = grading.apply_marks(self.assignment, [{'student': self.students[1].user_id, 'marks': 85}])
+        self.assertEqual((result['updated'], result['created']), (1, 0))
+        self.assertEqual(models.AssignmentSubmit.objects.filter(student=self.students[1]).count(), 1)
+        self.assertEqual(len(self._created_events()), before)
+
+    def test_apply_marks_rejects_invalid_rows(self):
+        outsider = models.StudentInfo.objects.create(
+            user=models.User.objects.create(username='s999', password='x', type=1))
+        result = grading.apply_marks(self.assignment, [
+            {'student': self.students[0].user_id, 'marks': 101},
+            {'student': outsider.user_id, 'marks': 50},
+            {'username': 's002', 'marks': 60},
+        ])
+        self.assertFalse(result['ok'])
+        self.assertEqual([e['reason'] for e in result['errors']], ['分数不合法', '不是本课程的学生'])
+        self.assertFalse(models.AssignmentSubmit.objects.exists())
+
+    def test_apply_marks_group_assignment(self):
+        self.assignment.is_group = True
+        self.assignment.save()
+        group = models.Group.objects.create(course=self.course, name='第一组')
+        for student in self.students[:2]:
+            models.GroupMember.objects.create(group=group, student=student, is_head=student is self.students[0])
+        result = grading.apply_marks(self.assignment, [{'student': self.students[0].user_id, 'marks': 70}])
+        self.assertTrue(result['ok'])
+        self.assertEqual((result['graded'], result['created']), (2, 1))
+
+        conflict = grading.apply_marks(self.assignment, [
+            {'student': self.students[0].user_id, 'marks': 70},
+            {'student': self.students[1].user_id, 'marks': 60},
+        ])
+        self.assertFalse(conflict['ok'])
+
+    def test_assignment_status(self):
+        self._upload(self.students[0])
+        late = self._upload(self.students[1])
+        models.AssignmentSubmit.objects.filter(id=late.id).update(
+            submit_time=timezone.now() + datetime.timedelta(days=30))
+        submission.invalidate_assignment(self.assignment.id)
+        grading.apply_marks(self.assignment, [{'student': self.students[2].user_id, 'marks': 60}])
+
+        status = submission.assignment_status(self.assignment)
+        ids = [s.user_id for s in self.students]
+        self.assertEqual(status['enrolled'], set(ids))
+        self.assertEqual(status['submitted'], {ids[0], ids[1]})
+        self.assertEqual(status['unsubmitted'], {ids[2], ids[3]})
+        self.assertEqual(status['late'], {ids[1]})
+
+    def test_assignment_status_group_and_cache(self):
+        self.assignment.is_group = True
+        self.assignment.save()
+        group = models.Group.objects.create(course=self.course, name='第一组')
+        for student in self.students[:2]:
+            models.GroupMember.objects.create(group=group, student=student, is_head=False)
+        ids = [s.user_id for s in self.students]
+        self.assertEqual(submission.assignment_status(self.assignment)['submitted'], set())
+
+        self._upload(self.students[0])
+        self.assertEqual(submission.assignment_status(self.assignment)['submitted'], {ids[0], ids[1]})
+
+    def test_gradebook_and_stats_skip_ungraded_uploads(self):
+        graded = self._upload(self.students[0])
+        grading.apply_marks(self.assignment, [
+            {'student': self.students[0].user_id, 'marks': 90},
+            {'student': self.students[1].user_id, 'marks': 70},
+        ])
+        self._upload(self.students[1])  # 打分后重新上传，还没有打分
+        self._upload(self.students[2])
+
+        book = gradebook.build(self.course)
+        cells = {row['student_id']: row['cells'][0] for row in book['rows']}
+        self.assertEqual(cells[self.students[0].user_id]['submit_id'], graded.id)
+        self.assertEqual([cells[s.user_id] for s in self.students[1:]], [None, None, None])
+        self.assertEqual(book['assignments'][0]['submitted'], 1)
+
+        stats, _ = gradestats.compute(self.course)
+        self.assertEqual((stats[self.assignment.id]['count'], stats[self.assignment.id]['mean']), (1, 90.0))
+
+    def test_gradebook_and_stats_use_last_graded_max_marks(self):
+        grading.apply_marks(self.assignment, [{'student': self.students[0].user_id, 'marks': 90, 'max_marks': 120}])
+        grading.apply_marks(self.assignment, [{'student': self.students[1].user_id, 'marks': 80}])
+
+        self.assertEqual(gradebook.build(self.course)['assignments'][0]['max_marks'], 100)
+        assignments, rows = gradebook.iter_rows(self.course)
+        self.assertEqual([row['max_total'] for row in rows], [100] * 4)
+        self.assertEqual(assignments[0]['max_marks'], 100)
+        _, summary = gradestats.compute(self.course)
+        self.assertEqual(summary['max_total'], 100.0)
+
+    def test_dashboard_grades(self):
+        group_assignment = models.Assignment.objects.create(
+            name='小组任务', course=self.course, is_group=True, ddl=self.assignment.ddl)
+        group = models.Group.objects.create(course=self.course, name='第一组')
+        for student in self.students[:2]:
+            models.GroupMember.objects.create(group=group, student=student, is_head=False)
+        self._upload(self.students[0])  # 还没有打分
+        self._upload(self.students[1], group_assignment)
+        grading.apply_marks(group_assignment, [{'student': self.students[1].user_id, 'marks': 88}])
+
+        grades = dashboard.build(self.students[0].user)['grades']
+        self.assertEqual([(g['assignment_id'], g['marks']) for g in grades], [(group_assignment.id, 88)])
+
+
+class AnnounceReadTests(CourseTestCase):
+    '''课程通知的三处已读状态（个人消息、已读位图、通知水位）同步更新'''
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.students[0].user
+        self.announces = []
+        for i in range(3):
+            announce = models.Announce.objects.create(announcement=f'通知{i}', teacher=self.course.teacher,
+                                                      course=self.course)
+            inbox.notify_announce(announce)
+            self.announces.append(announce)
+
+    def _watermark(self):
+        state = readstate.states_for(self.user, [self.course.id]).get(self.course.id)
+        return state.lastSeenAnnounceId if state else 0
+
+    def _unread_notifications(self):
+        return set(models.Notification.objects.filter(user=self.user, kind=1, isRead=False)
+                   .values_list('announce_id', flat=True))
+
+    def test_inbox_mark_read_sets_receipts_and_watermark(self):
+        first, second, third = self.announces
+        by_announce = dict(models.Notification.objects.filter(user=self.user, kind=1)
+                           .values_list('announce_id', 'id'))
+        inbox.mark_read(self.user, [by_announce[second.id]])
+        self.assertEqual(receipts.read_ids(self.user, self.announces), {second.id})
+        self.assertEqual(self._watermark(), 0)
+
+        inbox.mark_read(self.user, [by_announce[first.id]])
+        self.assertEqual(receipts.read_ids(self.user, self.announces), {first.id, second.id})
+        self.assertEqual(self._watermark(), second.id)
+        self.assertEqual(self._unread_notifications(), {third.id})
+        self.assertEqual(dashboard.build(self.user)['announcements']['unread'], 1)
+
+    def test_announce_page_marks_notifications_read(self):
+        client = self.client
+        session = client.session
+        session['info'] = {'id': self.user.id, 'name': self.user.username}
+        session.save()
+        self.assertEqual(client.get('/announce/').status_code, 200)
+        self.assertEqual(self._unread_notifications(), set())
+        self.assertEqual(inbox.unread_count(self.user.id), 0)
+        self.assertEqual(receipts.read_ids(self.user, self.announces), {a.id for a in self.announces})
+        self.assertEqual(self._watermark(), self.announces[-1].id)
+        self.assertEqual(receipts.read_counts(self.announces)[self.announces[0].id], (1, 4))
+
+
+class FeedTests(CourseTestCase):
+    '''动态流的写扩散、重复推送和翻页'''
+
+    def _post(self, author, title, course=None):
+        return models.Post.objects.create(postId=f'p-{title}', author=author, course=course or self.course,
+                                          title=title, content=title)
+
+    def _titles(self, user, **kwargs):
+        items, _ = feed.read_feed(user, **kwargs)
+        return [post.title for _, _, post in items]
+
+    def test_fanout_post_reaches_course_members_except_author(self):
+        author = self.students[0].user
+        post = self._post(author, 'a')
+        self.assertEqual(feed.fanout_post(post), 4)  # 另外三个学生和任课老师
+        self.assertEqual(self._titles(self.students[1].user), ['a'])
+        self.assertEqual(self._titles(self.course.teacher.user), ['a'])
+        self.assertEqual(self._titles(author), [])
+
+    def test_repush_moves_post_to_top_without_duplicates(self):
+        reader = self.students[1].user
+        now = timezone.now()
+        first, second = self._post(self.students[0].user, 'first'), self._post(self.students[0].user, 'second')
+        feed._push([reader.id], first, 1, now - datetime.timedelta(minutes=2))
+        feed._push([reader.id], second, 1, now - datetime.timedelta(minutes=1))
+        self.assertEqual(self._titles(reader), ['second', 'first'])
+
+        models.PostCollect.objects.create(post=first, user=reader)
+        feed.fanout_reply(first, self.students[2].user)
+        feed.fanout_reply(first, self.students[2].user)  # 同一帖子再次推送不会违反唯一约束
+        self.assertEqual(self._titles(reader), ['first', 'second'])
+        self.assertEqual(models.FeedEntry.objects.filter(user=reader, post=first).get().reason, 3)
+
+    def test_read_feed_pages_by_cursor(self):
+        reader = self.students[1].user
+        created_at = timezone.now()
+        posts = [self._post(self.students[0].user, f'p{i}') for i in range(5)]
+        for post in posts:
+            feed._push([reader.id], post, 1, created_at)  # 同一时间，按帖子ID排序
+        first_page, cursor = feed.read_feed(reader, limit=3)
+        second_page, end = feed.read_feed(reader, before=cursor, limit=3)
+        titles = [post.title for _, _, post in first_page + second_page]
+        self.assertEqual(titles, ['p4', 'p3', 'p2', 'p1', 'p0'])
+        self.assertIsNone(end)
+
+
+class PurgeTests(CourseTestCase):
+    '''删除课程：先标记删除（帖子写入 UPDATED 事件），后台清理时删除全部下级数据'''
+
+    def setUp(self):
+        super().setUp()
+        self.reader = self.students[1].user
+        self.post = models.Post.objects.create(postId='p-del', author=self.students[0].user, course=self.course,
+                                               title='将被删除的帖子', content='x')
+        feed.fanout_post(self.post)
+        comment = models.PostComment.objects.create(commentId='c-1', post=self.post, author=self.reader, content='评论')
+        models.PostComment.objects.create(commentId='c-2', post=self.post, author=self.reader, content='回复',
+                                          parentComment=comment)
+        models.Post.objects.filter(id=self.post.id).update(bestAnswer=comment)
+        models.PostCollect.objects.create(post=self.post, user=self.reader)
+        self._upload(self.students[0])
+
+    def _login(self, user):
+        session = self.client.session
+        session['info'] = {'id': user.id, 'name': user.username}
+        session.save()
+
+    def test_course_delete_hides_posts_and_records_events(self):
+        self.assertEqual(readstate.unread_counts(self.reader, [self.course.id]), {self.course.id: 1})
+        self._login(self.course.teacher.user)
+        self.client.get(f'/course/{self.course.id}/delete')
+
+        self.assertTrue(models.Course.all_objects.get(id=self.course.id).isDeleted)
+        self.assertTrue(models.Post.all_objects.get(id=self.post.id).isDeleted)
+        self.assertTrue(models.OutboxEvent.objects.filter(topic='post', action=outbox.UPDATED,
+                                                          objectId=self.post.id).exists())
+        self.assertEqual(feed.read_feed(self.reader)[0], [])
+        self.assertEqual(readstate.unread_counts(self.reader, [self.course.id]), {self.course.id: 0})
+        self._login(self.reader)
+        self.assertNotContains(self.client.get('/forum/'), '将被删除的帖子')
+
+    def test_purge_removes_dependent_rows(self):
+        purge.mark_course_deleted(self.course)
+        result = purge.purge_pending()
+        self.assertEqual(result['courses'], 1)
+        self.assertFalse(models.Course.all_objects.filter(id=self.course.id).exists())
+        for model in (models.Post, models.PostComment, models.PostCollect, models.FeedEntry, models.Assignment,
+                      models.AssignmentSubmit, models.LatestSubmission, models.StudentCourse):
+            self.assertFalse(model._base_manager.exists(), model.__name__)
+        deleted = set(models.OutboxEvent.objects.filter(action=outbox.DELETED).values_list('topic', flat=True))
+        self.assertTrue({'post', 'postcomment', 'postcollect', 'assignmentsubmit'} <= deleted)
+        self.assertTrue(models.OutboxEvent.objects.filter(topic='postcomment', action=outbox.UPDATED).exists())
+
+
+class AnalyticsTests(CourseTestCase):
+    '''看板汇总表的重算（analytics.backfill）'''
+
+    def _submit_count(self):
+        return sum(models.ActivityRollup.objects.filter(metric='submit', granularity='day')
+                   .values_list('count', flat=True))
+
+    def _backfill_checkpoints(self):
+        return models.ConsumerCheckpoint.objects.filter(name__startswith=analytics.BACKFILL_CHECKPOINT)
+
+    def test_backfill_in_batches(self):
+        for student in self.students[:3]:
+            self._upload(student)
+        result = analytics.backfill(batch_size=2)
+        self.assertEqual(result['assignmentsubmit'], 3)
+        self.assertEqual(self._submit_count(), 3)
+        self.assertEqual(models.ActiveStudentDay.objects.count(), 3)
+        self.assertEqual(models.ConsumerCheckpoint.objects.get(name=analytics.RollupConsumer.name).position,
+                         outbox.last_position())
+        self.assertFalse(self._backfill_checkpoints().exists())
+
+    def test_backfill_resumes_from_checkpoint(self):
+        uploads = [self._upload(student) for student in self.students[:3]]
+        analytics._start_backfill()
+        # 第一批提交后中断
+        progress, _ = analytics._backfill_names('assignmentsubmit')
+        models.ConsumerCheckpoint.objects.filter(name=progress).update(position=uploads[0].id)
+        self._upload(self.students[3])  # 重算开始后的新提交由消费者累加
+
+        self.assertEqual(analytics.backfill()['assignmentsubmit'], 2)
+        self.assertEqual(self._submit_count(), 2)
+        self.assertEqual(analytics.run(), 1)
+        self.assertEqual(self._submit_count(), 3)
+
+
+class StudentSearchTests(CourseTestCase):
+    '''按学号前缀或姓名搜索学生（namesearch.student_q）：选课名单和组长添加组员共用'''
+
+    def test_roster_page_search(self):
+        self.assertEqual([s['username'] for s in roster.page(self.course, q='s00')['students']],
+                         ['s000', 's001', 's002', 's003'])
+        self.assertEqual([s['username'] for s in roster.page(self.course, q='s002')['students']], ['s002'])
+        self.assertEqual(roster.page(self.course, q='学生')['total'], 4)
+
+    def test_member_search_skips_grouped_students(self):
+        group = models.Group.objects.create(course=self.course, name='第一组')
+        models.GroupMember.objects.create(group=group, student=self.students[0], is_head=True)
+        session = self.client.session
+        session['info'] = {'id': self.students[0].user_id, 'name': 's000'}
+        session.save()
+
+        response = self.client.get(f'/group/{group.id}/member/search', {'q': 's00'})
+        self.assertEqual([s['username'] for s in response.json()['students']], ['s001', 's002', 's003'])
+        response = self.client.get(f'/group/{group.id}/member/search', {'q': '学生1'})
+        self.assertEqual([s['username'] for s in response.json()['students']], ['s001'])
+
+
+class DigestTests(CourseTestCase):
+    '''邮件摘要的通知进度（DigestState.lastAnnounceId）'''
+
+    def setUp(self):
+        super().setUp()
+        models.StudentInfo.objects.filter(user_id__in=[s.user_id for s in self.students[:3]]) \
+            .update(email='s@example.com')
+        self.first = self._announce('通知1')
+
+    def _announce(self, text):
+        return models.Announce.objects.create(announcement=text, teacher=self.course.teacher, course=self.course)
+
+    def _watermarks(self):
+        return dict(models.DigestState.objects.values_list('user_id', 'lastAnnounceId'))
+
+    def test_same_day_rerun_keeps_skipped_watermark(self):
+        self.assertEqual(digest.run(), {'recipients': 3, 'sent': 3})
+        second = self._announce('通知2')
+
+        self.assertEqual(digest.run(), {'recipients': 0, 'sent': 0})
+        self.assertEqual(set(self._watermarks().values()), {self.first.id})
+        digests, _, _ = digest.collect(today=timezone.localdate() + datetime.timedelta(days=1))
+        self.assertEqual([[a['id'] for a in d['announces']] for d in digests], [[second.id]] * 3)
+
+    def test_idle_recipients_advance_watermark(self):
+        idle = self.students[2]
+        models.StudentCourse.objects.filter(student=idle).delete()
+        models.DigestState.objects.create(user_id=idle.user_id, lastAnnounceId=0,
+                                          sentAt=timezone.now() - datetime.timedelta(days=1))
+
+        self.assertEqual(digest.run(), {'recipients': 2, 'sent': 2})
+        self.assertEqual(self._watermarks()[idle.user_id], self.first.id)
+
+
+class UploadTests(CourseTestCase):
+    '''分片上传：追加、完成校验和过期清理（临时文件写在临时目录）'''
+
+    DATA = b'0123456789'
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = self.students[0].user
+
+    def _create(self, data=DATA):
+        return uploads.create(self.user, 'submit', self.assignment.id, 'a.txt', len(data),
+                              checksum='sha256:' + hashlib.sha256(data).hexdigest())
+
+    def _uploaded(self, data=DATA):
+        upload = self._create(data)
+        uploads.append(upload, 0, io.BytesIO(data), len(data))
+        return upload
+
+    def _reload(self, upload):
+        return models.Upload.objects.get(id=upload.id)
+
+    def _expire(self, upload, hours=48):
+        models.Upload.objects.filter(id=upload.id).update(updatedAt=timezone.now() - datetime.timedelta(hours=hours))
+        old = (timezone.now() - datetime.timedelta(hours=hours)).timestamp()
+        os.utime(uploads._path(upload), (old, old))
+
+    def test_append_checks_offset_and_confirms_partial_chunk(self):
+        upload = self._create()
+        self.assertEqual(uploads.append(upload, 0, io.BytesIO(b'0123'), 4), 4)
+        with self.assertRaisesMessage(uploads.UploadError, '偏移量不一致'):
+            uploads.append(upload, 0, io.BytesIO(b'0123'), 4)
+        # 连接中断：声明 4 字节只收到 2 字节
+        self.assertEqual(uploads.append(upload, 4, io.BytesIO(b'45'), 4), 6)
+        self.assertEqual(uploads.append(upload, 6, io.BytesIO(b'6789'), 4), 10)
+        with open(uploads._path(upload), 'rb') as f:
+            self.assertEqual(f.read(), self.DATA)
+
+    def test_finalize_checksum_failure_resets_offset(self):
+        upload = self._uploaded()
+        with self.assertRaisesMessage(uploads.UploadError, '校验失败'):
+            uploads.finalize(upload, 'sha256:' + '0' * 64)
+        upload = self._reload(upload)
+        self.assertEqual((upload.status, upload.offset), (1, 0))
+        self.assertEqual(os.path.getsize(uploads._path(upload)), 0)
+        self.assertFalse(models.AssignmentSubmit.objects.exists())
+
+    def test_finalize_twice_returns_same_record(self):
+        upload = self._uploaded()
+        object_id = uploads.finalize(upload)
+        submit = models.AssignmentSubmit.objects.get(id=object_id)
+        self.assertEqual((submit.student_id, submit.file.read()), (self.user.id, self.DATA))
+        self.assertFalse(os.path.exists(uploads._path(upload)))
+        self.assertEqual(uploads.finalize(self._reload(upload)), object_id)
+        self.assertEqual(models.AssignmentSubmit.objects.count(), 1)
+
+    def test_finalize_reclaims_stale_verification(self):
+        upload = self._uploaded()
+        models.Upload.objects.filter(id=upload.id).update(status=2, updatedAt=timezone.now())
+        with self.assertRaisesMessage(uploads.UploadError, '正在校验'):
+            uploads.finalize(self._reload(upload))
+        stale = timezone.now() - datetime.timedelta(seconds=settings.UPLOAD_FINALIZE_TIMEOUT + 1)
+        models.Upload.objects.filter(id=upload.id).update(updatedAt=stale)
+        object_id = uploads.finalize(self._reload(upload))
+        self.assertEqual(self._reload(upload).status, 3)
+        self.assertTrue(models.AssignmentSubmit.objects.filter(id=object_id).exists())
+
+    def test_finalize_failure_puts_part_file_back(self):
+        upload = self._uploaded()
+        attach = uploads._attach
+
+        def attach_then_fail(obj, upload, path):
+            attach(obj, upload, path)
+            raise RuntimeError('数据库写入失败')
+
+        with mock.patch.object(uploads, '_attach', attach_then_fail), self.assertRaises(RuntimeError):
+            uploads.finalize(upload)
+        upload = self._reload(upload)
+        self.assertEqual((upload.status, upload.offset), (1, len(self.DATA)))
+        with open(uploads._path(upload), 'rb') as f:
+            self.assertEqual(f.read(), self.DATA)
+        self.assertFalse(models.AssignmentSubmit.objects.exists())
+        self.assertTrue(uploads.finalize(upload))
+
+    def test_collect_garbage_removes_expired_uploads_and_part_files(self):
+        expired, fresh = self._create(), self._create()
+        self._expire(expired)
+        orphan = os.path.join(uploads._dir(), 'f' * 32 + '.part')
+        open(orphan, 'wb').close()
+        old = (timezone.now() - datetime.timedelta(hours=48)).timestamp()
+        os.utime(orphan, (old, old))
+
+        self.assertEqual(uploads.collect_garbage(), {'uploads': 1, 'files': 2})
+        self.assertEqual(list(models.Upload.objects.values_list('id', flat=True)), [fresh.id])
+        self.assertFalse(os.path.exists(uploads._path(expired)) or os.path.exists(orphan))
+        self.assertTrue(os.path.exists(uploads._path(fresh)))
@@ -0,0 +1,362 @@
+"""
+教学看板汇总表（ActivityRollup / ActiveStudentDay）
+
+增量维护：作为变更事件发件箱（见 baweb/utils/outbox.py）的消费者 RollupConsumer，
+只处理提交、帖子、评论的创建事件，在内存中按 (课程, 指标, 小时/天) 计数后与消费进度一起在一个事务中
+累加到汇总表。事件与业务数据在同一事务中写入，序号按提交顺序递增，不会漏行。
+
+- 提交：任务提交数和逾期提交数（晚于截止日期当天结束），批量打分补建的无文件记录不计
+- 帖子 / 评论：按所属课程计数（不属于课程的计入 course 为空的行）
+- 活跃学生：每门课程每天有过提交、发帖或评论的学生
+
+只统计新增：之后删除或归档原始数据不会回退计数。backfill() 清空汇总表，并把消费进度设到当前最后一个事件，
+再从原始表分批重算，每批与重算进度一起提交，中断后再次运行从断点继续。看板查询（*_per_day / *_per_week / active_students）只读汇总表。
+运行：python manage.py consume_outbox（或 rollup_analytics）
+"""
+
+import datetime
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from baweb import models
+from baweb.utils import outbox, submission
+
+
+BATCH_SIZE = 2000
+SOURCES = ('assignmentsubmit', 'post', 'postcomment')
+BACKFILL_CHECKPOINT = 'analytics_backfill'
+
+
+def _buckets(moment):
+    '''(小时起点, 天起点)，按当前时区截断'''
+    local = timezone.localtime(moment)
+    hour = local.replace(minute=0, second=0, microsecond=0)
+    return hour, hour.replace(hour=0)
+
+
+class _Batch(object):
+
+    def __init__(self):
+        self.counts = Counter()
+        self.active = set()
+
+    def add(self, course_id, metric, moment, count=1):
+        hour, day = _buckets(moment)
+        self.counts[(course_id, metric, 'hour', hour)] += count
+        self.counts[(course_id, metric, 'day', day)] += count
+
+    def touch(self, course_id, moment, user_id):
+        if course_id is not None:
+            self.active.add((course_id, timezone.localtime(moment).date(), user_id))
+
+    def save(self):
+        '''把本批计数累加到汇总表（需在事务中调用）'''
+        if self.counts:
+            buckets = [key[3] for key in self.counts]
+            existing = {
+                (row.course_id, row.metric, row.granularity, row.bucket): row
+                for row in models.ActivityRollup.objects.filter(
+                    bucket__gte=min(buckets), bucket__lte=max(buckets), metric__in={key[1] for key in self.counts})
+            }
+            new_rows = []
+            for key, count in self.counts.items():
+                row = existing.get(key)
+                if row:
+                    models.ActivityRollup.objects.filter(id=row.id).update(count=F('count') + count)
+                else:
+                    course_id, metric, granularity, bucket = key
+                    new_rows.append(models.ActivityRollup(course_id=course_id, metric=metric, granularity=granularity,
+                                                          bucket=bucket, count=count))
+            models.ActivityRollup.objects.bulk_create(new_rows, batch_size=500)
+        if self.active:
+            models.ActiveStudentDay.objects.bulk_create(
+                [models.ActiveStudentDay(course_id=c, day=d, user_id=u) for c, d, u in self.active],
+                batch_size=500, ignore_conflicts=True)
+
+
+def _collect_submits(rows, batch):
+    assignments = {
+        a['id']: a for a in models.Assignment.objects.filter(id__in={row[1] for row in rows})
+        .values('id', 'course_id', 'ddl')
+    }
+    deadlines = {}
+    for _, assignment_id, student_id, submit_time, file in rows:
+        assignment = assignments.get(assignment_id)
+        if assignment is None or not file:
+            continue
+        course_id = assignment['course_id']
+        if assignment_id not in deadlines:
+            deadlines[assignment_id] = submission.deadline(assignment['ddl'])
+        batch.add(course_id, 'submit', submit_time)
+        if submit_time > deadlines[assignment_id]:
+            batch.add(course_id, 'late', submit_time)
+        batch.touch(course_id, submit_time, student_id)
+
+
+def _collect_posts(rows, batch):
+    for _, course_id, author_id, author_type, created_at in rows:
+        batch.add(course_id, 'post', created_at)
+        if author_type == 1:
+            batch.touch(course_id, created_at, author_id)
+
+
+def _collect_comments(rows, batch):
+    courses = dict(models.Post.all_objects.filter(id__in={row[1] for row in rows}).values_list('id', 'course_id'))
+    for _, post_id, author_id, author_type, created_at in rows:
+        course_id = courses.get(post_id)
+        batch.add(course_id, 'comment', created_at)
+        if author_type == 1:
+            batch.touch(course_id, created_at, author_id)
+
+
+def _source_query(source):
+    if source == 'assignmentsubmit':
+        return models.AssignmentSubmit.objects.values_list('id', 'assignment_id', 'student_id', 'submit_time', 'file')
+    if source == 'post':
+        return models.Post.all_objects.values_list('id', 'course_id', 'author_id', 'author__type', 'createdAt')
+    return models.PostComment.objects.values_list('id', 'post_id', 'author_id', 'author__type', 'createdAt')
+
+
+def _source_rows(source, after, limit, last):
+    return list(_source_query(source).filter(id__gt=after, id__lte=last).order_by('id')[:limit])
+
+
+_COLLECTORS = {
+    'assignmentsubmit': _collect_submits,
+    'post': _collect_posts,
+    'postcomment': _collect_comments,
+}
+
+
+def _event_rows(source, events, author_types):
+    '''把创建事件的内容转换成与 _source_rows() 相同的行'''
+    rows = []
+    for event in events:
+        data = event.data
+        if source == 'assignmentsubmit':
+            rows.append((event.objectId, data['assignment_id'], data['student_id'],
+                         parse_datetime(data['submit_time']), data['file']))
+        else:
+            parent = data['course_id'] if source == 'post' else data['post_id']
+            rows.append((event.objectId, parent, data['author_id'], author_types.get(data['author_id']),
+                         parse_datetime(data['createdAt'])))
+    return rows
+
+
+@outbox.register
+class RollupConsumer(outbox.Consumer):
+    '''把新增的提交、帖子、评论累加到汇总表'''
+    name = 'analytics_rollup'
+    topics = SOURCES
+    batch_size = BATCH_SIZE
+
+    def handle(self, events):
+        created = {}
+        for event in events:
+            if event.action == outbox.CREATED:
+                created.setdefault(event.topic, []).append(event)
+        author_ids = {e.data['author_id'] for topic in ('post', 'postcomment') for e in created.get(topic, ())}
+        author_types = dict(models.User.objects.filter(id__in=author_ids).values_list('id', 'type')) if author_ids else {}
+        batch = _Batch()
+        for source, source_events in created.items():
+            _COLLECTORS[source](_event_rows(source, source_events, author_types), batch)
+        batch.save()
+
+
+def run():
+    '''处理发件箱中的新事件，直到追平
+
+    Returns:
+        int: 处理的事件数
+    '''
+    return RollupConsumer().run_until_idle()
+
+
+def _backfill_names(source):
+    '''(重算进度, 重算终点) 的断点键，position 都是原始表的行ID'''
+    return f'{BACKFILL_CHECKPOINT}:{source}', f'{BACKFILL_CHECKPOINT}:{source}:end'
+
+
+def _start_backfill():
+    '''清空汇总表，消费进度设到当前最后一个事件，并记下每张原始表要重算到的最后一行
+
+    在一个事务中执行：先删除汇总表取得写锁，之后不会有新行插在重算终点与消费进度之间，
+    终点之后的行由 RollupConsumer 从事件累加。
+    '''
+    with transaction.atomic():
+        models.ActivityRollup.objects.all().delete()
+        models.ActiveStudentDay.objects.all().delete()
+        models.ConsumerCheckpoint.objects.update_or_create(
+            name=RollupConsumer.name, defaults={'position': outbox.last_position()})
+        for source in SOURCES:
+            progress, end = _backfill_names(source)
+            last = _source_query(source).order_by('-id').first()
+            models.ConsumerCheckpoint.objects.update_or_create(name=progress, defaults={'position': 0})
+            models.ConsumerCheckpoint.objects.update_or_create(name=end, defaults={'position': last[0] if last else 0})
+
+
+def backfill(batch_size=BATCH_SIZE):
+    '''清空汇总表，从原始表从头重算
+
+    每批计数与重算进度在同一事务中提交（与 RollupConsumer 相同），不会长时间占用写锁；
+    上次重算中断时从断点继续，不再清空。重算期间看板只显示已提交的部分。
+
+    Returns:
+        dict: {表名: 本次处理的行数}
+    '''
+    names = [name for source in SOURCES for name in _backfill_names(source)]
+    if models.ConsumerCheckpoint.objects.filter(name__in=names).count() < len(names):
+        _start_backfill()
+    result = {}
+    for source in SOURCES:
+        progress, end = _backfill_names(source)
+        last = models.ConsumerCheckpoint.objects.get(name=end).position
+        result[source] = 0
+        while True:
+            with transaction.atomic():
+                after = models.ConsumerCheckpoint.objects.get(name=progress).position
+                rows = _source_rows(source, after, batch_size, last)
+                if not rows:
+                    break
+                batch = _Batch()
+                _COLLECTORS[source](rows, batch)
+                batch.save()
+                models.ConsumerCheckpoint.objects.filter(name=progress).update(position=rows[-1][0])
+            result[source] += len(rows)
+    models.ConsumerCheckpoint.objects.filter(name__in=names).delete()
+    return result
+
+
+# ---------------- 看板查询（只读汇总表） ----------------
+
+def _range(start, end):
+    '''把日期范围转换成 [起点, 终点) 的时间'''
+    tz = timezone.get_current_timezone()
+    lower = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min), tz)
+    upper = timezone.make_aware(datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min), tz)
+    return lower, upper
+
+
+def _series(course_ids, metrics, granularity, start, end):
+    lower, upper = _range(start, end)
+    query = models.ActivityRollup.objects.filter(granularity=granularity, metric__in=metrics,
+                                                 bucket__gte=lower, bucket__lt=upper)
+    if course_ids is not None:
+        query = query.filter(course_id__in=course_ids)
+    result = {}
+    for bucket, metric, count in query.values_list('bucket', 'metric').annotate(n=Sum('count')) \
+            .values_list('bucket', 'metric', 'n'):
+        result.setdefault(timezone.localtime(bucket), Counter())[metric] += count
+    return result
+
+
+def _days(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def submissions_per_day(course_ids, start, end):
+    '''每天的提交数和逾期提交数
+
+    Args:
+        course_ids (list): 课程ID，None 表示全部课程
+        start, end (date): 日期范围（含两端）
+
+    Returns:
+        list: [{date, submit, late}]，没有数据的日期为 0
+    '''
+    series = {bucket.date(): counts for bucket, counts in
+              _series(course_ids, ('submit', 'late'), 'day', start, end).items()}
+    return [{'date': day.isoformat(), 'submit': series.get(day, {}).get('submit', 0),
+             'late': series.get(day, {}).get('late', 0)} for day in _days(start, end)]
+
+
+def submissions_per_hour(course_ids, day):
+    '''某一天每小时的提交数（看截止前的提交高峰）'''
+    series = {bucket.hour: counts for bucket, counts in
+              _series(course_ids, ('submit', 'late'), 'hour', day, day).items()}
+    return [{'hour': hour, 'submit': series.get(hour, {}).get('submit', 0),
+             'late': series.get(hour, {}).get('late', 0)} for hour in range(24)]
+
+
+def _week_start(day):
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def forum_activity_per_week(course_ids, start, end):
+    '''每周（周一开始）的发帖数和评论数
+
+    Returns:
+        list: [{week, post, comment}]
+    '''
+    weeks = {}
+    for bucket, counts in _series(course_ids, ('post', 'comment'), 'day', start, end).items():
+        weeks.setdefault(_week_start(bucket.date()), Counter()).update(counts)
+    result = []
+    week = _week_start(start)
+    while week <= end:
+        counts = weeks.get(week, {})
+        result.append({'week': week.isoformat(), 'post': counts.get('post', 0), 'comment': counts.get('comment', 0)})
+        week += datetime.timedelta(days=7)
+    return result
+
+
+def active_students(course_ids, start, end, by='day'):
+    '''活跃学生数（按天或按周去重）
+
+    Returns:
+        list: [{date 或 week, active}]
+    '''
+    query = models.ActiveStudentDay.objects.filter(day__gte=start, day__lte=end)
+    if course_ids is not None:
+        query = query.filter(course_id__in=course_ids)
+    if by == 'week':
+        users = {}
+        for day, user_id in query.values_list('day', 'user_id').distinct():
+            users.setdefault(_week_start(day), set()).add(user_id)
+        result = []
+        week = _week_start(start)
+        while week <= end:
+            result.append({'week': week.isoformat(), 'active': len(users.get(week, ()))})
+            week += datetime.timedelta(days=7)
+        return result
+    counts = {}
+    for day, user_id in query.values_list('day', 'user_id').distinct():
+        counts[day] = counts.get(day, 0) + 1
+    return [{'date': day.isoformat(), 'active': counts.get(day, 0)} for day in _days(start, end)]
+
+
+MAX_RANGE_DAYS = 366
+DEFAULT_RANGE_DAYS = 30
+
+
+def parse_range(start, end):
+    '''解析看板日期范围（YYYY-MM-DD，含两端），缺省为最近 DEFAULT_RANGE_DAYS 天
+
+    Raises:
+        ValueError: 格式错误、起止颠倒或超过 MAX_RANGE_DAYS 天
+    '''
+    today = timezone.localdate()
+    end = datetime.date.fromisoformat(end) if end else today
+    start = datetime.date.fromisoformat(start) if start else end - datetime.timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end or (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError('日期范围不合法')
+    return start, end
+
+
+def dashboard(course_ids, start, end):
+    '''看板所需的全部序列'''
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'submissions': submissions_per_day(course_ids, start, end),
+        'forum': forum_activity_per_week(course_ids, start, end),
+        'active_daily': active_students(course_ids, start, end),
+        'active_weekly': active_students(course_ids, start, end, by='week'),
+    }
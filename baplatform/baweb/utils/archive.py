@@ -0,0 +1,172 @@
+"""
+论坛冷数据归档
+
+长期不活跃的帖子（创建时间和最后活跃时间都早于 FORUM_ARCHIVE_AFTER_DAYS 天，或指定课程的全部帖子）
+从 Post / PostComment 迁移到 ArchivedPost：正文和评论 zlib 压缩存储，标题、标签和计数保留明文。
+收藏记录复制到 ArchivedCollect，用户的收藏列表中仍能看到已归档的帖子。
+
+每批先在一个事务中写入归档行并把原帖标记为 isDeleted，再由 purge 分批删除原帖及其评论、点赞等。
+中断后重新运行即可继续：已归档但未清理完的原帖会先被清理，未归档的帖子仍是候选。
+"""
+
+import datetime
+import json
+import zlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from baweb import models
+from baweb.utils import purge
+
+
+BATCH_SIZE = 100
+COMPRESS_LEVEL = 9
+
+
+def _compress(text):
+    return zlib.compress(text.encode('utf-8'), COMPRESS_LEVEL)
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'FORUM_ARCHIVE_AFTER_DAYS', 365)
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.id,
+        'parent': comment.parentComment_id,
+        'commentId': comment.commentId,
+        'author': comment.author_id,
+        'isAnonymous': comment.isAnonymous,
+        'content': comment.content,
+        'createdAt': comment.createdAt.isoformat(),
+        'likeCount': comment.likeCount,
+        'isBestAnswer': comment.isBestAnswer,
+    }
+
+
+def candidates(cutoff=None, course_id=None):
+    '''待归档的帖子
+
+    Args:
+        cutoff (datetime): 创建和最后活跃都早于该时间的帖子
+        course_id (int): 只归档该课程（如已结课）的帖子
+    '''
+    query = models.Post.objects.all()
+    if course_id is not None:
+        query = query.filter(course_id=course_id)
+    if cutoff is not None:
+        query = query.filter(createdAt__lt=cutoff, updatedAt__lt=cutoff)
+    return query
+
+
+def archive_posts(post_ids):
+    '''归档一批帖子
+
+    Args:
+        post_ids (list): 帖子主键
+
+    Returns:
+        int: 归档的帖子数
+    '''
+    with transaction.atomic():
+        posts = list(models.Post.objects.filter(id__in=post_ids))
+        comments = defaultdict(list)
+        for comment in models.PostComment.objects.filter(post_id__in=post_ids).order_by('createdAt', 'id'):
+            comments[comment.post_id].append(serialize_comment(comment))
+        models.ArchivedPost.objects.bulk_create([
+            models.ArchivedPost(
+                postId=post.postId,
+                author_id=post.author_id,
+                course_id=post.course_id,
+                category_id=post.category_id,
+                title=post.title,
+                tags=post.tags,
+                isAnonymous=post.isAnonymous,
+                createdAt=post.createdAt,
+                updatedAt=post.updatedAt,
+                likeCount=post.likeCount,
+                collectCount=post.collectCount,
+                commentCount=post.commentCount,
+                viewCount=post.viewCount,
+                bountyPoints=post.bountyPoints,
+                hasBestAnswer=post.bestAnswer_id is not None,
+                contentData=_compress(post.content),
+                commentsData=_compress(json.dumps(comments[post.id], ensure_ascii=False)),
+            )
+            for post in posts
+        ])
+        archived_ids = dict(models.ArchivedPost.objects.filter(postId__in=[post.postId for post in posts])
+                            .values_list('postId', 'id'))
+        post_ids = {post.id: post.postId for post in posts}
+        models.ArchivedCollect.objects.bulk_create([
+            models.ArchivedCollect(archived_id=archived_ids[post_ids[post_id]], user_id=user_id, createdAt=created_at)
+            for post_id, user_id, created_at in models.PostCollect.objects.filter(post_id__in=list(post_ids))
+            .values_list('post_id', 'user_id', 'createdAt')
+        ], batch_size=500)
+        purge.mark_posts_deleted(post.id for post in posts)
+
+    for post in posts:
+        post.isDeleted = True
+        purge.purge_post(post)
+    return len(posts)
+
+
+def run(cutoff=None, course_id=None, batch_size=BATCH_SIZE):
+    '''分批归档所有候选帖子
+
+    Returns:
+        int: 归档的帖子数
+    '''
+    purge.purge_pending()
+    total = 0
+    while True:
+        ids = list(candidates(cutoff, course_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += archive_posts(ids)
+
+
+def load_comments(archived):
+    '''解压归档帖子的评论并组装成两级结构（与 post_detail 的顶级评论 + 回复一致）
+
+    Returns:
+        list: 顶级评论 dict（与回复一样按时间倒序），每条带 author（User 或 None）和 replies；
+            replies 为 {'all': [...]}，模板里和 PostComment 一样用 comment.replies.all 访问
+    '''
+    rows = archived.comment_rows()
+    authors = models.User.objects.in_bulk({row['author'] for row in rows})
+    by_id = {}
+    for row in rows:
+        row['author'] = authors.get(row['author'])
+        row['createdAt'] = parse_datetime(row['createdAt'])
+        row['replies'] = {'all': []}
+        by_id[row['id']] = row
+    top = []
+    for row in reversed(rows):
+        parent = by_id.get(row['parent'])
+        if parent:
+            parent['replies']['all'].append(row)
+        else:
+            top.append(row)
+    return top
+
+
+def search(keyword, course_id=None, category_id=None, limit=20):
+    '''按标题/标签搜索归档帖子'''
+    query = models.ArchivedPost.objects.filter(Q(title__icontains=keyword) | Q(tags__icontains=keyword)) \
+        .exclude(course__isDeleted=True)
+    if course_id == 'none':
+        query = query.filter(course__isnull=True)
+    elif course_id:
+        query = query.filter(course_id=course_id)
+    if category_id:
+        query = query.filter(category_id=category_id)
+    return list(query.select_related('author', 'course', 'category').defer('contentData', 'commentsData')[:limit])
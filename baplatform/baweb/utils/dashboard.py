@@ -0,0 +1,203 @@
+"""
+学生首页看板
+
+build() 一次组装首页需要的全部内容：选课课程（含论坛未读数和未读通知数）、近期截止的任务（含是否已提交）、
+最近的课程通知、最近的成绩、动态流中的新帖。查询次数固定，与选课门数无关：
+- 课程、阅读水位、论坛未读（分组 count）、未读通知数、最近通知各一次
+- 截止任务取自日历缓存（见 baweb/utils/schedule.py），提交情况按本人及组员的最新提交指针一次查询
+- 最近成绩：本人及组员已打分的最新提交指针一次查询（submission.latest_graded()，与成绩册一致），按打分时间倒序
+- 组员取自 baweb/utils/groups.py，新帖取自动态流（见 baweb/utils/feed.py）
+
+结果按用户缓存 CACHE_TIMEOUT 秒。缓存条目记录生成时各课程的版本号：
+通知、帖子、任务、小组变化时更新课程版本；选课、提交、打分和阅读水位变化时删除该用户的缓存（见 baweb/signals.py）。
+"""
+
+import datetime
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from baweb import models
+from baweb.utils import feed, groups, readstate, schedule, submission
+
+
+CACHE_TIMEOUT = 60
+DEADLINE_DAYS = 14
+ANNOUNCE_LIMIT = 10
+GRADE_LIMIT = 10
+POST_LIMIT = 10
+SUMMARY_LENGTH = 80
+
+
+def _user_key(user_id):
+    return f'dashboard:user:{user_id}'
+
+
+def _course_key(course_id):
+    return f'dashboard:course:{course_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(_user_key(user_id))
+
+
+def invalidate_users(user_ids):
+    cache.delete_many([_user_key(user_id) for user_id in user_ids])
+
+
+def invalidate_course(course_id):
+    '''课程的通知、帖子、任务或小组变化：所有包含该课程的看板缓存随之失效'''
+    cache.set(_course_key(course_id), uuid.uuid4().hex, None)
+
+
+def _summary(text):
+    text = strip_tags(text or '').strip()
+    return text if len(text) <= SUMMARY_LENGTH else text[:SUMMARY_LENGTH] + '…'
+
+
+def _courses(user):
+    rows = models.StudentCourse.objects.filter(student_id=user.id, course__isDeleted=False) \
+        .order_by('course_id').values('course_id', 'course__name', 'course__teacher__name', 'course__course_profile_pic')
+    return [{
+        'id': row['course_id'],
+        'name': row['course__name'],
+        'teacher': row['course__teacher__name'],
+        'pic': models.Course._meta.get_field('course_profile_pic').storage.url(row['course__course_profile_pic'])
+        if row['course__course_profile_pic'] else '',
+    } for row in rows]
+
+
+def _teammates(user, course_ids):
+    '''{课程ID: 本人及组员的学生ID集合}，没有小组的课程只有本人'''
+    groups.memberships_many(course_ids)  # 未缓存的课程一次查询读入，下面逐课程读缓存
+    return {course_id: set(groups.teammates(course_id, user.id)) for course_id in course_ids}
+
+
+def _deadlines(user, course_ids):
+    today = timezone.localdate()
+    events = schedule.events_between(user, today, today + datetime.timedelta(days=DEADLINE_DAYS))
+    events = [e for e in events if e['course_id'] in course_ids]
+    if not events:
+        return []
+    group_assignments = set(models.Assignment.objects.filter(id__in=[e['id'] for e in events], is_group=True)
+                            .values_list('id', flat=True))
+    teammates = _teammates(user, {e['course_id'] for e in events if e['id'] in group_assignments})
+    students = {user.id}.union(*teammates.values())
+    submitted = set(submission.latest_uploaded(assignment_id__in=[e['id'] for e in events], student_id__in=students)
+                    .values_list('assignment_id', 'student_id'))
+    result = []
+    for e in events:
+        owners = teammates.get(e['course_id'], {user.id}) if e['id'] in group_assignments else {user.id}
+        result.append({
+            'id': e['id'],
+            'name': e['name'],
+            'date': e['date'].isoformat(),
+            'days_left': (e['date'] - today).days,
+            'course_id': e['course_id'],
+            'course': e['course'],
+            'url': e['url'],
+            'submitted': any((e['id'], sid) in submitted for sid in owners),
+        })
+    return result
+
+
+def _announces(course_ids, states, unread_count):
+    recent = models.Announce.objects.filter(course_id__in=course_ids) \
+        .select_related('course', 'teacher').order_by('-id')[:ANNOUNCE_LIMIT]
+    return {
+        'unread': unread_count,
+        'items': [{
+            'id': a.id,
+            'course_id': a.course_id,
+            'course': a.course.name,
+            'teacher': a.teacher.name,
+            'summary': _summary(a.announcement),
+            'created_at': a.created_at.isoformat(),
+            'unread': a.id > (states[a.course_id].lastSeenAnnounceId if a.course_id in states else 0),
+        } for a in recent],
+    }
+
+
+def _grades(user, course_ids):
+    '''已打分的任务（小组任务取组内最新一次提交），按打分时间倒序'''
+    teammates = _teammates(user, course_ids)
+    latest = {}
+    for row in submission.latest_graded(student_id__in={user.id}.union(*teammates.values()),
+                                        assignment__course_id__in=course_ids) \
+            .select_related('assignment__course', 'submission'):
+        if row.student_id != user.id and not row.assignment.is_group:
+            continue
+        if row.student_id not in teammates[row.assignment.course_id]:
+            continue
+        if row.assignment_id not in latest or row.submission_id > latest[row.assignment_id].submission_id:
+            latest[row.assignment_id] = row
+    rows = sorted(latest.values(), key=lambda row: row.submission.gradedAt, reverse=True)[:GRADE_LIMIT]
+    return [{
+        'assignment_id': row.assignment_id,
+        'assignment': row.assignment.name,
+        'course': row.assignment.course.name,
+        'marks': row.submission.marks,
+        'max_marks': row.submission.max_marks,
+        'submit_time': row.submission.submit_time.isoformat(),
+        'graded_at': row.submission.gradedAt.isoformat(),
+    } for row in rows]
+
+
+def _posts(user):
+    items, _ = feed.read_feed(user, limit=POST_LIMIT)
+    return [{
+        'id': post.postId,
+        'title': post.title,
+        'course': post.course.name if post.course_id else '',
+        'author': post.author.username,
+        'created_at': created_at.isoformat(),
+    } for created_at, _, post in items]
+
+
+def build(user, courses=None):
+    '''组装学生看板（不读缓存）
+
+    Args:
+        user (User): 学生
+        courses (list): 已读出的选课课程（见 _courses()），缺省时重新查询
+
+    Returns:
+        dict: courses、deadlines、announcements {unread, items}、grades、posts
+    '''
+    courses = _courses(user) if courses is None else courses
+    course_ids = [c['id'] for c in courses]
+    states = readstate.states_for(user, course_ids)
+    unread_posts = readstate.unread_counts_for(user, course_ids, states)
+    unread_announces = dict.fromkeys(course_ids, 0)
+    unread_announces.update(readstate.unread_announces(course_ids, states).order_by()
+                            .values('course_id').annotate(n=Count('id')).values_list('course_id', 'n'))
+    for course in courses:
+        course['unread_posts'] = unread_posts.get(course['id'], 0)
+        course['unread_announces'] = unread_announces[course['id']]
+    return {
+        'courses': courses,
+        'deadlines': _deadlines(user, set(course_ids)),
+        'announcements': _announces(course_ids, states, sum(unread_announces.values())),
+        'grades': _grades(user, course_ids),
+        'posts': _posts(user),
+    }
+
+
+def student_dashboard(user):
+    '''学生看板（带缓存）'''
+    entry = cache.get(_user_key(user.id))
+    if entry:
+        versions = cache.get_many([_course_key(cid) for cid in entry['courses']])
+        if versions == entry['versions']:
+            return entry['data']
+
+    # 先读版本再组装，组装期间的变化会让下次读取时版本不一致
+    courses = _courses(user)
+    course_ids = [c['id'] for c in courses]
+    versions = cache.get_many([_course_key(cid) for cid in course_ids])
+    data = build(user, courses)
+    cache.set(_user_key(user.id), {'courses': course_ids, 'versions': versions, 'data': data}, CACHE_TIMEOUT)
+    return data
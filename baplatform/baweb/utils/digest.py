@@ -0,0 +1,215 @@
+"""
+邮件摘要：即将截止的任务和新的课程通知
+
+collect() 为所有填写了邮箱的学生和老师组装摘要，查询次数固定，与收件人数无关：
+- 收件人（学生、老师）、选课记录、即将截止的任务、最新提交指针、新通知、发送进度各一次查询，
+  小组任务的同组成员取自 baweb/utils/groups.py
+- 学生：选课课程中截止日期在 EMAIL_DIGEST_DEADLINE_DAYS 天内且本人（小组任务为本组）还没有提交的任务，
+  以及上次摘要之后的课程通知（按 DigestState.lastAnnounceId；从未收到过摘要的只取最近
+  EMAIL_DIGEST_LOOKBACK_DAYS 天内的通知）
+- 老师：任课课程中即将截止的任务
+没有内容的用户不发送；今天已经收到过摘要（DigestState.sentAt 为今天）的用户也跳过，除非 force。
+
+send() 复用同一个邮件连接（SMTP 为同一个会话）分批发送，每批发送后保存这批收件人的进度（含 sentAt）。
+中途失败后当天重跑时，已发送批次的收件人按 sentAt 被跳过，只发送剩下的；force 时全部重发。
+全部发送成功后，本次没有内容（且没有被跳过）的收件人的通知进度也推进到 latest_announce_id；
+被跳过的收件人进度不变，下次摘要仍会包含他们还没收到的通知。
+后端由 EMAIL_BACKEND 决定，本地测试用 filebased / console 后端。
+"""
+
+import datetime
+import smtplib
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Max, Q
+from django.template.loader import get_template
+from django.utils import timezone
+
+from baweb import models
+from baweb.utils import groups, submission
+
+
+SUBJECT = '【课程平台】每日摘要'
+TEMPLATE = 'email/digest.txt'
+
+
+def _recipients():
+    '''{用户ID: {user_id, type, email, name}}'''
+    result = {}
+    for model, user_type in ((models.StudentInfo, 1), (models.TeacherInfo, 2)):
+        for user_id, email, name in model.objects.exclude(email='').values_list('user_id', 'email', 'name'):
+            result[user_id] = {'user_id': user_id, 'type': user_type, 'email': email, 'name': name}
+    return result
+
+
+def _upcoming(today):
+    end = today + datetime.timedelta(days=settings.EMAIL_DIGEST_DEADLINE_DAYS)
+    rows = models.Assignment.objects.filter(ddl__gte=today, ddl__lte=end, course__isDeleted=False) \
+        .values('id', 'name', 'ddl', 'is_group', 'course_id', 'course__name', 'course__teacher_id').order_by('ddl', 'id')
+    return [{
+        'id': row['id'],
+        'name': row['name'],
+        'ddl': row['ddl'],
+        'days_left': (row['ddl'] - today).days,
+        'is_group': row['is_group'],
+        'course_id': row['course_id'],
+        'course': row['course__name'],
+        'teacher_id': row['course__teacher_id'],
+        'url': f"{settings.EMAIL_DIGEST_SITE_URL}/assignment/{row['id']}/page",
+    } for row in rows]
+
+
+def _submitted(assignments):
+    '''{任务ID: 已提交的学生ID集合}，小组任务扩展到同组成员'''
+    result = {a['id']: set() for a in assignments}
+    for assignment_id, student_id in submission.latest_uploaded(
+            assignment_id__in=list(result)).values_list('assignment_id', 'student_id'):
+        result[assignment_id].add(student_id)
+    for a in assignments:
+        if a['is_group'] and result[a['id']]:
+            data = groups.memberships(a['course_id'])
+            for gid in {data['group_of'][sid] for sid in result[a['id']] if sid in data['group_of']}:
+                result[a['id']].update(data['members'][gid])
+    return result
+
+
+def _announces(course_ids, since_id, since_time, latest_id):
+    '''课程中 id 在 (since_id, latest_id] 内或创建时间不早于 since_time 的通知，按课程分组'''
+    result = {}
+    if not course_ids:
+        return result
+    rows = models.Announce.objects.filter(Q(id__gt=since_id) | Q(created_at__gte=since_time), id__lte=latest_id,
+                                          course_id__in=course_ids, course__isDeleted=False) \
+        .values('id', 'course_id', 'course__name', 'announcement', 'created_at').order_by('id')
+    for row in rows:
+        result.setdefault(row['course_id'], []).append(row)
+    return result
+
+
+def collect(today=None, force=False):
+    '''组装所有收件人的摘要
+
+    Args:
+        today (date): 缺省为今天（当前时区）
+        force (bool): 今天已经收到过摘要的用户也组装
+
+    Returns:
+        tuple: (digests, latest_announce_id, idle)。digests 为 [{user_id, email, name, deadlines, announces}]，
+        只含有内容的收件人；latest_announce_id 为本次截取的最大通知ID，发送后写入进度；
+        idle 为没有内容的收件人ID（不含今天已收到而跳过的），发送成功后同样推进进度
+    '''
+    today = today or timezone.localdate()
+    latest_id = models.Announce.objects.aggregate(m=Max('id'))['m'] or 0
+    recipients = _recipients()
+    if not recipients:
+        return [], latest_id, []
+    states = {}
+    sent_today = set()
+    for user_id, last_id, sent_at in models.DigestState.objects.values_list('user_id', 'lastAnnounceId', 'sentAt'):
+        states[user_id] = last_id
+        if timezone.localtime(sent_at).date() == today:
+            sent_today.add(user_id)
+    courses = {}
+    for student_id, course_id in models.StudentCourse.objects.exclude(student__email='') \
+            .filter(course__isDeleted=False).values_list('student_id', 'course_id'):
+        courses.setdefault(student_id, set()).add(course_id)
+
+    assignments = _upcoming(today)
+    submitted = _submitted(assignments)
+    since_time = timezone.now() - datetime.timedelta(days=settings.EMAIL_DIGEST_LOOKBACK_DAYS)
+    student_states = [states[uid] for uid, r in recipients.items() if r['type'] == 1 and uid in states]
+    announces = _announces(set().union(*courses.values()), min(student_states, default=latest_id), since_time, latest_id)
+
+    digests = []
+    idle = []
+    for user_id, recipient in recipients.items():
+        if user_id in sent_today and not force:
+            continue
+        if recipient['type'] == 1:
+            my_courses = courses.get(user_id, set())
+            deadlines = [a for a in assignments if a['course_id'] in my_courses and user_id not in submitted[a['id']]]
+            last_id = states.get(user_id)
+            new = [row for course_id in my_courses for row in announces.get(course_id, ())
+                   if (row['id'] > last_id if last_id is not None else row['created_at'] >= since_time)]
+            new.sort(key=lambda row: row['id'])
+        else:
+            deadlines = [a for a in assignments if a['teacher_id'] == user_id]
+            new = []
+        if deadlines or new:
+            digests.append(dict(recipient, deadlines=deadlines, announces=new))
+        else:
+            idle.append(user_id)
+    return digests, latest_id, idle
+
+
+def _message(template, digest, connection):
+    body = template.render({'digest': digest, 'site_url': settings.EMAIL_DIGEST_SITE_URL})
+    return EmailMessage(SUBJECT, body, to=[digest['email']], connection=connection)
+
+
+def _save_progress(user_ids, latest_id):
+    now = timezone.now()
+    with transaction.atomic():
+        existing = set(models.DigestState.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        models.DigestState.objects.filter(user_id__in=existing).update(lastAnnounceId=latest_id, sentAt=now)
+        models.DigestState.objects.bulk_create(
+            [models.DigestState(user_id=uid, lastAnnounceId=latest_id, sentAt=now) for uid in user_ids if uid not in existing],
+            batch_size=500)
+
+
+def _send_batch(connection, messages):
+    '''发送一批；连接被服务器断开时重连一次'''
+    try:
+        return connection.send_messages(messages)
+    except smtplib.SMTPServerDisconnected:
+        connection.close()
+        connection.open()
+        return connection.send_messages(messages)
+
+
+def send(digests, latest_id, backend=None, batch_size=None, idle=()):
+    '''分批发送摘要并保存进度
+
+    Args:
+        digests (list): collect() 的结果
+        latest_id (int): collect() 返回的最大通知ID
+        backend (str): 邮件后端，缺省为 EMAIL_BACKEND
+        batch_size (int): 每批邮件数，缺省为 EMAIL_DIGEST_BATCH_SIZE
+        idle (list): collect() 返回的没有内容的收件人ID
+
+    Returns:
+        int: 发送的邮件数
+    '''
+    batch_size = batch_size or settings.EMAIL_DIGEST_BATCH_SIZE
+    template = get_template(TEMPLATE)
+    connection = get_connection(backend)
+    connection.open()
+    sent = 0
+    try:
+        for start in range(0, len(digests), batch_size):
+            batch = digests[start:start + batch_size]
+            sent += _send_batch(connection, [_message(template, digest, connection) for digest in batch]) or 0
+            _save_progress([digest['user_id'] for digest in batch], latest_id)
+    finally:
+        connection.close()
+    # 全部发送成功：本次没有内容的收件人也已看过 latest_id 之前的通知，推进进度（今天被跳过的收件人不在其中）
+    models.DigestState.objects.filter(user_id__in=list(idle), lastAnnounceId__lt=latest_id) \
+        .update(lastAnnounceId=latest_id)
+    return sent
+
+
+def run(backend=None, batch_size=None, dry_run=False, force=False):
+    '''组装并发送摘要
+
+    Args:
+        force (bool): 今天已经收到过摘要的用户也发送
+
+    Returns:
+        dict: recipients 有内容的收件人数、sent 发送的邮件数
+    '''
+    digests, latest_id, idle = collect(force=force)
+    if dry_run:
+        return {'recipients': len(digests), 'sent': 0}
+    return {'recipients': len(digests), 'sent': send(digests, latest_id, backend, batch_size, idle)}
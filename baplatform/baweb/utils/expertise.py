@@ -0,0 +1,179 @@
+"""
+悬赏问题专家推荐
+
+把每个用户历史评论（尤其是被采纳的最佳答案）的文本哈希成固定维度的向量并增量累加，
+作为用户话题画像。新悬赏帖发布时，用一次矩阵乘法算出帖子与候选画像的余弦相似度，取 top-k。
+候选只取最佳答案数、回答数最多的 FORUM_EXPERT_CANDIDATES 个画像，推荐结果按帖子缓存
+FORUM_EXPERT_CACHE_SECONDS 秒（详情页每次打开都会展示推荐）。
+"""
+
+import re
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.html import strip_tags
+
+from baweb import models
+
+
+DIM = 1024
+COMMENT_WEIGHT = 1.0
+BEST_ANSWER_WEIGHT = 3.0
+
+_WORD_RE = re.compile(r'[a-z0-9_+#.]{2,}')
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]+')
+
+
+def _tokens(text):
+    '''英文按单词、中文按单字和相邻双字切分'''
+    text = strip_tags(text or '').lower()
+    for word in _WORD_RE.findall(text):
+        yield word
+    for run in _CJK_RE.findall(text):
+        for i, ch in enumerate(run):
+            yield ch
+            if i + 1 < len(run):
+                yield run[i:i + 2]
+
+
+def text_vector(text):
+    '''把文本哈希成 DIM 维 float32 词频向量
+
+    Args:
+        text (str): 文本（可包含HTML）
+
+    Returns:
+        numpy.ndarray: 形状为 (DIM,) 的向量
+    '''
+    vec = np.zeros(DIM, dtype=np.float32)
+    for token in _tokens(text):
+        vec[zlib.crc32(token.encode('utf-8')) % DIM] += 1.0
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec /= norm
+    return vec
+
+
+def _add_to_profile(user_id, vec, best_answer=False, comment_vec=None):
+    '''向量累加到画像，计数加一
+
+    画像不存在时新建；并发新建冲突时改为更新。最佳答案在画像不存在时说明这条评论还没有计入，
+    同时计入评论向量 comment_vec 和回答数（与 rebuild_profiles 一致）。
+    '''
+    with transaction.atomic():
+        profile = models.UserTopicProfile.objects.select_for_update().filter(user_id=user_id).first()
+        if profile is None:
+            try:
+                with transaction.atomic():
+                    models.UserTopicProfile.objects.create(
+                        user_id=user_id,
+                        vector=(vec if comment_vec is None else vec + comment_vec).tobytes(),
+                        answerCount=0 if best_answer and comment_vec is None else 1,
+                        bestAnswerCount=1 if best_answer else 0,
+                    )
+                return
+            except IntegrityError:
+                profile = models.UserTopicProfile.objects.select_for_update().get(user_id=user_id)
+        total = np.frombuffer(bytes(profile.vector), dtype=np.float32) + vec
+        models.UserTopicProfile.objects.filter(user_id=user_id).update(
+            vector=total.tobytes(),
+            answerCount=F('answerCount') + (0 if best_answer else 1),
+            bestAnswerCount=F('bestAnswerCount') + (1 if best_answer else 0),
+        )
+
+
+def record_comment(comment):
+    '''新评论计入评论者的话题画像（匿名评论不计入）'''
+    if comment.isAnonymous:
+        return
+    vec = text_vector(comment.post.title + ' ' + comment.content) * COMMENT_WEIGHT
+    _add_to_profile(comment.author_id, vec)
+
+
+def record_best_answer(comment):
+    '''被采纳的最佳答案以更高权重计入回答者的话题画像'''
+    if comment.isAnonymous:
+        return
+    post = comment.post
+    vec = text_vector(post.title + ' ' + post.content + ' ' + comment.content) * BEST_ANSWER_WEIGHT
+    comment_vec = text_vector(post.title + ' ' + comment.content) * COMMENT_WEIGHT
+    _add_to_profile(comment.author_id, vec, best_answer=True, comment_vec=comment_vec)
+
+
+def rebuild_profiles():
+    '''根据全部历史评论重建所有用户画像
+
+    Returns:
+        int: 生成的画像数
+    '''
+    vectors = {}
+    counts = {}
+    comments = models.PostComment.objects.filter(isAnonymous=False).select_related('post').only(
+        'author_id', 'content', 'isBestAnswer', 'post__title', 'post__content')
+    for comment in comments.iterator(chunk_size=2000):
+        post = comment.post
+        vec = text_vector(post.title + ' ' + comment.content) * COMMENT_WEIGHT
+        if comment.isBestAnswer:
+            vec = vec + text_vector(post.title + ' ' + post.content + ' ' + comment.content) * BEST_ANSWER_WEIGHT
+        uid = comment.author_id
+        if uid in vectors:
+            vectors[uid] += vec
+        else:
+            vectors[uid] = vec
+        answers, best = counts.get(uid, (0, 0))
+        counts[uid] = (answers + 1, best + (1 if comment.isBestAnswer else 0))
+
+    with transaction.atomic():
+        models.UserTopicProfile.objects.all().delete()
+        models.UserTopicProfile.objects.bulk_create([
+            models.UserTopicProfile(user_id=uid, vector=vec.tobytes(),
+                                    answerCount=counts[uid][0], bestAnswerCount=counts[uid][1])
+            for uid, vec in vectors.items()
+        ], batch_size=500)
+    return len(vectors)
+
+
+def suggest_experts(post, k=5):
+    '''为悬赏帖推荐最可能回答的 k 个用户
+
+    Args:
+        post (Post): 悬赏帖
+        k (int): 推荐人数
+
+    Returns:
+        list: [(User, score)]，按相似度降序
+    '''
+    key = f'expertise:suggest:{post.id}:{k}'
+    ranked = cache.get(key)
+    if ranked is None:
+        ranked = _rank(post, k)
+        cache.set(key, ranked, settings.FORUM_EXPERT_CACHE_SECONDS)
+    users = models.User.objects.in_bulk([uid for uid, _ in ranked])
+    return [(users[uid], score) for uid, score in ranked if uid in users]
+
+
+def _rank(post, k):
+    '''候选画像与帖子的相似度 top-k：[(用户ID, score)]'''
+    rows = list(models.UserTopicProfile.objects.exclude(user_id=post.author_id)
+                .order_by('-bestAnswerCount', '-answerCount', '-updatedAt')
+                .values_list('user_id', 'vector')[:settings.FORUM_EXPERT_CANDIDATES])
+    if not rows:
+        return []
+    query = text_vector(post.title + ' ' + post.content)
+    if not query.any():
+        return []
+
+    user_ids = np.array([row[0] for row in rows])
+    matrix = np.frombuffer(b''.join(bytes(row[1]) for row in rows), dtype=np.float32).reshape(len(rows), DIM)
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1.0
+    scores = matrix @ query / norms
+
+    k = min(k, len(rows))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [(int(user_ids[i]), float(scores[i])) for i in top if scores[i] > 0]
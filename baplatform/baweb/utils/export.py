@@ -0,0 +1,80 @@
+"""
+表格导出（CSV / XLSX）
+
+rows 为逐行生成的可迭代对象：
+- CSV：StreamingHttpResponse 边生成边发送
+- XLSX：openpyxl 只写模式逐行写入临时文件，再以文件流返回
+两种方式的内存占用都与行数无关。
+
+以 = + - @ 或制表符、回车开头的文本单元格前加单引号，防止在 Excel 中被当作公式执行（CSV / 公式注入）。
+"""
+
+import csv
+import tempfile
+from urllib.parse import quote
+
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from openpyxl import Workbook
+
+
+FORMATS = ('csv', 'xlsx')
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Echo(object):
+    '''csv.writer 的伪文件：writerow() 直接返回格式化后的一行'''
+    def write(self, value):
+        return value
+
+
+def _escape(row):
+    '''文本单元格中可能被解释为公式的值前加单引号'''
+    return [("'" + value if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value) for value in row]
+
+
+def _disposition(filename):
+    return "attachment; filename*=UTF-8''{}".format(quote(filename))
+
+
+def csv_response(filename, header, rows):
+    writer = csv.writer(_Echo())
+
+    def stream():
+        yield '\ufeff' + writer.writerow(_escape(header))  # BOM，Excel 打开不乱码
+        for row in rows:
+            yield writer.writerow(_escape(row))
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = _disposition(filename)
+    return response
+
+
+def xlsx_response(filename, header, rows, sheet_title='Sheet1'):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    sheet.append(_escape(header))
+    for row in rows:
+        sheet.append(_escape(row))
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    response = FileResponse(output, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = _disposition(filename)
+    return response
+
+
+def response(fmt, basename, header, rows, sheet_title='Sheet1'):
+    '''按格式返回导出响应
+
+    Args:
+        fmt (str): csv / xlsx
+        basename (str): 不含扩展名的文件名
+        header (list): 表头
+        rows (iterable): 数据行
+    '''
+    if fmt not in FORMATS:
+        raise Http404
+    filename = '{}.{}'.format(basename, fmt)
+    if fmt == 'csv':
+        return csv_response(filename, header, rows)
+    return xlsx_response(filename, header, rows, sheet_title)
@@ -0,0 +1,141 @@
+"""
+个人动态流（写扩散 + 大课程读扩散）
+
+发帖时把帖子批量写入相关用户的 FeedEntry，读取时按 (user, createdAt) 索引做一次范围扫描。
+选课人数超过 FORUM_FEED_FANOUT_LIMIT 的课程不做写扩散，读取时再从 Post 表按课程合并。
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from baweb import models
+
+
+FANOUT_BATCH_SIZE = 500
+
+
+def _fanout_limit():
+    return getattr(settings, 'FORUM_FEED_FANOUT_LIMIT', 2000)
+
+
+def _push(user_ids, post, reason, created_at=None):
+    '''把帖子推送到一批用户的动态流
+
+    已存在的同一帖子记录更新推送时间和原因，使其回到动态流顶部，其余插入。
+    同一帖子的并发推送（如同时有评论和回复）在唯一约束 (user, post) 上冲突时忽略，不会报错。
+
+    Args:
+        user_ids (iterable): 接收用户ID
+        post (Post): 帖子
+        reason (int): 推送原因，见 FeedEntry.reason_choices
+        created_at (datetime): 推送时间，默认当前时间
+    '''
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return 0
+    created_at = created_at or timezone.now()
+    for start in range(0, len(user_ids), FANOUT_BATCH_SIZE):
+        batch = user_ids[start:start + FANOUT_BATCH_SIZE]
+        with transaction.atomic():
+            models.FeedEntry.objects.filter(post=post, user_id__in=batch) \
+                .update(reason=reason, createdAt=created_at)
+            models.FeedEntry.objects.bulk_create([
+                models.FeedEntry(user_id=uid, post=post, reason=reason, createdAt=created_at)
+                for uid in batch
+            ], ignore_conflicts=True)
+    return len(user_ids)
+
+
+def large_course_ids(course_ids=None):
+    '''选课人数超过写扩散上限的课程ID集合'''
+    query = models.StudentCourse.objects.all()
+    if course_ids is not None:
+        query = query.filter(course_id__in=course_ids)
+    rows = query.values('course_id').annotate(n=Count('id')).filter(n__gt=_fanout_limit())
+    return {row['course_id'] for row in rows}
+
+
+def fanout_post(post):
+    '''新帖写扩散
+
+    - 课程帖：推送给选课学生和任课老师（大课程跳过，读取时合并）
+    - 老师发的帖：推送给该老师所有课程的学生
+
+    Args:
+        post (Post): 新创建的帖子
+
+    Returns:
+        int: 推送的用户数
+    '''
+    author = post.author
+    pushed = 0
+    if post.course_id and post.course_id not in large_course_ids([post.course_id]):
+        user_ids = set(models.StudentCourse.objects.filter(
+            course_id=post.course_id).values_list('student_id', flat=True))
+        user_ids.add(post.course.teacher_id)
+        user_ids.discard(author.id)
+        pushed += _push(user_ids, post, 1, post.createdAt)
+
+    if author.type == 2:
+        course_ids = set(models.Course.objects.filter(teacher_id=author.id).values_list('id', flat=True))
+        course_ids -= large_course_ids(course_ids)
+        course_ids.discard(post.course_id)
+        user_ids = set(models.StudentCourse.objects.filter(
+            course_id__in=course_ids).values_list('student_id', flat=True))
+        user_ids.discard(author.id)
+        pushed += _push(user_ids, post, 2, post.createdAt)
+    return pushed
+
+
+def fanout_reply(post, replier):
+    '''收藏的帖子有新回复时，推送给所有收藏者
+
+    Args:
+        post (Post): 被回复的帖子
+        replier (User): 回复者（不推送给自己）
+    '''
+    user_ids = set(models.PostCollect.objects.filter(post=post).values_list('user_id', flat=True))
+    user_ids.discard(replier.id)
+    return _push(user_ids, post, 3)
+
+
+def read_feed(user, before=None, limit=20):
+    '''读取动态流一页（按时间倒序的键集分页）
+
+    同一时间的记录（同一次推送）以帖子ID为第二排序键，翻页时不会漏掉或重复。
+
+    Args:
+        user (User): 当前用户
+        before (tuple): 游标 (createdAt, 帖子ID)，只返回排在其后的记录
+        limit (int): 每页条数
+
+    Returns:
+        tuple: (items, next_cursor)，items 为 (createdAt, reason, post) 列表，
+        next_cursor 为最后一条的 (createdAt, 帖子ID)
+    '''
+    entries = models.FeedEntry.objects.filter(user=user, post__isDeleted=False)
+    if before:
+        entries = entries.filter(Q(createdAt__lt=before[0]) | Q(createdAt=before[0], post_id__lt=before[1]))
+    entries = entries.select_related('post', 'post__author', 'post__course', 'post__category')
+    items = [(e.createdAt, e.reason, e.post) for e in entries.order_by('-createdAt', '-post_id')[:limit]]
+
+    # 大课程读扩散：从 Post 表按课程合并
+    if user.type == 1:
+        my_course_ids = models.StudentCourse.objects.filter(student_id=user.id, course__isDeleted=False).values_list('course_id', flat=True)
+    else:
+        my_course_ids = models.Course.objects.filter(teacher_id=user.id).values_list('id', flat=True)
+    pull_ids = large_course_ids(set(my_course_ids))
+    if pull_ids:
+        posts = models.Post.objects.filter(course_id__in=pull_ids).exclude(author=user)
+        if before:
+            posts = posts.filter(Q(createdAt__lt=before[0]) | Q(createdAt=before[0], id__lt=before[1]))
+        posts = posts.select_related('author', 'course', 'category').order_by('-createdAt', '-id')[:limit]
+        seen = {post.id for _, _, post in items}
+        items.extend((p.createdAt, 1, p) for p in posts if p.id not in seen)
+        items.sort(key=lambda item: (item[0], item[2].id), reverse=True)
+        items = items[:limit]
+
+    next_cursor = (items[-1][0], items[-1][2].id) if len(items) == limit else None
+    return items, next_cursor
@@ -0,0 +1,168 @@
+"""
+课程成绩册（学生 × 任务矩阵）
+
+一门课程固定三次查询：任务、选课学生、已打分的最新提交指针（submission.latest_graded()，按提交顺序），
+小组成员见 baweb/utils/groups.py，在内存中完成小组成绩共享（组内最新的一次为准），
+再汇总每个学生的总分和每个任务的平均分。还没有打分的上传不算成绩，与成绩统计（gradestats.py）一致。
+
+导出大课程时用 iter_rows() 按学生分块读取提交，内存占用与课程人数无关。
+"""
+
+from collections import OrderedDict
+
+from baweb import models
+from baweb.utils import groups, submission
+
+
+DEFAULT_MAX_MARKS = 100
+CHUNK_SIZE = 200
+
+
+def _assignments(course):
+    return list(models.Assignment.objects.filter(course=course)
+                .order_by('ddl', 'id').values('id', 'name', 'is_group', 'ddl'))
+
+
+def _owner(student_id, is_group, group_of):
+    '''成绩归属：小组任务归小组，其余归学生本人'''
+    if is_group and student_id in group_of:
+        return ('group', group_of[student_id])
+    return student_id
+
+
+def _latest(submits, assignments, group_of):
+    '''同一 (任务, 学生/小组) 按提交顺序逐条覆盖，即最后一次提交为准'''
+    group_assignments = {a['id'] for a in assignments if a['is_group']}
+    latest = {}
+    for submit_id, assignment_id, student_id, marks, max_mark in submits:
+        owner = _owner(student_id, assignment_id in group_assignments, group_of)
+        latest[(assignment_id, owner)] = {'marks': marks, 'max_marks': max_mark, 'submit_id': submit_id}
+    return latest
+
+
+def last_max_marks(submits):
+    '''任务满分：每个任务取最后一次已打分提交（按提交顺序）的满分，成绩册和成绩统计共用
+
+    Args:
+        submits (iterable): 按提交顺序的 (任务ID, 满分)
+
+    Returns:
+        dict: {任务ID: 满分}，没有已打分提交的任务不在其中（调用方按 DEFAULT_MAX_MARKS 计）
+    '''
+    max_marks = {}
+    for assignment_id, max_mark in submits:
+        max_marks[assignment_id] = max_mark
+    return max_marks
+
+
+def _row(student, assignments, latest, max_marks, group_of):
+    student_id, username, name = student
+    cells = []
+    total = 0
+    max_total = 0
+    for a in assignments:
+        cell = latest.get((a['id'], _owner(student_id, a['is_group'], group_of)))
+        cells.append(cell)
+        max_total += max_marks.get(a['id'], DEFAULT_MAX_MARKS)
+        if cell:
+            total += cell['marks']
+    return {
+        'student_id': student_id,
+        'username': username,
+        'name': name,
+        'group_id': group_of.get(student_id),
+        'cells': cells,
+        'total': total,
+        'max_total': max_total,
+        'percent': round(total * 100.0 / max_total, 1) if max_total else 0,
+    }
+
+
+def _submits(**filters):
+    return submission.latest_graded(**filters).order_by('submission_id') \
+        .values_list('submission_id', 'assignment_id', 'student_id', 'submission__marks', 'submission__max_marks')
+
+
+def _roster(course):
+    return models.StudentCourse.objects.filter(course=course) \
+        .order_by('student__user__username') \
+        .values_list('student_id', 'student__user__username', 'student__name')
+
+
+def build(course, student_ids=None):
+    '''计算课程成绩册
+
+    Args:
+        course (Course): 课程
+        student_ids (iterable): 只返回这些学生的行（学生查看自己的成绩），平均分仍按全班计算；None 表示全部
+
+    Returns:
+        dict:
+            assignments: [{id, name, is_group, ddl, max_marks, submitted, average}]
+            rows: [{student_id, username, name, group_id, cells, total, max_total, percent}]，
+                  cells 与 assignments 一一对应，没有成绩为 None，否则为 {marks, max_marks, submit_id}
+            average_total: 所有学生总分的平均值
+    '''
+    assignments = _assignments(course)
+    students = list(_roster(course))
+    group_of = groups.group_of(course.id)
+
+    submits = list(_submits(assignment__course=course))
+    latest = _latest(submits, assignments, group_of)
+    max_marks = last_max_marks((assignment_id, max_mark) for _, assignment_id, _, _, max_mark in submits)
+
+    rows = [_row(student, assignments, latest, max_marks, group_of) for student in students]
+
+    column_marks = OrderedDict((a['id'], []) for a in assignments)
+    for row in rows:
+        for a, cell in zip(assignments, row['cells']):
+            if cell:
+                column_marks[a['id']].append(cell['marks'])
+    for a in assignments:
+        marks = column_marks[a['id']]
+        a['max_marks'] = max_marks.get(a['id'], DEFAULT_MAX_MARKS)
+        a['submitted'] = len(marks)
+        a['average'] = round(sum(marks) / len(marks), 1) if marks else None
+    average_total = round(sum(r['total'] for r in rows) / len(rows), 1) if rows else None
+    if student_ids is not None:
+        student_ids = set(student_ids)
+        rows = [row for row in rows if row['student_id'] in student_ids]
+    return {'assignments': assignments, 'rows': rows, 'average_total': average_total}
+
+
+def iter_rows(course, chunk_size=CHUNK_SIZE):
+    '''按学生分块逐行生成成绩册（用于导出）
+
+    每块只读取本块学生（及其组员）的提交，不做全班平均。
+
+    Returns:
+        tuple: (assignments, rows 生成器)
+    '''
+    assignments = _assignments(course)
+    memberships = groups.memberships(course.id)
+    group_of, members = memberships['group_of'], memberships['members']
+    max_marks = last_max_marks(submission.latest_graded(assignment__course=course).order_by('submission_id')
+                               .values_list('assignment_id', 'submission__max_marks').iterator(chunk_size=2000))
+    for a in assignments:
+        a['max_marks'] = max_marks.get(a['id'], DEFAULT_MAX_MARKS)
+
+    def flush(chunk):
+        ids = {student[0] for student in chunk}
+        for student_id in list(ids):
+            ids.update(members.get(group_of.get(student_id), ()))
+        submits = _submits(assignment__course=course, student_id__in=ids)
+        latest = _latest(submits, assignments, group_of)
+        for student in chunk:
+            yield _row(student, assignments, latest, max_marks, group_of)
+
+    def rows():
+        chunk = []
+        for student in _roster(course).iterator(chunk_size=chunk_size):
+            chunk.append(student)
+            if len(chunk) >= chunk_size:
+                yield from flush(chunk)
+                chunk = []
+        if chunk:
+            yield from flush(chunk)
+
+    return assignments, rows()
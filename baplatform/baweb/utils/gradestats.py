@@ -0,0 +1,243 @@
+"""
+成绩统计（任务和课程）
+
+一门课程已打分的最新提交指针（submission.latest_graded()）一次查询读入 NumPy 数组，
+与成绩册一致地取「最后一次提交为准、小组任务组内共享」，展开成 任务 × 学生 的分数矩阵（没有成绩为 NaN），
+之后的统计全部是数组运算：
+- 每个任务：人数、平均分、中位数、标准差、最低/最高分、四分位和 90 分位、按得分率分段的直方图、各小组平均分
+- 课程：每个学生总得分率的同样统计和直方图，以及各任务的平均得分率和提交率
+
+结果按任务缓存（一次计算写入本课程所有任务）；提交或打分变化时删除该任务和课程汇总的缓存，
+选课、小组、任务变化时更新课程版本（见 baweb/signals.py）。
+"""
+
+import uuid
+import warnings
+
+import numpy as np
+from django.core.cache import cache
+
+from baweb import models
+from baweb.utils import gradebook, groups, submission
+
+
+CACHE_TIMEOUT = 600
+DEFAULT_MAX_MARKS = gradebook.DEFAULT_MAX_MARKS
+PERCENTILES = (25, 75, 90)
+BIN_LABELS = ['0-9', '10-19', '20-29', '30-39', '40-49', '50-59', '60-69', '70-79', '80-89', '90-100']
+
+
+def _assignment_key(assignment_id):
+    return f'gradestats:assignment:{assignment_id}'
+
+
+def _summary_key(course_id):
+    return f'gradestats:summary:{course_id}'
+
+
+def _course_key(course_id):
+    return f'gradestats:course:{course_id}'
+
+
+def invalidate_assignment(assignment_id, course_id):
+    '''任务的提交或分数变化'''
+    cache.delete_many([_assignment_key(assignment_id), _summary_key(course_id)])
+
+
+def invalidate_course(course_id):
+    '''选课、小组或任务变化：该课程所有统计缓存失效'''
+    cache.set(_course_key(course_id), uuid.uuid4().hex, None)
+
+
+def _lookup(keys, values, query, default=0):
+    '''values[keys == query] 的向量化版本（keys 已排序），找不到时为 default'''
+    if not len(keys):
+        return np.full(len(query), default, dtype=np.int64)
+    pos = np.clip(np.searchsorted(keys, query), 0, len(keys) - 1)
+    return np.where(keys[pos] == query, values[pos], default)
+
+
+def _matrix(course):
+    '''任务 × 学生 的分数矩阵
+
+    Returns:
+        dict: assignments、student_ids、group_ids（每个学生所在小组，0 表示无）、
+              marks / max_marks（float 矩阵，没有成绩为 NaN）、column_max（每个任务的满分）
+    '''
+    assignments = list(models.Assignment.objects.filter(course=course).order_by('ddl', 'id')
+                       .values('id', 'name', 'is_group'))
+    student_ids = np.array(sorted(models.StudentCourse.objects.filter(course=course)
+                                  .values_list('student_id', flat=True)), dtype=np.int64)
+    members = np.array(list(groups.group_of(course.id).items()), dtype=np.int64).reshape(-1, 2)
+    members = members[np.argsort(members[:, 0], kind='stable')]
+    submits = np.array(list(submission.latest_graded(assignment__course=course).order_by('submission_id')
+                            .values_list('assignment_id', 'student_id', 'submission__marks', 'submission__max_marks')),
+                       dtype=np.int64).reshape(-1, 4)
+
+    n_a, n_s = len(assignments), len(student_ids)
+    a_ids = np.array([a['id'] for a in assignments], dtype=np.int64)
+    a_order = np.argsort(a_ids)
+    is_group = np.array([a['is_group'] for a in assignments], dtype=bool)
+    group_ids = _lookup(members[:, 0], members[:, 1], student_ids)
+
+    # 成绩归属：小组任务且学生有小组时归小组（用负的小组ID表示），否则归学生本人
+    sub_a = a_order[np.searchsorted(a_ids[a_order], submits[:, 0])] if n_a else np.zeros(0, dtype=np.int64)
+    sub_group = _lookup(members[:, 0], members[:, 1], submits[:, 1])
+    sub_owner = np.where(is_group[sub_a] & (sub_group > 0), -sub_group, submits[:, 1]) if len(submits) else submits[:, 1]
+    cell_owner = np.where(is_group[:, None] & (group_ids[None, :] > 0), -group_ids[None, :], student_ids[None, :])
+
+    owners, owner_index = np.unique(np.concatenate([sub_owner, cell_owner.ravel()]), return_inverse=True)
+    sub_index, cell_index = owner_index[:len(sub_owner)], owner_index[len(sub_owner):].reshape(n_a, n_s)
+
+    # 同一 (任务, 归属) 按提交顺序取最后一条（小组任务为组内成员中最新的一次）
+    key = sub_a * len(owners) + sub_index
+    _, last_rev = np.unique(key[::-1], return_index=True)
+    last = len(key) - 1 - last_rev
+
+    marks = np.full((n_a, len(owners)), np.nan)
+    max_marks = np.full((n_a, len(owners)), np.nan)
+    marks[sub_a[last], sub_index[last]] = submits[last, 2]
+    max_marks[sub_a[last], sub_index[last]] = submits[last, 3]
+    rows = np.arange(n_a)[:, None]
+    last_max = gradebook.last_max_marks(submits[:, [0, 3]].tolist())
+    return {
+        'assignments': assignments,
+        'student_ids': student_ids,
+        'group_ids': group_ids,
+        'marks': marks[rows, cell_index],
+        'max_marks': max_marks[rows, cell_index],
+        'column_max': np.array([last_max.get(a['id'], DEFAULT_MAX_MARKS) for a in assignments], dtype=float),
+    }
+
+
+def _round(values, digits=1):
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def _describe(values):
+    '''按行统计（忽略 NaN），返回每行一个 dict'''
+    count = np.sum(~np.isnan(values), axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 整行为空时的 Mean of empty slice
+        columns = {
+            'mean': _round(np.nanmean(values, axis=1), 2),
+            'median': _round(np.nanmedian(values, axis=1)),
+            'std': _round(np.nanstd(values, axis=1), 2),
+            'min': _round(np.nanmin(values, axis=1) if values.size else np.full(len(values), np.nan)),
+            'max': _round(np.nanmax(values, axis=1) if values.size else np.full(len(values), np.nan)),
+        }
+        quantiles = np.nanpercentile(values, PERCENTILES, axis=1) if values.size else \
+            np.full((len(PERCENTILES), len(values)), np.nan)
+    for p, q in zip(PERCENTILES, quantiles):
+        columns[f'p{p}'] = _round(q)
+    return [dict({'count': int(count[i])}, **{k: v[i] for k, v in columns.items()}) for i in range(len(values))]
+
+
+def _histogram(percent):
+    '''按得分率 10 分一段计数（100 分计入最后一段），每行一个列表'''
+    n_rows = len(percent)
+    row, col = np.nonzero(~np.isnan(percent))
+    bins = np.clip((percent[row, col] // 10).astype(np.int64), 0, len(BIN_LABELS) - 1)
+    counts = np.bincount(row * len(BIN_LABELS) + bins, minlength=n_rows * len(BIN_LABELS))
+    return counts.reshape(n_rows, len(BIN_LABELS)).tolist()
+
+
+def _group_means(marks, group_ids, group_names):
+    '''每个任务各小组的平均分和人数'''
+    in_group = group_ids > 0
+    if not in_group.any():
+        return [[] for _ in range(len(marks))]
+    groups, g_index = np.unique(group_ids[in_group], return_inverse=True)
+    values = marks[:, in_group]
+    valid = ~np.isnan(values)
+    n_g = len(groups)
+    flat = (np.arange(len(marks))[:, None] * n_g + g_index[None, :])[valid]
+    sums = np.bincount(flat, weights=values[valid], minlength=len(marks) * n_g).reshape(-1, n_g)
+    counts = np.bincount(flat, minlength=len(marks) * n_g).reshape(-1, n_g)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    return [[
+        {'group': int(g), 'name': group_names.get(int(g), ''), 'count': int(c), 'mean': m}
+        for g, c, m in zip(groups, counts[i], _round(means[i], 2))
+    ] for i in range(len(marks))]
+
+
+def compute(course):
+    '''计算课程所有任务的统计和课程汇总（不读缓存）
+
+    Returns:
+        tuple: ({任务ID: 任务统计}, 课程汇总)
+    '''
+    data = _matrix(course)
+    assignments, marks, max_marks = data['assignments'], data['marks'], data['max_marks']
+    n_students = len(data['student_ids'])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percent = marks / max_marks * 100
+
+    group_names = dict(models.Group.objects.filter(course=course).values_list('id', 'name'))
+    described = _describe(marks)
+    described_percent = _describe(percent)
+    histograms = _histogram(percent)
+    group_means = _group_means(marks, data['group_ids'], group_names)
+
+    per_assignment = {}
+    for i, a in enumerate(assignments):
+        per_assignment[a['id']] = dict(
+            described[i],
+            assignment=a['id'],
+            name=a['name'],
+            is_group=a['is_group'],
+            enrolled=n_students,
+            percent=described_percent[i],
+            histogram={'labels': BIN_LABELS, 'counts': histograms[i]},
+            groups=group_means[i],
+        )
+
+    # 课程汇总：未提交的任务按 0 分计，满分取该任务最后一次已打分提交的满分（gradebook.last_max_marks，与成绩册一致）
+    column_max = data['column_max']
+    totals = np.nansum(marks, axis=0)
+    max_total = column_max.sum()
+    student_percent = (totals / max_total * 100 if max_total else np.full(n_students, np.nan))[None, :]
+    submitted = np.sum(~np.isnan(marks), axis=1)
+    summary = dict(
+        _describe(student_percent)[0],
+        course=course.id,
+        enrolled=n_students,
+        max_total=float(max_total),
+        histogram={'labels': BIN_LABELS, 'counts': _histogram(student_percent)[0]},
+        assignments=[{
+            'assignment': a['id'],
+            'name': a['name'],
+            'mean_percent': described_percent[i]['mean'],
+            'submit_rate': round(float(submitted[i]) * 100 / n_students, 1) if n_students else None,
+        } for i, a in enumerate(assignments)],
+    )
+    return per_assignment, summary
+
+
+def _refresh(course, version):
+    per_assignment, summary = compute(course)
+    entries = {_assignment_key(aid): {'version': version, 'stats': stats} for aid, stats in per_assignment.items()}
+    entries[_summary_key(course.id)] = {'version': version, 'stats': summary}
+    cache.set_many(entries, CACHE_TIMEOUT)
+    return per_assignment, summary
+
+
+def assignment_stats(assignment):
+    '''任务的成绩统计（带缓存）'''
+    version = cache.get(_course_key(assignment.course_id))
+    entry = cache.get(_assignment_key(assignment.id))
+    if entry and entry['version'] == version:
+        return entry['stats']
+    per_assignment, _ = _refresh(assignment.course, version)
+    return per_assignment[assignment.id]
+
+
+def course_stats(course):
+    '''课程成绩汇总（带缓存）'''
+    version = cache.get(_course_key(course.id))
+    entry = cache.get(_summary_key(course.id))
+    if entry and entry['version'] == version:
+        return entry['stats']
+    _, summary = _refresh(course, version)
+    return summary
@@ -0,0 +1,235 @@
+"""
+批量打分
+
+apply_marks() 接收 [{student, marks, max_marks}]（student 为学生用户ID，也可用 username 指定学号）：
+- 选课名单、该任务的已有提交各一次查询，（小组任务）小组成员取自 baweb/utils/groups.py，在内存中校验
+- 任一行不合法则整批拒绝并返回逐行错误；全部合法时在一个事务中 bulk_update 已有提交，
+  没有提交的学生补一条只有分数的提交记录（与单个打分 marks_enter 一致）
+- 小组任务的分数写入组内所有成员的提交；组内都没有提交时只为该学生补一条
+- 分数有变化的学生收到成绩通知（见 baweb/utils/inbox.py）
+
+bulk_update 不修改 submit_time，打分不会让提交变成「逾期」。
+read_marks() 读取老师上传的成绩表（xlsx / csv / tsv，首行为表头：学号、分数，可选满分）。
+"""
+
+import csv
+import io
+import os
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from baweb import models
+from baweb.utils import dashboard, gradestats, groups, inbox, latest, outbox, roster, submission
+
+
+USERNAME_HEADERS = ('学号', 'username')
+MARKS_HEADERS = ('分数', '成绩', 'marks')
+MAX_MARKS_HEADERS = ('满分', '最大分数', 'max_marks')
+DEFAULT_MAX_MARKS = 100
+SMALLINT_MAX = 32767
+
+
+class MarksError(Exception):
+    '''成绩表无法解析'''
+
+
+def _int(value):
+    '''整数分数；接受 85、85.0、"85"，其他返回 None'''
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _table(file_obj):
+    ext = os.path.splitext(file_obj.name or '')[1].lower()
+    if ext in ('.csv', '.tsv', '.txt'):
+        text = io.TextIOWrapper(file_obj, encoding='utf-8-sig', errors='replace', newline='')
+        for row in csv.reader(text, delimiter=',' if ext == '.csv' else '\t'):
+            yield row
+        return
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def _find(header, names):
+    for index, title in enumerate(header):
+        if _text(title).lower() in names:
+            return index
+    return None
+
+
+def read_marks(file_obj):
+    '''读取成绩表
+
+    Returns:
+        list: [{line, username, marks, max_marks}]，marks / max_marks 保留原值由 apply_marks() 校验
+
+    Raises:
+        MarksError: 文件无法解析或缺少学号 / 分数列
+    '''
+    try:
+        rows = _table(file_obj)
+        header = next(rows, [])
+        username_col = _find(header, USERNAME_HEADERS)
+        marks_col = _find(header, MARKS_HEADERS)
+        max_col = _find(header, MAX_MARKS_HEADERS)
+        if username_col is None or marks_col is None:
+            raise MarksError('表头需要包含「学号」和「分数」列')
+        entries = []
+        for line, row in enumerate(rows, 2):
+            row = list(row) + [None] * len(header)
+            username = _text(row[username_col])
+            if not username:
+                continue
+            entries.append({
+                'line': line,
+                'username': username,
+                'marks': row[marks_col],
+                'max_marks': row[max_col] if max_col is not None and row[max_col] not in (None, '') else None,
+            })
+        return entries
+    except roster.FORMAT_ERRORS:
+        raise MarksError('文件格式错误，请上传 xlsx / csv / tsv 成绩表')
+
+
+def _resolve(entries, enrolled, by_username):
+    '''校验每一行，返回 ({学生ID: (marks, max_marks)}, errors)'''
+    grades = {}
+    errors = []
+    for index, entry in enumerate(entries):
+        line = entry.get('line', index + 1)
+        if 'student' in entry:
+            student_id = _int(entry['student'])
+            label = entry['student']
+        else:
+            label = _text(entry.get('username'))
+            student_id = by_username.get(label)
+        marks = _int(entry.get('marks'))
+        max_marks = DEFAULT_MAX_MARKS if entry.get('max_marks') is None else _int(entry['max_marks'])
+
+        if student_id not in enrolled:
+            errors.append({'line': line, 'student': label, 'reason': '不是本课程的学生'})
+        elif max_marks is None or not 0 < max_marks <= SMALLINT_MAX:
+            errors.append({'line': line, 'student': label, 'reason': '满分不合法'})
+        elif marks is None or not 0 <= marks <= max_marks:
+            errors.append({'line': line, 'student': label, 'reason': '分数不合法'})
+        elif student_id in grades and grades[student_id] != (marks, max_marks):
+            errors.append({'line': line, 'student': label, 'reason': '与前面的分数冲突'})
+        else:
+            grades[student_id] = (marks, max_marks)
+    return grades, errors
+
+
+def _propagate(grades, group_of, members, errors):
+    '''小组任务：把分数扩展到同组所有成员，同组给出不同分数视为冲突'''
+    result = dict(grades)
+    by_group = {}
+    for student_id, grade in grades.items():
+        group_id = group_of.get(student_id)
+        if group_id is None:
+            continue
+        if by_group.setdefault(group_id, grade) != grade:
+            errors.append({'line': None, 'student': student_id, 'reason': '同组成员的分数不一致'})
+            continue
+        for member_id in members[group_id]:
+            result[member_id] = grade
+    return result
+
+
+def apply_marks(assignment, entries):
+    '''批量打分（全部成功或全部不生效）
+
+    Args:
+        assignment (Assignment): 任务
+        entries (list): [{student 或 username, marks, max_marks}]，max_marks 缺省为 100
+
+    Returns:
+        dict: ok、errors（逐行错误）、graded 打分学生数、updated 更新的提交数、created 补建的提交数
+    '''
+    enrolled = set(models.StudentCourse.objects.filter(course_id=assignment.course_id)
+                   .values_list('student_id', flat=True))
+    usernames = {_text(entry['username']) for entry in entries if 'student' not in entry and entry.get('username')}
+    by_username = dict(models.User.objects.filter(username__in=usernames, id__in=enrolled)
+                       .values_list('username', 'id')) if usernames else {}
+
+    grades, errors = _resolve(entries, enrolled, by_username)
+    group_of = {}
+    if assignment.is_group and not errors:
+        memberships = groups.memberships(assignment.course_id)
+        group_of = memberships['group_of']
+        grades = _propagate(grades, group_of, memberships['members'], errors)
+    if errors:
+        return {'ok': False, 'errors': errors, 'graded': 0, 'updated': 0, 'created': 0}
+
+    now = timezone.now()
+    with transaction.atomic():
+        changed = []
+        has_submit = set()
+        for submit in models.AssignmentSubmit.objects.filter(assignment=assignment):
+            if submit.student_id not in grades:
+                continue
+            has_submit.add(submit.student_id)
+            marks, max_marks = grades[submit.student_id]
+            if (submit.marks, submit.max_marks) != (marks, max_marks) or submit.gradedAt is None:
+                submit.marks, submit.max_marks, submit.gradedAt = marks, max_marks, now
+                changed.append(submit)
+        models.AssignmentSubmit.objects.bulk_update(changed, ['marks', 'max_marks', 'gradedAt'], batch_size=500)
+
+        # 没有提交的学生补一条只有分数的记录；小组任务组内已有提交时不再补
+        groups_with_submit = {group_of[sid] for sid in has_submit if sid in group_of}
+        missing = []
+        for student_id, (marks, max_marks) in grades.items():
+            if student_id in has_submit:
+                continue
+            group_id = group_of.get(student_id)
+            if group_id is not None:
+                if group_id in groups_with_submit:
+                    continue
+                groups_with_submit.add(group_id)
+            missing.append(models.AssignmentSubmit(assignment=assignment, student_id=student_id, file_name='',
+                                                   marks=marks, max_marks=max_marks, gradedAt=now))
+        if missing:
+            last_id = models.AssignmentSubmit.objects.aggregate(m=Max('id'))['m'] or 0
+            models.AssignmentSubmit.objects.bulk_create(missing, batch_size=500)
+            # SQLite 上 bulk_create 不回填主键，只重新读取刚插入的记录以写入变更事件
+            # （同一学生更早的只有分数的记录不算在内）
+            missing = list(models.AssignmentSubmit.objects.filter(
+                id__gt=last_id, assignment=assignment, student_id__in=[s.student_id for s in missing], file=''))
+            latest.refresh(assignment.id, [s.student_id for s in missing])
+            transaction.on_commit(lambda: submission.invalidate_assignment(assignment.id))
+
+        # bulk_update / bulk_create 不触发信号，手动写入变更事件并使成绩统计失效
+        outbox.record_many(changed, outbox.UPDATED)
+        outbox.record_many(missing, outbox.CREATED)
+        transaction.on_commit(lambda: gradestats.invalidate_assignment(assignment.id, assignment.course_id))
+        transaction.on_commit(lambda: dashboard.invalidate_users(grades))
+
+        # 分数有变化（含补建）的学生收到成绩通知；小组任务按组通知全组
+        notified = {s.student_id for s in changed} | {s.student_id for s in missing}
+        notified_groups = {group_of[sid] for sid in notified if sid in group_of}
+        notified |= {sid for sid in grades if group_of.get(sid) in notified_groups}
+        inbox.notify_grades(assignment, {sid: grades[sid] for sid in notified})
+
+    return {'ok': True, 'errors': [], 'graded': len(grades), 'updated': len(changed), 'created': len(missing)}
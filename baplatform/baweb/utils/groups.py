@@ -0,0 +1,96 @@
+"""
+课程小组成员解析
+
+一门课程的全部小组成员一次查询读入，得到 学生 → 小组 和 小组 → 成员 两个映射并按课程缓存；
+小组或成员变化时删除该课程的缓存（见 baweb/signals.py）。
+小组任务相关的逻辑（提交状态、成绩册、成绩统计、批量打分）都通过这里解析小组，
+只看本课程的小组：学生在其他课程的小组不会被误用。
+
+同一课程中学生属于多个小组时（历史数据），以最早加入的小组为准。
+"""
+
+from django.core.cache import cache
+
+from baweb import models
+
+
+CACHE_TIMEOUT = 600
+
+
+def _course_key(course_id):
+    return f'groups:course:{course_id}'
+
+
+def invalidate_course(course_id):
+    cache.delete(_course_key(course_id))
+
+
+def _load_many(course_ids):
+    result = {course_id: {'group_of': {}, 'members': {}} for course_id in course_ids}
+    for student_id, group_id, course_id in models.GroupMember.objects.filter(group__course_id__in=list(course_ids)) \
+            .order_by('id').values_list('student_id', 'group_id', 'group__course_id'):
+        data = result[course_id]
+        if student_id in data['group_of']:
+            continue
+        data['group_of'][student_id] = group_id
+        data['members'].setdefault(group_id, []).append(student_id)
+    return result
+
+
+def _load(course_id):
+    return _load_many([course_id])[course_id]
+
+
+def memberships(course_id):
+    '''课程的小组成员（带缓存）
+
+    Args:
+        course_id (int): 课程ID
+
+    Returns:
+        dict: group_of {学生ID: 小组ID}，members {小组ID: [学生ID]}；学生ID 即用户ID
+    '''
+    key = _course_key(course_id)
+    data = cache.get(key)
+    if data is None:
+        data = _load(course_id)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def memberships_many(course_ids):
+    '''多门课程的小组成员（带缓存，未缓存的课程一次查询）
+
+    Returns:
+        dict: {课程ID: memberships()}
+    '''
+    keys = {_course_key(course_id): course_id for course_id in course_ids}
+    result = {keys[key]: data for key, data in cache.get_many(list(keys)).items()}
+    missing = [course_id for course_id in keys.values() if course_id not in result]
+    if missing:
+        loaded = _load_many(missing)
+        cache.set_many({_course_key(course_id): data for course_id, data in loaded.items()}, CACHE_TIMEOUT)
+        result.update(loaded)
+    return result
+
+
+def group_of(course_id):
+    '''{学生ID: 小组ID}，没有小组的学生不在其中'''
+    return memberships(course_id)['group_of']
+
+
+def members(course_id):
+    '''{小组ID: [学生ID]}'''
+    return memberships(course_id)['members']
+
+
+def group_id(course_id, student_id):
+    '''学生在本课程的小组ID，没有小组时为 None'''
+    return group_of(course_id).get(student_id)
+
+
+def teammates(course_id, student_id):
+    '''学生在本课程的小组全体成员（含本人），没有小组时只有本人'''
+    data = memberships(course_id)
+    gid = data['group_of'].get(student_id)
+    return list(data['members'][gid]) if gid is not None else [student_id]
@@ -0,0 +1,185 @@
+"""
+个人消息（写扩散）
+
+课程通知、帖子的新评论、评论的新回复、最佳答案、成绩发布在发生时批量写入接收者的 Notification，
+读取时按 (user, id) 索引做一次键集分页查询。
+未读数按用户缓存，写入新消息或标记已读时删除该用户的缓存，下次读取时用 (user, isRead) 索引重新计数。
+
+课程通知的已读状态有三处：课程通知消息的 isRead、通知已读位图（baweb/utils/receipts.py）和
+课程的通知水位（baweb/utils/readstate.py）。浏览通知页和在这里标记通知消息已读都经过
+mark_announces_read()，三者同时更新，并使首页看板缓存失效。
+"""
+
+from django.core.cache import cache
+from django.utils.html import strip_tags
+
+from baweb import models
+from baweb.utils import dashboard, readstate, receipts
+
+
+FANOUT_BATCH_SIZE = 500
+CACHE_TIMEOUT = 3600
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+TITLE_SUMMARY_LENGTH = 60
+TITLE_MAX_LENGTH = models.Notification._meta.get_field('title').max_length
+
+
+def _unread_key(user_id):
+    return f'inbox:unread:{user_id}'
+
+
+def _summary(text):
+    text = strip_tags(text or '').strip()
+    return text if len(text) <= TITLE_SUMMARY_LENGTH else text[:TITLE_SUMMARY_LENGTH] + '…'
+
+
+def _push(notifications):
+    '''批量写入消息并使接收者的未读数缓存失效
+
+    Returns:
+        int: 写入的消息数
+    '''
+    notifications = list(notifications)
+    for notification in notifications:
+        notification.title = notification.title[:TITLE_MAX_LENGTH]
+    for start in range(0, len(notifications), FANOUT_BATCH_SIZE):
+        models.Notification.objects.bulk_create(notifications[start:start + FANOUT_BATCH_SIZE])
+    cache.delete_many([_unread_key(uid) for uid in {n.user_id for n in notifications}])
+    return len(notifications)
+
+
+def notify_announce(announce):
+    '''课程通知：推送给选课学生'''
+    student_ids = models.StudentCourse.objects.filter(course_id=announce.course_id) \
+        .values_list('student_id', flat=True)
+    title = '{}：{}'.format(announce.course.name, _summary(announce.announcement))
+    return _push(models.Notification(user_id=uid, kind=1, actor_id=announce.teacher_id, course_id=announce.course_id,
+                                     announce=announce, title=title, url='/announce/')
+                 for uid in student_ids)
+
+
+def notify_comment(comment):
+    '''新评论通知帖子作者，回复通知被回复的评论作者（自己评论自己不通知）'''
+    post = comment.post
+    parent = comment.parentComment
+    recipient_id = parent.author_id if parent else post.author_id
+    if recipient_id == comment.author_id:
+        return 0
+    actor = None if comment.isAnonymous else comment.author
+    name = actor.username if actor else '匿名用户'
+    if parent:
+        title = '{} 回复了你在《{}》中的评论'.format(name, post.title)
+    else:
+        title = '{} 评论了你的帖子《{}》'.format(name, post.title)
+    return _push([models.Notification(user_id=recipient_id, kind=3 if parent else 2, actor=actor,
+                                      course_id=post.course_id, post=post, title=title,
+                                      url=f'/forum/post/{post.postId}/')])
+
+
+def notify_best_answer(comment):
+    '''回答被选为最佳答案'''
+    post = comment.post
+    return _push([models.Notification(user_id=comment.author_id, kind=4, actor_id=post.author_id,
+                                      course_id=post.course_id, post=post,
+                                      title='你在《{}》中的回答被选为最佳答案'.format(post.title),
+                                      url=f'/forum/post/{post.postId}/')])
+
+
+def notify_grades(assignment, grades):
+    '''成绩发布
+
+    Args:
+        assignment (Assignment): 任务
+        grades (dict): {学生ID: (marks, max_marks)}
+    '''
+    return _push(models.Notification(user_id=uid, kind=5, course_id=assignment.course_id,
+                                     title='《{}》已出成绩：{}/{}'.format(assignment.name, marks, max_marks),
+                                     url=f'/assignment/{assignment.id}/page')
+                 for uid, (marks, max_marks) in grades.items())
+
+
+def page(user, before=None, limit=PAGE_SIZE):
+    '''读取消息一页（按 id 倒序的键集分页）
+
+    Args:
+        user (User): 当前用户
+        before (int): 游标，只返回 id 小于该值的消息
+        limit (int): 每页条数，不超过 MAX_PAGE_SIZE
+
+    Returns:
+        tuple: (notifications, next_cursor)，没有下一页时 next_cursor 为 None
+    '''
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = models.Notification.objects.filter(user=user)
+    if before:
+        query = query.filter(id__lt=before)
+    items = list(query.select_related('actor', 'course').order_by('-id')[:limit])
+    return items, (items[-1].id if len(items) == limit else None)
+
+
+def unread_count(user_id):
+    '''未读消息数（带缓存）'''
+    key = _unread_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = models.Notification.objects.filter(user_id=user_id, isRead=False).count()
+        cache.set(key, count, CACHE_TIMEOUT)
+    return count
+
+
+def mark_read(user, ids=None):
+    '''标记已读
+
+    Args:
+        user (User): 当前用户
+        ids (list): 消息ID，None 表示全部
+
+    Returns:
+        int: 标记的消息数
+    '''
+    query = models.Notification.objects.filter(user=user, isRead=False)
+    if ids is not None:
+        query = query.filter(id__in=ids)
+    announce_ids = list(query.filter(kind=1, announce__isnull=False).values_list('announce_id', flat=True))
+    count = query.update(isRead=True)
+    if announce_ids:
+        mark_announces_read(user, models.Announce.objects.filter(id__in=announce_ids).only('id', 'course_id'))
+    cache.delete(_unread_key(user.id))
+    return count
+
+
+def mark_announces_read(user, announces):
+    '''学生读过这些课程通知：已读位图、课程通知消息和通知水位同时更新
+
+    Args:
+        user (User): 学生
+        announces (iterable): 通知（只用到 id、course_id）
+    '''
+    announces = list(announces)
+    if not announces:
+        return
+    ids = {a.id for a in announces}
+    receipts.mark_read(user, announces)
+    models.Notification.objects.filter(user=user, kind=1, announce_id__in=ids, isRead=False).update(isRead=True)
+    # 之前在别处读过的通知也算已读，水位可以越过它们
+    course_ids = {a.course_id for a in announces}
+    states = readstate.states_for(user, course_ids)
+    pending = list(readstate.unread_announces(course_ids, states).only('id', 'course_id'))
+    readstate.advance_announces(user, course_ids, ids | receipts.read_ids(user, pending))
+    cache.delete(_unread_key(user.id))
+    dashboard.invalidate_user(user.id)
+
+
+def as_dict(notification):
+    return {
+        'id': notification.id,
+        'kind': notification.kind,
+        'kind_display': notification.get_kind_display(),
+        'title': notification.title,
+        'url': notification.url,
+        'actor': notification.actor.username if notification.actor_id else '',
+        'course': notification.course.name if notification.course_id else '',
+        'read': notification.isRead,
+        'created_at': notification.createdAt.isoformat(),
+    }
@@ -0,0 +1,227 @@
+"""
+后台任务（Job）框架
+
+- submit()：上传文件先写入 MEDIA_ROOT/jobs/，再写一行排队中的 Job，请求立即返回任务ID
+- run_jobs 命令在独立的 worker 进程中领取并执行任务；JOB_RUN_IN_THREAD=True 时
+  （未部署 worker 的开发环境）改为提交事务后在后台线程中执行
+- 处理函数通过 Reporter 写回进度，/job/<id>/progress 返回状态、进度和结果
+- 心跳：进度落库时更新 updatedAt；在长事务中（落库的进度提交前其他进程看不到）用 Reporter.beat()
+  把心跳写到共享缓存。两者都超过 STALE_SECONDS 的执行中任务才会被重新排队
+
+定义任务类型::
+
+    from baweb.utils import jobs
+
+    @jobs.register('roster.students')
+    def import_students(job, reporter):
+        for row in ...:
+            reporter.step()
+        return {'created': ...}   # 返回值（可 JSON 序列化）保存为任务结果
+
+处理函数所在模块需要在启动时被导入（在 BawebConfig.ready() 中导入即可）。
+运行：python manage.py run_jobs [--loop]
+"""
+
+import datetime
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from baweb import models
+
+
+logger = logging.getLogger(__name__)
+
+PENDING = 1
+RUNNING = 2
+DONE = 3
+FAILED = 4
+
+REPORT_EVERY = 200       # 每处理多少行写一次进度
+STALE_SECONDS = 600      # 执行中的任务超过该时间没有心跳视为 worker 已退出，重新排队
+
+_registry = {}
+
+
+class JobError(Exception):
+    '''处理函数主动报告的失败，消息原样展示给用户'''
+
+
+def _heartbeat_key(job_id):
+    return f'job:heartbeat:{job_id}'
+
+
+def register(kind):
+    '''注册任务类型的处理函数（装饰器）'''
+    def decorator(func):
+        _registry[kind] = func
+        return func
+    return decorator
+
+
+def kinds():
+    return dict(_registry)
+
+
+def submit(kind, owner, params=None, upload=None):
+    '''提交任务
+
+    Args:
+        kind (str): 已注册的任务类型
+        owner (User): 提交者，只有提交者可以查看进度
+        params (dict): 处理函数需要的参数
+        upload (UploadedFile): 需要处理的上传文件
+
+    Returns:
+        Job: 排队中的任务
+    '''
+    if kind not in _registry:
+        raise ValueError(f'未注册的任务类型：{kind}')
+    job = models.Job(kind=kind, owner=owner, params=json.dumps(params or {}, ensure_ascii=False))
+    if upload is not None:
+        job.file.save(upload.name, upload, save=False)
+    job.save()
+    if getattr(settings, 'JOB_RUN_IN_THREAD', False):
+        transaction.on_commit(lambda: threading.Thread(target=_run_in_thread, args=(job.id,), daemon=True).start())
+    return job
+
+
+class Reporter(object):
+    '''处理函数写回进度：step() 累加已处理行数，每 REPORT_EVERY 行落库一次（同时作为心跳）'''
+
+    def __init__(self, job):
+        self.job = job
+        self.processed = job.processed
+        self._saved = self.processed
+
+    def set_total(self, total):
+        self.job.total = total
+        models.Job.objects.filter(id=self.job.id).update(total=total, updatedAt=timezone.now())
+
+    def step(self, count=1):
+        self.processed += count
+        if self.processed - self._saved >= REPORT_EVERY:
+            self.flush()
+
+    def flush(self):
+        self._saved = self.job.processed = self.processed
+        models.Job.objects.filter(id=self.job.id).update(processed=self.processed, updatedAt=timezone.now())
+
+    def beat(self):
+        '''事务中的心跳（每写入一批调用一次）'''
+        cache.set(_heartbeat_key(self.job.id), time.time(), STALE_SECONDS * 2)
+
+
+def _claim(job_id):
+    '''把排队中的任务改为执行中；多个 worker 同时领取时只有一个成功'''
+    return models.Job.objects.filter(id=job_id, status=PENDING) \
+        .update(status=RUNNING, startedAt=timezone.now(), updatedAt=timezone.now()) == 1
+
+
+def _finish(job, status, result=None, error=''):
+    models.Job.objects.filter(id=job.id).update(
+        status=status,
+        processed=job.processed,
+        result=json.dumps(result, ensure_ascii=False) if result is not None else '',
+        error=error,
+        finishedAt=timezone.now(),
+        updatedAt=timezone.now(),
+    )
+    if job.file:
+        job.file.delete(save=False)
+        models.Job.objects.filter(id=job.id).update(file='')
+
+
+def execute(job_id):
+    '''领取并执行一个任务
+
+    Returns:
+        bool: 是否领取成功（已被其他 worker 领取或不存在时为 False）
+    '''
+    if not _claim(job_id):
+        return False
+    job = models.Job.objects.get(id=job_id)
+    handler = _registry.get(job.kind)
+    reporter = Reporter(job)
+    try:
+        if handler is None:
+            raise JobError(f'未注册的任务类型：{job.kind}')
+        result = handler(job, reporter)
+    except JobError as e:
+        reporter.flush()
+        _finish(job, FAILED, error=str(e))
+    except Exception:
+        logger.exception('后台任务 %s 执行失败', job_id)
+        reporter.flush()
+        _finish(job, FAILED, error='任务执行出错，请稍后重试或联系管理员')
+    else:
+        reporter.flush()
+        _finish(job, DONE, result=result)
+    return True
+
+
+def requeue_stale(seconds=STALE_SECONDS):
+    '''把心跳超时的执行中任务重新排队（worker 被杀死后恢复）
+
+    Returns:
+        int: 重新排队的任务数
+    '''
+    cutoff = timezone.now() - datetime.timedelta(seconds=seconds)
+    stale = list(models.Job.objects.filter(status=RUNNING, updatedAt__lt=cutoff).values_list('id', flat=True))
+    if not stale:
+        return 0
+    beats = cache.get_many([_heartbeat_key(job_id) for job_id in stale])
+    stale = [job_id for job_id in stale if beats.get(_heartbeat_key(job_id), 0) < cutoff.timestamp()]
+    return models.Job.objects.filter(id__in=stale, status=RUNNING, updatedAt__lt=cutoff) \
+        .update(status=PENDING, processed=0, startedAt=None)
+
+
+def run_pending(limit=None):
+    '''按提交顺序执行排队中的任务，直到队列为空
+
+    Returns:
+        int: 执行的任务数
+    '''
+    count = 0
+    while limit is None or count < limit:
+        job_id = models.Job.objects.filter(status=PENDING).order_by('id').values_list('id', flat=True).first()
+        if job_id is None:
+            break
+        if execute(job_id):
+            count += 1
+    return count
+
+
+def run_forever(interval=2):
+    while True:
+        requeue_stale()
+        if not run_pending():
+            time.sleep(interval)
+
+
+def _run_in_thread(job_id):
+    try:
+        execute(job_id)
+    finally:
+        connection.close()
+
+
+def as_dict(job):
+    '''进度接口的返回内容'''
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'processed': job.processed,
+        'total': job.total,
+        'finished': job.status in (DONE, FAILED),
+        'result': job.get_result(),
+        'error': job.error,
+    }
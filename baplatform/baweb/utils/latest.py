@@ -0,0 +1,50 @@
+"""
+最新提交指针（LatestSubmission）
+
+每个 (任务, 学生) 一行，指向该学生按上传顺序（主键）最新的一次提交，并记录提交次数。
+单条提交的新建 / 删除由 baweb/signals.py 维护；绕过信号的批量写入（如批量打分补建记录）调用 refresh()。
+老师查看任务时一次关联查询即可列出每个学生的最新提交，历史提交按需再查。
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, Max
+
+from baweb import models
+
+
+def record(submit):
+    '''新提交：指针指向它，提交次数加一'''
+    with transaction.atomic():
+        updated = models.LatestSubmission.objects.filter(
+            assignment_id=submit.assignment_id, student_id=submit.student_id, submission_id__lt=submit.id,
+        ).update(submission_id=submit.id, count=F('count') + 1)
+        if not updated:
+            models.LatestSubmission.objects.get_or_create(
+                assignment_id=submit.assignment_id, student_id=submit.student_id,
+                defaults={'submission_id': submit.id, 'count': 1})
+
+
+def refresh(assignment_id, student_ids):
+    '''按提交表重新计算指定学生的指针（删除提交或批量写入后调用）'''
+    student_ids = list(student_ids)
+    rows = models.AssignmentSubmit.objects.filter(assignment_id=assignment_id, student_id__in=student_ids) \
+        .values('student_id').annotate(last=Max('id'), n=Count('id')).values_list('student_id', 'last', 'n')
+    with transaction.atomic():
+        models.LatestSubmission.objects.filter(assignment_id=assignment_id, student_id__in=student_ids).delete()
+        models.LatestSubmission.objects.bulk_create([
+            models.LatestSubmission(assignment_id=assignment_id, student_id=student_id, submission_id=last, count=n)
+            for student_id, last, n in rows
+        ])
+
+
+def for_assignment(assignment):
+    '''任务的每个学生一行（按学号排序），带学生、账号和最新提交'''
+    return models.LatestSubmission.objects.filter(assignment=assignment) \
+        .select_related('student__user', 'submission').order_by('student__user__username')
+
+
+def submission_of(assignment, student_id):
+    '''学生在任务中的最新提交，没有提交时返回 None'''
+    pointer = models.LatestSubmission.objects.filter(assignment=assignment, student_id=student_id) \
+        .select_related('submission').first()
+    return pointer.submission if pointer else None
@@ -0,0 +1,93 @@
+"""
+帖子详情页实时更新（短轮询）
+
+事件写入本地数据库的 PostEvent 表，不依赖 Redis。
+详情页每 POLL_INTERVAL 秒带着已收到的最后一个事件ID请求一次，每次请求只做按 (post, id) 索引的查询，
+不占用 Web 进程：没有新事件时按 ETag（帖子最后一个事件ID）返回 304。
+"""
+
+import json
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from baweb import models
+
+
+KIND_NAMES = {
+    1: 'comment',
+    2: 'reply',
+    3: 'counters',
+    4: 'best_answer',
+    5: 'comment_delete',
+}
+
+POLL_INTERVAL = 3
+BATCH_SIZE = 100
+RETENTION = timedelta(hours=1)
+
+_last_prune = [0.0]
+
+
+def publish(post, kind, payload):
+    '''发布一条帖子事件
+
+    Args:
+        post (Post): 帖子
+        kind (int): 事件类型，见 PostEvent.kind_choices
+        payload (dict): 事件内容
+    '''
+    models.PostEvent.objects.create(post=post, kind=kind, payload=json.dumps(payload, ensure_ascii=False))
+    _prune()
+
+
+def counters_payload(post):
+    '''帖子计数快照'''
+    return {
+        "like_count": post.likeCount,
+        "collect_count": post.collectCount,
+        "comment_count": post.commentCount,
+    }
+
+
+def comment_payload(comment):
+    '''评论事件内容（匿名评论不暴露作者）'''
+    return {
+        "comment_id": comment.commentId,
+        "parent_id": comment.parentComment.commentId if comment.parentComment_id else None,
+        "author": '匿名用户' if comment.isAnonymous else comment.author.username,
+        "content": comment.content,
+        "created_at": comment.createdAt.isoformat(),
+        "comment_count": comment.post.commentCount,
+    }
+
+
+def _prune():
+    '''每分钟至多清理一次过期事件'''
+    now = time.time()
+    if now - _last_prune[0] < 60:
+        return
+    _last_prune[0] = now
+    models.PostEvent.objects.filter(createdAt__lt=timezone.now() - RETENTION).delete()
+
+
+def latest_event_id(post):
+    last = models.PostEvent.objects.filter(post=post).order_by('-id').values_list('id', flat=True).first()
+    return last or 0
+
+
+def events_after(post_id, last_id):
+    '''客户端已收到的最后一个事件之后的事件（至多 BATCH_SIZE 条）
+
+    Args:
+        post_id (int): 帖子主键
+        last_id (int): 客户端已收到的最后一个事件ID
+
+    Returns:
+        list: [{id, event, data}]，data 为事件内容
+    '''
+    rows = models.PostEvent.objects.filter(post_id=post_id, id__gt=last_id) \
+        .order_by('id').values_list('id', 'kind', 'payload')[:BATCH_SIZE]
+    return [{'id': event_id, 'event': KIND_NAMES.get(kind, 'message'), 'data': json.loads(payload)}
+            for event_id, kind, payload in rows]
@@ -0,0 +1,119 @@
+"""
+姓名搜索（拼音 / 首字母 / 原名前缀）
+
+每个学生和老师的姓名展开成若干搜索词写入 NameSearchIndex：原名、全拼（zhangsan）、
+拼音首字母（zs），多音字取前 MAX_READINGS 种读法组合。查询时把输入规范化后在
+(用户类型, 搜索词) 索引上做范围查询 [q, q + '\uffff')，不依赖 LIKE，数据量大时仍走索引。
+
+学生 / 老师信息保存时由信号重建该用户的搜索词（见 baweb/signals.py）；bulk_create 不触发信号，
+批量导入名单时调用 index_many()。已有数据用 python manage.py rebuild_name_index 重建。
+"""
+
+import itertools
+import re
+
+from django.db import transaction
+from django.db.models import Q
+from pypinyin import Style, pinyin
+
+from baweb import models
+
+
+MAX_READINGS = 8
+MAX_TERM_LENGTH = models.NameSearchIndex._meta.get_field('term').max_length
+BATCH_SIZE = 500
+
+_SEPARATORS_RE = re.compile(r"[\s'·.\-_]+")
+
+
+def normalize(text):
+    '''小写并去掉空格、隔音符和间隔号，zhang san / Zhang'San 都视为 zhangsan'''
+    return _SEPARATORS_RE.sub('', (text or '').lower())
+
+
+def terms(name):
+    '''姓名的全部搜索词
+
+    Args:
+        name (str): 姓名
+
+    Returns:
+        set: 原名、全拼、首字母（均已规范化，去掉空串）
+    '''
+    name = (name or '').strip()
+    result = {normalize(name)}
+    if name:
+        readings = pinyin(name, style=Style.NORMAL, heteronym=True, errors='default')
+        for combination in itertools.islice(itertools.product(*readings), MAX_READINGS):
+            # 非汉字部分（英文名）按空格等分隔符再拆成单词
+            words = [w.lower() for part in combination for w in _SEPARATORS_RE.split(part) if w]
+            result.add(''.join(words))
+            result.add(''.join(w[0] for w in words))
+    return {term[:MAX_TERM_LENGTH] for term in result if term}
+
+
+def _rows(user_id, user_type, name):
+    return [models.NameSearchIndex(user_id=user_id, type=user_type, term=term) for term in terms(name)]
+
+
+def index(user_id, user_type, name):
+    '''重建一个用户的搜索词'''
+    with transaction.atomic():
+        models.NameSearchIndex.objects.filter(user_id=user_id).delete()
+        models.NameSearchIndex.objects.bulk_create(_rows(user_id, user_type, name))
+
+
+def index_many(entries):
+    '''批量重建搜索词
+
+    Args:
+        entries (iterable): (用户ID, 用户类型, 姓名)
+    '''
+    entries = list(entries)
+    with transaction.atomic():
+        for start in range(0, len(entries), BATCH_SIZE):
+            chunk = entries[start:start + BATCH_SIZE]
+            models.NameSearchIndex.objects.filter(user_id__in=[e[0] for e in chunk]).delete()
+            models.NameSearchIndex.objects.bulk_create(
+                [row for entry in chunk for row in _rows(*entry)], batch_size=BATCH_SIZE)
+
+
+def rebuild():
+    '''清空并重建所有学生和老师的搜索词
+
+    Returns:
+        int: 建立索引的用户数
+    '''
+    with transaction.atomic():
+        models.NameSearchIndex.objects.all().delete()
+        entries = [(user_id, 1, name) for user_id, name in models.StudentInfo.objects.values_list('user_id', 'name')]
+        entries += [(user_id, 2, name) for user_id, name in models.TeacherInfo.objects.values_list('user_id', 'name')]
+        index_many(entries)
+    return len(entries)
+
+
+def prefix_q(field, q):
+    '''field 以 q 开头：范围条件 [q, q + '\uffff')，可以走索引（SQLite 的 LIKE / startswith 不使用索引）'''
+    return Q(**{f'{field}__gte': q, f'{field}__lt': q + '\uffff'})
+
+
+def matching(q, user_type):
+    '''姓名搜索词以 q 开头的用户
+
+    Args:
+        q (str): 输入（中文名、全拼或首字母的前缀）
+        user_type (int): 1 学生 / 2 老师
+
+    Returns:
+        QuerySet: 用户ID（可直接用作 __in 子查询）；q 规范化后为空时为空查询
+    '''
+    q = normalize(q)
+    query = models.NameSearchIndex.objects.filter(type=user_type)
+    if not q:
+        return query.none().values('user_id')
+    return query.filter(prefix_q('term', q)).values('user_id')
+
+
+def student_q(q):
+    '''学号前缀或姓名搜索词前缀匹配的学生，用于带 student 外键的查询（如 StudentCourse）'''
+    return prefix_q('student__user__username', q) | Q(student_id__in=matching(q, 1))
@@ -0,0 +1,209 @@
+"""
+变更事件发件箱（Transactional Outbox）与消费者框架
+
+- record()：在业务数据所在事务中写一条 OutboxEvent，由 baweb/signals.py 自动调用
+- read_events()：按事件序号顺序读取
+- Consumer：按批次投递事件，消费进度保存在 ConsumerCheckpoint，重启后从断点继续
+
+定义消费者::
+
+    from baweb.utils import outbox
+
+    @outbox.register
+    class SearchIndexConsumer(outbox.Consumer):
+        name = 'search_index'
+        topics = ['post', 'postcomment']
+
+        def handle(self, events):
+            for event in events:
+                ...
+
+消费者模块需要在启动时被导入（在 BawebConfig.ready() 中导入即可）。已注册的消费者：
+- analytics_rollup：教学看板汇总表（baweb/utils/analytics.py）
+
+运行：python manage.py consume_outbox [--loop]。持续运行时每 PRUNE_INTERVAL 秒清理一次所有消费者都已处理过的事件。
+"""
+
+import datetime
+import json
+import time
+
+from django.db import models as dj_models
+from django.db import transaction
+from django.db.models import Min
+
+from baweb import models
+
+
+CREATED = 1
+UPDATED = 2
+DELETED = 3
+
+PRUNE_INTERVAL = 3600
+
+_registry = {}
+
+
+def _serialize(instance):
+    '''只保留标量字段，长文本/二进制字段不写入事件'''
+    data = {}
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, (dj_models.TextField, dj_models.BinaryField)):
+            continue
+        value = getattr(instance, field.attname)
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            value = value.isoformat()
+        elif isinstance(field, dj_models.FileField):
+            value = value.name if value else ''
+        data[field.attname] = value
+    return data
+
+
+def record(instance, action):
+    '''写入一条变更事件（需在业务数据的事务内调用）
+
+    Args:
+        instance (Model): 发生变更的对象
+        action (int): CREATED / UPDATED / DELETED
+    '''
+    return models.OutboxEvent.objects.create(
+        topic=instance._meta.model_name,
+        action=action,
+        objectId=instance.pk,
+        payload=json.dumps(_serialize(instance), ensure_ascii=False),
+    )
+
+
+def record_many(instances, action):
+    '''批量写入同一动作的变更事件（用于绕过信号的批量操作）'''
+    return models.OutboxEvent.objects.bulk_create([
+        models.OutboxEvent(
+            topic=instance._meta.model_name,
+            action=action,
+            objectId=instance.pk,
+            payload=json.dumps(_serialize(instance), ensure_ascii=False),
+        )
+        for instance in instances
+    ])
+
+
+def read_events(after=0, limit=100, topics=None):
+    '''按序号读取 after 之后的事件
+
+    Args:
+        after (int): 起始序号（不含）
+        limit (int): 最多返回条数
+        topics (iterable): 只读取这些主题，None 表示全部
+
+    Returns:
+        list: OutboxEvent 列表，event.data 为解析后的 payload
+    '''
+    query = models.OutboxEvent.objects.filter(id__gt=after)
+    if topics:
+        query = query.filter(topic__in=list(topics))
+    events = list(query.order_by('id')[:limit])
+    for event in events:
+        event.data = json.loads(event.payload)
+    return events
+
+
+def last_position():
+    last = models.OutboxEvent.objects.order_by('-id').values_list('id', flat=True).first()
+    return last or 0
+
+
+class Consumer(object):
+    '''事件消费者基类
+
+    子类设置 name（唯一，用作断点键）、topics（None 表示全部主题）、batch_size，并实现 handle()。
+    handle() 与断点推进在同一事务中执行，处理失败时整批回滚、下次重投。
+    '''
+    name = None
+    topics = None
+    batch_size = 200
+
+    def handle(self, events):
+        raise NotImplementedError
+
+    def checkpoint(self):
+        obj, _ = models.ConsumerCheckpoint.objects.get_or_create(name=self.name)
+        return obj.position
+
+    def run_once(self):
+        '''投递一批事件
+
+        Returns:
+            int: 本批处理的事件数
+        '''
+        with transaction.atomic():
+            position = self.checkpoint()
+            events = read_events(position, self.batch_size, self.topics)
+            if not events:
+                return 0
+            self.handle(events)
+            models.ConsumerCheckpoint.objects.filter(name=self.name).update(position=events[-1].id)
+        return len(events)
+
+    def run_until_idle(self):
+        total = 0
+        while True:
+            count = self.run_once()
+            total += count
+            if count < self.batch_size:
+                return total
+
+
+def register(consumer_cls):
+    '''注册消费者（可作为类装饰器）'''
+    if not consumer_cls.name:
+        raise ValueError('Consumer.name 不能为空')
+    _registry[consumer_cls.name] = consumer_cls
+    return consumer_cls
+
+
+def consumers():
+    return dict(_registry)
+
+
+def run_consumers(names=None):
+    '''把所有（或指定的）消费者追到最新
+
+    Returns:
+        dict: {消费者名: 处理事件数}
+    '''
+    result = {}
+    for name, consumer_cls in sorted(_registry.items()):
+        if names and name not in names:
+            continue
+        result[name] = consumer_cls().run_until_idle()
+    return result
+
+
+def run_forever(names=None, interval=2):
+    last_prune = time.time()
+    while True:
+        processed = run_consumers(names)
+        if time.time() - last_prune >= PRUNE_INTERVAL:
+            prune()
+            last_prune = time.time()
+        if not any(processed.values()):
+            time.sleep(interval)
+
+
+def prune(keep=1000):
+    '''删除所有已注册消费者都已消费过的事件，至少保留最近 keep 条
+
+    Returns:
+        int: 删除的事件数
+    '''
+    floor = last_position() - keep
+    if _registry:
+        for name in _registry:
+            models.ConsumerCheckpoint.objects.get_or_create(name=name)
+        slowest = models.ConsumerCheckpoint.objects.filter(name__in=list(_registry)) \
+            .aggregate(m=Min('position'))['m'] or 0
+        floor = min(floor, slowest)
+    if floor <= 0:
+        return 0
+    deleted, _ = models.OutboxEvent.objects.filter(id__lte=floor).delete()
+    return deleted
@@ -0,0 +1,271 @@
+"""
+帖子/课程的后台删除
+
+删除请求只把 Post / Course 标记为 isDeleted（默认管理器随即不再返回它们；批量标记用
+mark_posts_deleted() / mark_course_deleted()，与保存一样写入帖子的 UPDATED 事件），
+真正的删除由后台线程或 purge_deleted 命令完成：
+
+- 按模型的反向外键自下而上删除子数据，每批 BATCH_SIZE 行、一批一个短事务，
+  不把整棵级联树加载到内存，也不长时间占用 SQLite 写锁
+- SET_NULL 外键（如最佳答案）和自引用外键（楼中楼）先批量置空，发件箱模型同时写入 UPDATED 事件
+- 所有行删除完成后再删除关联的媒体文件
+
+批量删除不经过 Django 的级联收集器和 post_delete 信号，因此：
+- 发件箱模型（帖子、评论、点赞、收藏、通知、提交，见 baweb/signals.py）的每一行在删除它的同一事务中
+  写入 OutboxEvent（DELETED）
+- 每批提交后使这批数据涉及的缓存失效：提交状态、最新提交指针、成绩统计、学生看板、日历和小组成员
+"""
+
+import logging
+import threading
+
+from django.core.files.storage import default_storage
+from django.db import connection, models as dj_models, transaction
+
+from baweb import models
+from baweb.signals import OUTBOX_MODELS
+from baweb.utils import dashboard, gradestats, groups, latest, outbox, schedule, submission
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+_lock = threading.Lock()
+
+
+def _qn(name):
+    return connection.ops.quote_name(name)
+
+
+def _execute_batches(sql, params):
+    '''重复执行带 LIMIT 的语句直到影响行数不足一批'''
+    total = 0
+    while True:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                count = cursor.rowcount
+        total += count
+        if count < BATCH_SIZE:
+            return total
+
+
+# 删除前需要取出整行（写事件或使缓存失效）的模型
+_TRACKED_MODELS = set(OUTBOX_MODELS) | {models.Assignment, models.StudentCourse, models.Group, models.GroupMember}
+
+
+def _set_null(model, field, where, params):
+    table, pk = _qn(model._meta.db_table), _qn(model._meta.pk.column)
+    if model not in OUTBOX_MODELS:
+        sql = (f'UPDATE {table} SET {_qn(field.column)} = NULL WHERE {pk} IN '
+               f'(SELECT {pk} FROM {table} WHERE {where} LIMIT {BATCH_SIZE})')
+        return _execute_batches(sql, params)
+
+    # 发件箱模型：置空后取出这批行写入 UPDATED 事件（同一事务）
+    total = 0
+    while True:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT {pk} FROM {table} WHERE {where} LIMIT {BATCH_SIZE}', params)
+                ids = [row[0] for row in cursor.fetchall()]
+            if ids:
+                model._base_manager.filter(pk__in=ids).update(**{field.attname: None})
+                outbox.record_many(model._base_manager.filter(pk__in=ids), outbox.UPDATED)
+        total += len(ids)
+        if len(ids) < BATCH_SIZE:
+            return total
+
+
+def mark_posts_deleted(post_ids):
+    '''批量标记帖子删除（不经过 save()），同一事务中写入 UPDATED 事件并使看板失效
+
+    Args:
+        post_ids (iterable): 帖子ID
+
+    Returns:
+        int: 新标记的帖子数
+    '''
+    post_ids = list(models.Post.all_objects.filter(id__in=list(post_ids), isDeleted=False)
+                    .values_list('id', flat=True))
+    course_ids = set()
+    for start in range(0, len(post_ids), BATCH_SIZE):
+        batch = post_ids[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            models.Post.all_objects.filter(id__in=batch).update(isDeleted=True)
+            posts = list(models.Post.all_objects.filter(id__in=batch))
+            outbox.record_many(posts, outbox.UPDATED)
+        course_ids.update(post.course_id for post in posts)
+    for course_id in course_ids - {None}:
+        dashboard.invalidate_course(course_id)
+    return len(post_ids)
+
+
+def mark_course_deleted(course):
+    '''标记课程及其帖子删除，当前事务提交后在后台清理'''
+    with transaction.atomic():
+        models.Course.all_objects.filter(id=course.id).update(isDeleted=True)
+        mark_posts_deleted(models.Post.all_objects.filter(course_id=course.id).values_list('id', flat=True))
+        schedule_purge()
+    dashboard.invalidate_course(course.id)
+
+
+def _invalidate(model, instances):
+    '''一批行删除后使相关缓存失效（与 baweb/signals.py 中对应信号的处理一致）'''
+    if model is models.AssignmentSubmit:
+        students = {}
+        for obj in instances:
+            students.setdefault(obj.assignment_id, set()).add(obj.student_id)
+        course_ids = dict(models.Assignment.objects.filter(id__in=list(students)).values_list('id', 'course_id'))
+        for assignment_id, student_ids in students.items():
+            latest.refresh(assignment_id, student_ids)
+            submission.invalidate_assignment(assignment_id)
+            if assignment_id in course_ids:
+                gradestats.invalidate_assignment(assignment_id, course_ids[assignment_id])
+        dashboard.invalidate_users({obj.student_id for obj in instances})
+    elif model is models.StudentCourse:
+        for obj in instances:
+            schedule.invalidate_user(obj.student_id)
+        dashboard.invalidate_users({obj.student_id for obj in instances})
+    elif model is models.GroupMember:
+        for course_id in set(models.Group.objects.filter(
+                id__in={obj.group_id for obj in instances}).values_list('course_id', flat=True)):
+            groups.invalidate_course(course_id)
+            submission.invalidate_course(course_id)
+            gradestats.invalidate_course(course_id)
+    elif model in (models.Assignment, models.Group, models.Announce, models.Post):
+        for course_id in {obj.course_id for obj in instances} - {None}:
+            submission.invalidate_course(course_id)
+            gradestats.invalidate_course(course_id)
+            groups.invalidate_course(course_id)
+            dashboard.invalidate_course(course_id)
+            if model is models.Assignment:
+                schedule.invalidate_course(course_id)
+
+
+def _delete_rows(model, where, params, files):
+    '''删除 model 中满足 where 的行及其全部下级数据
+
+    Args:
+        model (Model): 模型类
+        where (str): SQL 条件（可引用 params 占位符）
+        params (list): 条件参数
+        files (list): 收集被删除行的媒体文件名
+
+    Returns:
+        int: 删除的行数（含下级）
+    '''
+    opts = model._meta
+    table, pk = _qn(opts.db_table), _qn(opts.pk.column)
+    selector = f'SELECT {pk} FROM {table} WHERE {where}'
+    total = 0
+
+    # 包括 related_name='+' 的隐藏反向关系（如最新提交指针）
+    for rel in opts.get_fields(include_hidden=True):
+        if not (rel.auto_created and not rel.concrete and (rel.one_to_many or rel.one_to_one)):
+            continue
+        child = rel.related_model
+        child_where = f'{_qn(rel.field.column)} IN ({selector})'
+        if child is model or rel.on_delete is dj_models.SET_NULL:
+            # 自引用的子行属于同一批待删除数据，先断开引用即可
+            _set_null(child, rel.field, child_where, params)
+        elif rel.on_delete is dj_models.CASCADE:
+            total += _delete_rows(child, child_where, params, files)
+
+    file_columns = [f.column for f in opts.concrete_fields if isinstance(f, dj_models.FileField)]
+    columns = ', '.join([pk] + [_qn(c) for c in file_columns])
+    while True:
+        instances = []
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT {columns} FROM {table} WHERE {where} LIMIT {BATCH_SIZE}', params)
+                rows = cursor.fetchall()
+            if rows and model in _TRACKED_MODELS:
+                instances = list(model._base_manager.filter(pk__in=[row[0] for row in rows]))
+                if model in OUTBOX_MODELS:
+                    outbox.record_many(instances, outbox.DELETED)
+            if rows:
+                with connection.cursor() as cursor:
+                    placeholders = ', '.join(['%s'] * len(rows))
+                    cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({placeholders})', [row[0] for row in rows])
+        if instances:
+            _invalidate(model, instances)
+        for row in rows:
+            files.extend(name for name in row[1:] if name)
+        total += len(rows)
+        if len(rows) < BATCH_SIZE:
+            return total
+
+
+def _remove_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning('删除媒体文件失败: %s', name)
+
+
+def purge_post(post):
+    '''彻底删除一个已标记删除的帖子
+
+    Args:
+        post (Post): 帖子（通过 Post.all_objects 取得）
+
+    Returns:
+        int: 删除的行数
+    '''
+    files = []
+    count = _delete_rows(models.Post, f'{_qn("id")} = %s', [post.id], files)
+    _remove_files(files)
+    return count
+
+
+def purge_course(course):
+    '''彻底删除一个已标记删除的课程及其作业、提交、小组、公告、帖子等全部数据
+
+    Args:
+        course (Course): 课程（通过 Course.all_objects 取得）
+
+    Returns:
+        int: 删除的行数
+    '''
+    files = []
+    count = _delete_rows(models.Course, f'{_qn("id")} = %s', [course.id], files)
+    _remove_files(files)
+    return count
+
+
+def purge_pending():
+    '''清理所有已标记删除的课程和帖子，直到没有待清理数据
+
+    Returns:
+        dict: {'courses': 课程数, 'posts': 帖子数, 'rows': 删除的总行数}
+    '''
+    result = {'courses': 0, 'posts': 0, 'rows': 0}
+    with _lock:
+        while True:
+            course = models.Course.all_objects.filter(isDeleted=True).first()
+            if course:
+                result['rows'] += purge_course(course)
+                result['courses'] += 1
+                continue
+            post = models.Post.all_objects.filter(isDeleted=True).first()
+            if post:
+                result['rows'] += purge_post(post)
+                result['posts'] += 1
+                continue
+            return result
+
+
+def _purge_in_thread():
+    try:
+        purge_pending()
+    except Exception:
+        logger.exception('后台删除失败，可运行 python manage.py purge_deleted 重试')
+    finally:
+        connection.close()
+
+
+def schedule_purge():
+    '''当前事务提交后在后台线程中清理已标记删除的数据'''
+    transaction.on_commit(lambda: threading.Thread(target=_purge_in_thread, daemon=True).start())
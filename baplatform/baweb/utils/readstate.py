@@ -0,0 +1,156 @@
+"""
+课程论坛未读计数
+
+每个用户每门课程只保存一条阅读水位（上次浏览时间 + 已读到的帖子ID）和水位之后单独读过的少量帖子ID。
+未读数 = 该课程 id > 水位 的帖子数 - 例外集合，走 (course, id) 索引，多门课程合并为一次分组 count。
+课程通知另有一个水位（lastSeenAnnounceId），读过通知时推进到从水位起连续已读的最后一条
+（由 inbox.mark_announces_read() 统一调用，见 advance_announces()）。
+"""
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from baweb import models
+
+
+MAX_READ_AFTER = 200
+
+
+def mark_course_seen(user, course):
+    '''浏览课程论坛列表：水位推进到当前最新帖子，清空例外集合'''
+    latest = models.Post.objects.filter(course=course).aggregate(m=Max('id'))['m'] or 0
+    models.CourseReadState.objects.update_or_create(
+        user=user, course=course,
+        defaults={'lastSeenAt': timezone.now(), 'lastSeenPostId': latest, 'readAfter': ''},
+    )
+
+
+def mark_post_read(user, post):
+    '''阅读单个帖子：水位之后的帖子记入例外集合，并尽量推进水位'''
+    if not post.course_id:
+        return
+    state = models.CourseReadState.objects.filter(user=user, course_id=post.course_id).first()
+    if state is None:
+        state = models.CourseReadState(user=user, course_id=post.course_id,
+                                       lastSeenAt=timezone.now(), lastSeenPostId=0)
+    if post.id <= state.lastSeenPostId:
+        return
+    read_ids = state.read_after_ids()
+    if post.id in read_ids:
+        return
+    read_ids.add(post.id)
+
+    # 水位之后连续已读的帖子直接并入水位
+    next_ids = models.Post.objects.filter(course_id=post.course_id, id__gt=state.lastSeenPostId) \
+        .order_by('id').values_list('id', flat=True)[:len(read_ids) + 1]
+    for pid in next_ids:
+        if pid not in read_ids:
+            break
+        state.lastSeenPostId = pid
+        read_ids.discard(pid)
+
+    # 例外集合过大时直接推进到其中最大的ID，宁可少报未读
+    if len(read_ids) > MAX_READ_AFTER:
+        state.lastSeenPostId = max(read_ids)
+        read_ids = set()
+    state.readAfter = ','.join(str(pid) for pid in sorted(read_ids))
+    state.save()
+
+
+def unread_counts(user, course_ids):
+    '''多门课程的未读帖子数
+
+    Args:
+        user (User): 当前用户
+        course_ids (iterable): 课程ID
+
+    Returns:
+        dict: {course_id: 未读数}
+    '''
+    course_ids = list(course_ids)
+    if not user or not course_ids:
+        return {}
+    return unread_counts_for(user, course_ids, states_for(user, course_ids))
+
+
+def states_for(user, course_ids):
+    '''{course_id: CourseReadState}，没有浏览过的课程不在其中'''
+    return {s.course_id: s for s in models.CourseReadState.objects.filter(user=user, course_id__in=list(course_ids))}
+
+
+def unread_counts_for(user, course_ids, states):
+    '''同 unread_counts()，阅读水位已由 states_for() 读出'''
+    unread = Q()
+    for course_id in course_ids:
+        state = states.get(course_id)
+        condition = Q(course_id=course_id)
+        if state:
+            condition &= Q(id__gt=state.lastSeenPostId)
+            read_ids = state.read_after_ids()
+            if read_ids:
+                condition &= ~Q(id__in=read_ids)
+        unread |= condition
+    counts = dict.fromkeys(course_ids, 0)
+    if course_ids:
+        counts.update(models.Post.objects.filter(unread).exclude(author=user).order_by()
+                      .values('course_id').annotate(n=Count('id')).values_list('course_id', 'n'))
+    return counts
+
+
+def unread_announces(course_ids, states):
+    '''水位之后的课程通知（查询集，可继续排序 / 计数）'''
+    unread = Q()
+    for course_id in course_ids:
+        state = states.get(course_id)
+        unread |= Q(course_id=course_id, id__gt=state.lastSeenAnnounceId if state else 0)
+    if not course_ids:
+        return models.Announce.objects.none()
+    return models.Announce.objects.filter(unread)
+
+
+def advance_announces(user, course_ids, read_ids):
+    '''通知水位推进到水位之后连续已读的最后一条
+
+    Args:
+        user (User): 学生
+        course_ids (iterable): 课程ID
+        read_ids (set): 已读的通知ID（水位之后、不在其中的通知仍算未读，水位停在它之前）
+    '''
+    course_ids = list(course_ids)
+    states = states_for(user, course_ids)
+    advanced = {}
+    stopped = set()
+    for announce_id, course_id in unread_announces(course_ids, states).order_by('course_id', 'id') \
+            .values_list('id', 'course_id'):
+        if course_id in stopped:
+            continue
+        if announce_id in read_ids:
+            advanced[course_id] = announce_id
+        else:
+            stopped.add(course_id)
+    for course_id, announce_id in advanced.items():
+        state = states.get(course_id)
+        if state is None:
+            models.CourseReadState.objects.create(user=user, course_id=course_id, lastSeenAt=timezone.now(),
+                                                  lastSeenAnnounceId=announce_id)
+        else:
+            models.CourseReadState.objects.filter(id=state.id, lastSeenAnnounceId__lt=announce_id) \
+                .update(lastSeenAnnounceId=announce_id)
+
+
+def user_course_ids(user):
+    '''学生的选课课程ID / 老师的任课课程ID'''
+    if user.type == 1:
+        return list(models.StudentCourse.objects.filter(student_id=user.id, course__isDeleted=False).values_list('course_id', flat=True))
+    if user.type == 2:
+        return list(models.Course.objects.filter(teacher_id=user.id).values_list('id', flat=True))
+    return []
+
+
+def annotate_unread(user, courses):
+    '''为课程对象附加 unread_count 属性（供模板使用）'''
+    courses = list(courses)
+    counts = unread_counts(user, [course.id for course in courses])
+    for course in courses:
+        course.unread_count = counts.get(course.id, 0)
+    return courses
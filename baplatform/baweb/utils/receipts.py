@@ -0,0 +1,170 @@
+"""
+课程通知已读回执（位图）
+
+每个选课学生在课程内有一个固定的名单序号（StudentCourse.slot，由 Course.rosterSlots 递增分配，退课后不复用），
+每条通知只保存一行已读位图（AnnounceReceipt.bits），第 i 位表示序号为 i 的学生已读，
+而不是每个学生每条通知一行。
+- 学生读过通知时（浏览通知页或在个人消息中标记已读，统一经过 inbox.mark_announces_read()），
+  这些通知在一个事务中各做一次按位或
+- 课程名单位图由当前选课记录一次查询得到；已读人数 = popcount(已读位图 & 名单位图)，
+  未读名单 = 名单位图 & ~已读位图。退课学生的旧位不在名单位图中，自然被排除
+
+位图按小端字节存储，首字节标记编码：0 原样，1 zlib 压缩（取较短者）。
+"""
+
+import zlib
+
+from django.db import transaction
+from django.db.models import F
+
+from baweb import models
+
+
+RAW = 0
+ZLIB = 1
+
+
+def encode(bits):
+    '''整数位图 → 存储字节'''
+    raw = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    packed = zlib.compress(raw)
+    if len(packed) < len(raw):
+        return bytes([ZLIB]) + packed
+    return bytes([RAW]) + raw
+
+
+def decode(data):
+    '''存储字节 → 整数位图'''
+    data = bytes(data or b'')
+    if not data:
+        return 0
+    raw = zlib.decompress(data[1:]) if data[0] == ZLIB else data[1:]
+    return int.from_bytes(raw, 'little')
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+def slots_of(bits):
+    '''位图中为 1 的序号'''
+    slot = 0
+    while bits:
+        if bits & 1:
+            yield slot
+        bits >>= 1
+        slot += 1
+
+
+def allocate_slots(course_id, count):
+    '''为课程分配 count 个新的名单序号
+
+    Returns:
+        range: 分配到的序号
+    '''
+    with transaction.atomic():
+        models.Course.all_objects.filter(id=course_id).update(rosterSlots=F('rosterSlots') + count)
+        end = models.Course.all_objects.filter(id=course_id).values_list('rosterSlots', flat=True).get()
+    return range(end - count, end)
+
+
+def rosters(course_ids):
+    '''课程名单位图（一次查询）
+
+    Returns:
+        dict: {课程ID: 名单位图}
+    '''
+    result = dict.fromkeys(course_ids, 0)
+    for course_id, slot in models.StudentCourse.objects.filter(
+            course_id__in=list(course_ids), slot__isnull=False).values_list('course_id', 'slot'):
+        result[course_id] |= 1 << slot
+    return result
+
+
+def mark_read(user, announces):
+    '''学生读过这些通知：各自的已读位图按位或上该学生的序号
+
+    Args:
+        user (User): 学生
+        announces (iterable): 通知（只用到 id、course_id）
+    '''
+    announces = [(a.id, a.course_id) for a in announces]
+    if not announces:
+        return
+    slots = dict(models.StudentCourse.objects.filter(
+        student_id=user.id, course_id__in={course_id for _, course_id in announces}, slot__isnull=False)
+        .values_list('course_id', 'slot'))
+    wanted = {announce_id: 1 << slots[course_id] for announce_id, course_id in announces if course_id in slots}
+    if not wanted:
+        return
+    with transaction.atomic():
+        models.AnnounceReceipt.objects.bulk_create(
+            [models.AnnounceReceipt(announce_id=announce_id) for announce_id in wanted], ignore_conflicts=True)
+        changed = []
+        for receipt in models.AnnounceReceipt.objects.select_for_update().filter(announce_id__in=list(wanted)):
+            bits = decode(receipt.bits)
+            if bits & wanted[receipt.announce_id]:
+                continue
+            receipt.bits = encode(bits | wanted[receipt.announce_id])
+            changed.append(receipt)
+        models.AnnounceReceipt.objects.bulk_update(changed, ['bits', 'updatedAt'], batch_size=500)
+
+
+def _read_bits(announce_ids):
+    return {announce_id: decode(bits) for announce_id, bits in
+            models.AnnounceReceipt.objects.filter(announce_id__in=list(announce_ids)).values_list('announce_id', 'bits')}
+
+
+def read_ids(user, announces):
+    '''这些通知中该学生已读的通知ID（两次查询）'''
+    announces = [(a.id, a.course_id) for a in announces]
+    if not announces:
+        return set()
+    slots = dict(models.StudentCourse.objects.filter(
+        student_id=user.id, course_id__in={course_id for _, course_id in announces}, slot__isnull=False)
+        .values_list('course_id', 'slot'))
+    read = _read_bits(announce_id for announce_id, course_id in announces if course_id in slots)
+    return {announce_id for announce_id, course_id in announces
+            if course_id in slots and read.get(announce_id, 0) >> slots[course_id] & 1}
+
+
+def read_counts(announces):
+    '''已读人数（两次查询，与通知条数无关）
+
+    Args:
+        announces (iterable): 通知（只用到 id、course_id）
+
+    Returns:
+        dict: {通知ID: (已读人数, 选课人数)}
+    '''
+    announces = [(a.id, a.course_id) for a in announces]
+    if not announces:
+        return {}
+    roster_bits = rosters({course_id for _, course_id in announces})
+    read = _read_bits(announce_id for announce_id, _ in announces)
+    result = {}
+    for announce_id, course_id in announces:
+        roster = roster_bits[course_id]
+        result[announce_id] = (popcount(read.get(announce_id, 0) & roster), popcount(roster))
+    return result
+
+
+def summary(announce):
+    '''单条通知的已读情况（两次查询）
+
+    Returns:
+        dict: read 已读人数、total 选课人数、unread 未读学生 [{id, username, name}]（按学号排序）
+    '''
+    roster = 0
+    students = {}
+    for slot, student_id, username, name in models.StudentCourse.objects.filter(
+            course_id=announce.course_id, slot__isnull=False) \
+            .values_list('slot', 'student_id', 'student__user__username', 'student__name'):
+        roster |= 1 << slot
+        students[slot] = {'id': student_id, 'username': username, 'name': name}
+    read = _read_bits([announce.id]).get(announce.id, 0)
+    return {
+        'read': popcount(read & roster),
+        'total': popcount(roster),
+        'unread': sorted((students[slot] for slot in slots_of(roster & ~read)), key=lambda s: s['username']),
+    }
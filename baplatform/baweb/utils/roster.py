@@ -0,0 +1,385 @@
+"""
+批量导入名单（学生 / 老师）
+
+- 读取：xlsx 用 openpyxl 只读模式逐行读取（沿用导入模板：前四行为表头，B 列学号/工号，C 列姓名）；
+  csv / tsv 第一行为表头，按「学号 / 姓名」等列名定位，找不到时取前两列（与导出的名单格式一致）
+- 写入：已有账号和本课程已选学生各一次预取到内存，新账号、学生信息、选课记录分块 bulk_create，
+  整个导入在一个事务中完成
+- 返回汇总：新建账号数、新增选课数、跳过的行及原因
+
+上传后的导入作为后台任务执行（roster.students / roster.teachers，见 baweb/utils/jobs.py）。
+
+名单查询 page() 按学号 / 姓名（含拼音、首字母，见 baweb/utils/namesearch.py）前缀搜索、排序并键集分页，提交数和平均得分率由
+最新提交指针（LatestSubmission）上的聚合子查询算出，一页固定两次查询（总数和本页）。
+"""
+
+import base64
+import csv
+import io
+import json
+import os
+import zipfile
+
+from django.db import transaction
+from django.db.models import Avg, Count, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from baweb import models
+from baweb.utils import dashboard, gradestats, jobs, namesearch, receipts, schedule, submission
+from baweb.utils.encrypt import md5
+
+
+BATCH_SIZE = 500
+TEMPLATE_MIN_ROW = 5
+USERNAME_HEADERS = ('学号', '工号', '账号', '用户名', 'username')
+NAME_HEADERS = ('姓名', '名字', 'name')
+MAX_ERRORS = 50
+
+# 文件无法解析时 read_rows() 的生成器抛出的异常
+FORMAT_ERRORS = (InvalidFileException, zipfile.BadZipFile, csv.Error)
+
+_username_max_length = models.User._meta.get_field('username').max_length
+_name_max_length = models.StudentInfo._meta.get_field('name').max_length
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Excel 把学号存成数字
+    return str(value).strip()
+
+
+def _xlsx_rows(file_obj, on_total=None):
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        if on_total and sheet.max_row:
+            on_total(max(sheet.max_row - TEMPLATE_MIN_ROW + 1, 0))
+        for line, row in enumerate(sheet.iter_rows(min_row=TEMPLATE_MIN_ROW, values_only=True), TEMPLATE_MIN_ROW):
+            row = tuple(row) + (None, None, None)
+            yield line, _cell(row[1]), _cell(row[2])
+    finally:
+        workbook.close()
+
+
+def _column(header, names, default):
+    for index, title in enumerate(header):
+        if title.strip().lower() in names:
+            return index
+    return default
+
+
+def _text_rows(file_obj, delimiter):
+    text = io.TextIOWrapper(file_obj, encoding='utf-8-sig', errors='replace', newline='')
+    reader = csv.reader(text, delimiter=delimiter)
+    header = next(reader, [])
+    username_col = _column(header, USERNAME_HEADERS, 0)
+    name_col = _column(header, NAME_HEADERS, 1)
+    for line, row in enumerate(reader, 2):
+        username = row[username_col].strip() if len(row) > username_col else ''
+        name = row[name_col].strip() if len(row) > name_col else ''
+        yield line, username, name
+
+
+def read_rows(file_obj, on_total=None):
+    '''逐行读取上传的名单文件
+
+    Args:
+        file_obj (File): xlsx / csv / tsv 文件，按 name 的扩展名判断格式
+        on_total (callable): xlsx 文件读到总行数时回调
+
+    Returns:
+        generator: (行号, 学号, 姓名)
+    '''
+    ext = os.path.splitext(file_obj.name or '')[1].lower()
+    if ext == '.csv':
+        return _text_rows(file_obj, ',')
+    if ext in ('.tsv', '.txt'):
+        return _text_rows(file_obj, '\t')
+    return _xlsx_rows(file_obj, on_total)
+
+
+class _Summary(object):
+
+    def __init__(self):
+        self.created = 0
+        self.enrolled = 0
+        self.skipped = 0
+        self.errors = []
+
+    def skip(self, line, username, reason):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'line': line, 'username': username, 'reason': reason})
+
+    def as_dict(self):
+        return {'created': self.created, 'enrolled': self.enrolled, 'skipped': self.skipped, 'errors': self.errors}
+
+
+def _unique_rows(rows, summary, reporter=None):
+    '''过滤空行、超长学号和文件内重复的学号'''
+    result = {}
+    for line, username, name in rows:
+        if reporter:
+            reporter.step()
+        if not username:
+            continue
+        if len(username) > _username_max_length:
+            summary.skip(line, username, '学号过长')
+        elif username in result:
+            summary.skip(line, username, '文件内重复')
+        else:
+            result[username] = (line, name[:_name_max_length])
+    return result
+
+
+def _chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _bulk_create(model, objs, reporter=None):
+    '''分块插入；导入在一个事务中，每块之后写一次心跳（见 jobs.Reporter.beat）'''
+    for chunk in _chunks(objs):
+        model.objects.bulk_create(chunk)
+        if reporter:
+            reporter.beat()
+
+
+def _existing_users(usernames):
+    users = {}
+    for chunk in _chunks(usernames):
+        for user_id, username, user_type in models.User.objects.filter(username__in=chunk) \
+                .values_list('id', 'username', 'type'):
+            users[username] = (user_id, user_type)
+    return users
+
+
+def _create_users(usernames, user_type, reporter=None):
+    '''批量新建账号（初始密码为学号），返回 {学号: 用户ID}'''
+    _bulk_create(models.User,
+                 [models.User(username=username, password=md5(username), type=user_type) for username in usernames],
+                 reporter)
+    return {username: user_id for username, (user_id, _) in _existing_users(usernames).items()}
+
+
+def import_students(course, rows, reporter=None):
+    '''导入学生名单并加入课程
+
+    已存在的学生账号直接选课，不存在的新建账号和学生信息；已在本课程中的学生不重复选课。
+
+    Args:
+        course (Course): 课程
+        rows (iterable): (行号, 学号, 姓名)，见 read_rows()
+        reporter (jobs.Reporter): 后台任务中执行时用于写回已读取的行数
+
+    Returns:
+        dict: created 新建账号数、enrolled 新增选课数、skipped 跳过行数、errors 跳过原因（最多 MAX_ERRORS 条）
+    '''
+    summary = _Summary()
+    wanted = _unique_rows(rows, summary, reporter)
+
+    with transaction.atomic():
+        # 先锁住课程行（SQLite 上即取得写锁）：同一课程的并发导入依次执行，
+        # 下面读到的已选学生不会过期，选课记录不会冲突，名单序号也不会分配给插入失败的行
+        models.Course.all_objects.filter(id=course.id).update(rosterSlots=F('rosterSlots'))
+        existing = _existing_users(wanted)
+        student_ids = []
+        for username, (user_id, user_type) in existing.items():
+            if user_type != 1:
+                summary.skip(wanted[username][0], username, '该账号不是学生')
+            else:
+                student_ids.append(user_id)
+
+        new_usernames = [username for username in wanted if username not in existing]
+        created = _create_users(new_usernames, 1, reporter)
+        summary.created = len(created)
+
+        has_info = set()
+        for chunk in _chunks(student_ids):
+            has_info.update(models.StudentInfo.objects.filter(user_id__in=chunk).values_list('user_id', flat=True))
+        new_infos = [models.StudentInfo(user_id=user_id, name=wanted[username][1] or '未知')
+                     for username, user_id in created.items()]
+        new_infos += [models.StudentInfo(user_id=user_id) for user_id in student_ids if user_id not in has_info]
+        _bulk_create(models.StudentInfo, new_infos, reporter)
+        namesearch.index_many((info.user_id, 1, info.name) for info in new_infos)
+        if reporter:
+            reporter.beat()
+
+        enrolled = set(models.StudentCourse.objects.filter(course=course).values_list('student_id', flat=True))
+        new_ids = [user_id for user_id in student_ids if user_id not in enrolled] + list(created.values())
+        # bulk_create 不触发 pre_save，在这里分配名单序号
+        _bulk_create(models.StudentCourse,
+                     [models.StudentCourse(student_id=user_id, course=course, slot=slot)
+                      for user_id, slot in zip(new_ids, receipts.allocate_slots(course.id, len(new_ids)))],
+                     reporter)
+        summary.enrolled = len(new_ids)
+        summary.skipped += len(student_ids) + len(created) - len(new_ids)  # 已在本课程中
+
+        # bulk_create 不触发 post_save，手动使相关缓存失效
+        transaction.on_commit(lambda: _invalidate(course.id, new_ids))
+    return summary.as_dict()
+
+
+def _invalidate(course_id, student_ids):
+    submission.invalidate_course(course_id)
+    gradestats.invalidate_course(course_id)
+    dashboard.invalidate_users(student_ids)
+    for student_id in student_ids:
+        schedule.invalidate_user(student_id)
+
+
+def import_teachers(rows, reporter=None):
+    '''导入老师名单，已存在的账号跳过
+
+    Returns:
+        dict: 同 import_students()，enrolled 恒为 0
+    '''
+    summary = _Summary()
+    wanted = _unique_rows(rows, summary, reporter)
+
+    with transaction.atomic():
+        existing = _existing_users(wanted)
+        for username in existing:
+            summary.skip(wanted[username][0], username, '账号已存在')
+        created = _create_users([username for username in wanted if username not in existing], 2, reporter)
+        new_infos = [models.TeacherInfo(user_id=user_id) for user_id in created.values()]
+        _bulk_create(models.TeacherInfo, new_infos, reporter)
+        namesearch.index_many((info.user_id, 2, info.name) for info in new_infos)
+        summary.created = len(created)
+    return summary.as_dict()
+
+
+def _job_rows(job, reporter):
+    job.file.open('rb')
+    return read_rows(job.file, reporter.set_total)
+
+
+@jobs.register('roster.students')
+def students_job(job, reporter):
+    course = models.Course.objects.filter(id=job.get_params().get('course_id')).first()
+    if course is None:
+        raise jobs.JobError('课程不存在')
+    try:
+        with job.file:
+            return import_students(course, _job_rows(job, reporter), reporter)
+    except FORMAT_ERRORS:
+        raise jobs.JobError('文件格式错误，请上传 xlsx / csv / tsv 名单')
+
+
+@jobs.register('roster.teachers')
+def teachers_job(job, reporter):
+    try:
+        with job.file:
+            return import_teachers(_job_rows(job, reporter), reporter)
+    except FORMAT_ERRORS:
+        raise jobs.JobError('文件格式错误，请上传 xlsx / csv / tsv 名单')
+
+
+# ---------------- 名单查询 ----------------
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+NO_AVERAGE = -1.0  # 没有提交的学生排序时的平均得分率
+
+# 排序字段 → 查询中的列名
+SORT_FIELDS = {
+    'username': 'student__user__username',
+    'name': 'student__name',
+    'submits': 'submits',
+    'average': 'average',
+}
+
+
+class CursorError(ValueError):
+    '''分页游标无法解析'''
+
+
+def _encode_cursor(value, username):
+    raw = json.dumps([value, username], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    try:
+        value, username = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError, UnicodeError):
+        raise CursorError('分页游标不合法')
+    if not isinstance(username, str) or isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise CursorError('分页游标不合法')
+    return value, username
+
+
+def _annotated(course):
+    '''选课记录附加提交数和平均得分率（均只看本人在本课程各任务的最新提交）'''
+    latest = submission.latest_uploaded(student_id=OuterRef('student_id'), assignment__course_id=course.id) \
+        .values('student_id')
+    submits = latest.annotate(n=Count('id')).values('n')
+    percent = ExpressionWrapper(F('submission__marks') * 100.0 / F('submission__max_marks'), output_field=FloatField())
+    average = latest.annotate(a=Avg(percent)).values('a')
+    return models.StudentCourse.objects.filter(course=course).select_related('student__user').annotate(
+        submits=Coalesce(Subquery(submits, output_field=IntegerField()), Value(0)),
+        average=Coalesce(Subquery(average, output_field=FloatField()), Value(NO_AVERAGE)),
+    )
+
+
+def page(course, q='', sort='username', descending=False, cursor=None, limit=PAGE_SIZE):
+    '''选课名单一页
+
+    Args:
+        course (Course): 课程
+        q (str): 学号前缀，或姓名、全拼、拼音首字母的前缀
+        sort (str): 排序字段，见 SORT_FIELDS；同值按学号排序
+        descending (bool): 是否倒序
+        cursor (str): 上一页返回的 next，为空表示第一页
+        limit (int): 每页人数，不超过 MAX_PAGE_SIZE
+
+    Returns:
+        dict: total 符合搜索条件的人数，students [{id, username, name, gender, email, submits, average}]，
+              next 下一页游标（没有下一页时为空）
+
+    Raises:
+        CursorError: 游标不合法
+        ValueError: 排序字段不合法
+    '''
+    if sort not in SORT_FIELDS:
+        raise ValueError('排序字段不合法')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    column = SORT_FIELDS[sort]
+    query = _annotated(course)
+    if q:
+        # 学号前缀用范围条件，可以走 username 的唯一索引
+        query = query.filter(namesearch.student_q(q))
+    total = query.count()
+
+    if cursor:
+        value, username = _decode_cursor(cursor)
+        op = 'lt' if descending else 'gt'
+        query = query.filter(Q(**{f'{column}__{op}': value})
+                             | Q(**{column: value, f'student__user__username__{op}': username}))
+    prefix = '-' if descending else ''
+    rows = list(query.order_by(prefix + column, prefix + 'student__user__username')[:limit + 1])
+
+    students = []
+    for row in rows[:limit]:
+        student = row.student
+        students.append({
+            'id': student.user_id,
+            'username': student.user.username,
+            'name': student.name,
+            'gender': student.get_gender_display(),
+            'email': student.email,
+            'submits': row.submits,
+            'average': None if row.average == NO_AVERAGE else round(row.average, 1),
+        })
+    next_cursor = ''
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        value = {'username': last.student.user.username, 'name': last.student.name,
+                 'submits': last.submits, 'average': last.average}[sort]
+        next_cursor = _encode_cursor(value, last.student.user.username)
+    return {'total': total, 'students': students, 'next': next_cursor}
@@ -0,0 +1,159 @@
+"""
+日历：用户相关任务截止日期
+
+- user_events()：学生的选课课程 / 老师的任课课程中的全部任务，一次关联查询取出后按用户缓存
+- 缓存条目记录生成时各课程的版本号，任务变更时只需更新课程版本（见 baweb/signals.py），
+  选课变更时删除该学生的缓存
+- to_ics()：生成 iCalendar 订阅内容，订阅链接用 signing 令牌代替登录
+"""
+
+import datetime
+import hashlib
+import uuid
+
+from django.core import signing
+from django.core.cache import cache
+
+from baweb import models
+from baweb.utils import readstate
+
+
+CACHE_TIMEOUT = 600
+ICS_SALT = 'baweb.calendar.ics'
+
+
+def _user_key(user_id):
+    return f'calendar:user:{user_id}'
+
+
+def _course_key(course_id):
+    return f'calendar:course:{course_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(_user_key(user_id))
+
+
+def invalidate_course(course_id, teacher_id=None):
+    '''课程的任务发生变化：更新课程版本，所有包含该课程的用户缓存随之失效'''
+    cache.set(_course_key(course_id), uuid.uuid4().hex, None)
+    if teacher_id:
+        invalidate_user(teacher_id)
+
+
+def _load_events(user):
+    if user.type == 1:
+        query = models.Assignment.objects.filter(course__student_course__student_id=user.id)
+    elif user.type == 2:
+        query = models.Assignment.objects.filter(course__teacher_id=user.id)
+    else:
+        return []
+    rows = query.filter(course__isDeleted=False) \
+        .values('id', 'name', 'ddl', 'course_id', 'course__name').order_by('ddl', 'id')
+    return [{
+        'id': row['id'],
+        'name': row['name'],
+        'date': row['ddl'],
+        'course_id': row['course_id'],
+        'course': row['course__name'],
+        'url': f"/assignment/{row['id']}/page",
+    } for row in rows]
+
+
+def user_events(user):
+    '''用户日历中的全部任务（带缓存）
+
+    Returns:
+        list: dict(id, name, date, course_id, course, url)，按截止日期排序
+    '''
+    entry = cache.get(_user_key(user.id))
+    if entry:
+        versions = cache.get_many([_course_key(cid) for cid in entry['courses']])
+        if versions == entry['versions']:
+            return entry['events']
+
+    course_ids = readstate.user_course_ids(user)
+    versions = cache.get_many([_course_key(cid) for cid in course_ids])
+    events = _load_events(user)
+    cache.set(_user_key(user.id), {
+        'courses': course_ids,
+        'versions': versions,
+        'events': events,
+    }, CACHE_TIMEOUT)
+    return events
+
+
+def events_between(user, start=None, end=None):
+    '''截止日期在 [start, end] 内的任务'''
+    return [
+        event for event in user_events(user)
+        if (start is None or event['date'] >= start) and (end is None or event['date'] <= end)
+    ]
+
+
+def events_etag(events):
+    digest = hashlib.md5()
+    for event in events:
+        digest.update(f"{event['id']}|{event['name']}|{event['date']}|{event['course']}\n".encode('utf-8'))
+    return f'"{digest.hexdigest()}"'
+
+
+def ics_token(user):
+    return signing.dumps(user.id, salt=ICS_SALT)
+
+
+def ics_user_id(token):
+    '''校验订阅令牌
+
+    Returns:
+        int: 用户ID，令牌无效时返回 None
+    '''
+    try:
+        return signing.loads(token, salt=ICS_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def _ics_escape(text):
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _fold(line):
+    '''按 RFC 5545 把超过 75 字节的行折行'''
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    return '\r\n '.join(parts)
+
+
+def to_ics(events, base_url=''):
+    '''生成 iCalendar 文本（每个任务一个全天事件）'''
+    stamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//baplatform//calendar//ZH',
+        'CALSCALE:GREGORIAN',
+        'X-WR-CALNAME:任务截止日期',
+    ]
+    for event in events:
+        lines += [
+            'BEGIN:VEVENT',
+            f"UID:assignment-{event['id']}@baplatform",
+            f'DTSTAMP:{stamp}',
+            f"DTSTART;VALUE=DATE:{event['date'].strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{(event['date'] + datetime.timedelta(days=1)).strftime('%Y%m%d')}",
+            f"SUMMARY:{_ics_escape(event['course'] + '：' + event['name'])}",
+            f"URL:{base_url}{event['url']}",
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
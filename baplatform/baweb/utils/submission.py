@@ -0,0 +1,118 @@
+"""
+任务提交状态
+
+按任务计算选课学生中已提交 / 未提交 / 逾期提交的学生集合：
+选课名单、每个学生的最早提交时间各一次聚合查询，（小组任务）本课程的小组成员见 baweb/utils/groups.py，其余为集合运算。
+结果按任务缓存；提交变化时删除该任务的缓存，选课或小组变化时更新课程版本（见 baweb/signals.py）。
+"""
+
+import datetime
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+
+from baweb import models
+from baweb.utils import groups
+
+
+CACHE_TIMEOUT = 600
+
+
+def _assignment_key(assignment_id):
+    return f'submission:assignment:{assignment_id}'
+
+
+def _course_key(course_id):
+    return f'submission:course:{course_id}'
+
+
+def invalidate_assignment(assignment_id):
+    cache.delete(_assignment_key(assignment_id))
+
+
+def invalidate_course(course_id):
+    '''选课名单或小组变化：该课程所有任务的缓存失效'''
+    cache.set(_course_key(course_id), uuid.uuid4().hex, None)
+
+
+def uploaded(**filters):
+    '''已提交的记录：上传了文件的提交
+
+    批量打分为未提交学生补建的无文件记录只有成绩，不算提交。判断"是否已提交"的地方都应经过这里或 latest_uploaded()。
+    '''
+    return models.AssignmentSubmit.objects.filter(**filters).exclude(file='')
+
+
+def latest_uploaded(**filters):
+    '''最新一次提交是上传了文件的提交的最新提交指针（见 baweb/utils/latest.py）'''
+    return models.LatestSubmission.objects.filter(**filters).exclude(submission__file='')
+
+
+def latest_graded(**filters):
+    '''最新一次提交已打分的最新提交指针
+
+    成绩以最新一次提交为准：还没有打分的上传（分数是默认的 0）不算成绩，只有分数的记录算。
+    成绩册、成绩统计、学生主页的成绩都经过这里。
+    '''
+    return models.LatestSubmission.objects.filter(submission__gradedAt__isnull=False, **filters)
+
+
+def deadline(ddl):
+    '''截止日期当天结束（当前时区）'''
+    end = datetime.datetime.combine(ddl, datetime.time.max)
+    return timezone.make_aware(end) if settings.USE_TZ else end
+
+
+def _compute(assignment):
+    enrolled = set(models.StudentCourse.objects.filter(
+        course_id=assignment.course_id).values_list('student_id', flat=True))
+    first_submit = dict(uploaded(assignment=assignment)
+                        .values('student_id').annotate(first=Min('submit_time'))
+                        .values_list('student_id', 'first'))
+
+    if assignment.is_group:
+        # 小组任务：组内任一成员提交即视为全组提交，提交时间取组内最早
+        group_of = groups.group_of(assignment.course_id)
+        group_submit = {}
+        for student_id, submitted_at in first_submit.items():
+            key = group_of.get(student_id, ('student', student_id))
+            if key not in group_submit or submitted_at < group_submit[key]:
+                group_submit[key] = submitted_at
+        submit_time = {}
+        for student_id in enrolled:
+            key = group_of.get(student_id, ('student', student_id))
+            if key in group_submit:
+                submit_time[student_id] = group_submit[key]
+    else:
+        submit_time = {sid: t for sid, t in first_submit.items() if sid in enrolled}
+
+    due = deadline(assignment.ddl)
+    submitted = set(submit_time)
+    return {
+        'enrolled': enrolled,
+        'submitted': submitted,
+        'unsubmitted': enrolled - submitted,
+        'late': {sid for sid, t in submit_time.items() if t > due},
+    }
+
+
+def assignment_status(assignment):
+    '''任务的提交状态（带缓存）
+
+    Args:
+        assignment (Assignment): 任务
+
+    Returns:
+        dict: enrolled / submitted / unsubmitted / late，均为学生ID（即用户ID）集合，late 是 submitted 的子集
+    '''
+    key = _assignment_key(assignment.id)
+    version = cache.get(_course_key(assignment.course_id))
+    entry = cache.get(key)
+    if entry and entry['version'] == version:
+        return entry['status']
+    status = _compute(assignment)
+    cache.set(key, {'version': version, 'status': status}, CACHE_TIMEOUT)
+    return status
@@ -0,0 +1,333 @@
+"""
+分片断点续传（类似 tus 协议）
+
+- create()：声明文件名、大小和目标（课件 / 任务文档 / 任务提交），得到上传ID
+- append()：按偏移量追加一个分片。请求体边读边写入临时文件的对应位置，不整体读入内存；
+  偏移量必须等于已确认的 offset，否则返回当前 offset 让客户端从那里继续。
+  写完后用 offset 的比较更新确认（同一分片的并发重试只有一个生效，内容相同的重复写入无害）
+- finalize()：全部字节到齐后校验客户端给出的校验和（crc32 / md5 / sha1 / sha256），
+  通过后把临时文件移动（不复制）到目标记录的存储位置并创建 CourseFiles / AssignmentFile / AssignmentSubmit；
+  校验失败时清空已上传的内容，需要重新上传。重复调用返回同一条记录。
+  其他错误（如写数据库失败）回到可续传状态：已移走的临时文件放回原处，放不回时删除并需要重新上传。
+  完成请求中途中断（进程退出）时上传停在校验中，超过 UPLOAD_FINALIZE_TIMEOUT 后可以再次完成
+- collect_garbage()：删除超过 UPLOAD_EXPIRE_HOURS 没有写入的上传及其临时文件（clean_uploads 命令定时运行）
+
+临时文件放在 MEDIA_ROOT/PARTIAL_DIR 下，与正式文件同一文件系统，完成时只需重命名。
+"""
+
+import datetime
+import hashlib
+import os
+import zlib
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from baweb import models
+
+
+PARTIAL_DIR = 'partial_uploads'
+READ_BLOCK_SIZE = 64 * 1024
+CHECKSUM_ALGORITHMS = ('crc32', 'md5', 'sha1', 'sha256')
+
+TARGETS = {
+    'coursefile': 1,
+    'assignmentfile': 2,
+    'submit': 3,
+}
+
+
+class UploadError(Exception):
+    '''上传请求不合法'''
+
+
+def _dir():
+    return os.path.join(settings.MEDIA_ROOT, PARTIAL_DIR)
+
+
+def _path(upload):
+    return os.path.join(_dir(), f'{upload.id.hex}.part')
+
+
+class _Crc32(object):
+    '''与 hashlib 接口一致的 crc32'''
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return '%08x' % self.value
+
+
+def _parse_checksum(checksum):
+    '''"算法:十六进制摘要" → (算法, 摘要)'''
+    algorithm, _, digest = (checksum or '').strip().lower().partition(':')
+    if algorithm not in CHECKSUM_ALGORITHMS or not digest:
+        raise UploadError('校验和格式应为 算法:摘要，算法为 ' + ' / '.join(CHECKSUM_ALGORITHMS))
+    return algorithm, digest
+
+
+def _digest(path, algorithm):
+    hasher = _Crc32() if algorithm == 'crc32' else hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _check_target(user, target, target_id):
+    '''校验上传目标和权限，返回 (course_id, assignment_id)'''
+    if target == 1:
+        course = models.Course.objects.filter(id=target_id).select_related('teacher').first()
+        if course and (course.teacher.user_id == user.id if user.type == 2 else
+                       models.StudentCourse.objects.filter(student_id=user.id, course=course).exists()):
+            return course.id, None
+    elif target in (2, 3):
+        assignment = models.Assignment.objects.filter(id=target_id, course__isDeleted=False) \
+            .select_related('course__teacher').first()
+        if assignment is None:
+            raise UploadError('任务不存在')
+        if target == 2 and user.type == 2 and assignment.course.teacher.user_id == user.id:
+            return assignment.course_id, assignment.id
+        if target == 3 and user.type == 1 and models.StudentCourse.objects.filter(
+                student_id=user.id, course_id=assignment.course_id).exists():
+            return assignment.course_id, assignment.id
+    else:
+        raise UploadError('上传目标不合法')
+    raise UploadError('没有权限')
+
+
+def create(user, target, target_id, file_name, size, checksum='', title=''):
+    '''新建上传
+
+    Args:
+        user (User): 上传者
+        target (str): coursefile / assignmentfile / submit
+        target_id (int): 课件为课程ID，任务文档和任务提交为任务ID
+        file_name (str): 文件名
+        size (int): 文件大小（字节）
+        checksum (str): 可选，"算法:摘要"，也可以在 finalize() 时给出
+        title (str): 可选，课件名 / 文档名，缺省为文件名
+
+    Returns:
+        Upload
+
+    Raises:
+        UploadError: 参数不合法或没有权限
+    '''
+    if target not in TARGETS:
+        raise UploadError('上传目标不合法')
+    file_name = os.path.basename((file_name or '').replace('\\', '/')).strip()
+    if not file_name:
+        raise UploadError('缺少文件名')
+    if not 0 < size <= settings.UPLOAD_MAX_SIZE:
+        raise UploadError('文件大小不合法，上限为 {} MB'.format(settings.UPLOAD_MAX_SIZE // 1024 ** 2))
+    if checksum:
+        _parse_checksum(checksum)
+    course_id, assignment_id = _check_target(user, TARGETS[target], target_id)
+    upload = models.Upload.objects.create(owner=user, target=TARGETS[target], course_id=course_id,
+                                          assignment_id=assignment_id, fileName=file_name[-64:],
+                                          title=(title or '').strip()[:64], size=size, checksum=checksum or '')
+    os.makedirs(_dir(), exist_ok=True)
+    open(_path(upload), 'wb').close()
+    return upload
+
+
+def append(upload, offset, stream, length):
+    '''在 offset 处写入一个分片
+
+    Args:
+        upload (Upload): 上传
+        offset (int): 客户端认为的已上传字节数
+        stream: 请求体（可 read(n)）
+        length (int): 分片长度（Content-Length）
+
+    Returns:
+        int: 确认后的 offset
+
+    Raises:
+        UploadError: 状态或偏移量不对（客户端应重新读取 offset 后继续）、分片超出文件大小或上限
+    '''
+    if upload.status != 1:
+        raise UploadError('上传已结束')
+    if offset != upload.offset:
+        raise UploadError('偏移量不一致')
+    if not 0 < length <= settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadError('分片大小不合法，上限为 {} MB'.format(settings.UPLOAD_CHUNK_MAX_SIZE // 1024 ** 2))
+    if offset + length > upload.size:
+        raise UploadError('分片超出文件大小')
+
+    written = 0
+    with open(_path(upload), 'r+b') as f:
+        f.seek(offset)
+        while written < length:
+            block = stream.read(min(READ_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            f.write(block)
+            written += len(block)
+    # 连接中断时只确认已写入的部分，客户端从新的 offset 继续
+    if written and models.Upload.objects.filter(id=upload.id, status=1, offset=offset) \
+            .update(offset=offset + written, updatedAt=timezone.now()):
+        upload.offset = offset + written
+        return upload.offset
+    upload.refresh_from_db(fields=['offset', 'status'])
+    return upload.offset
+
+
+class _PartFile(File):
+    '''已写完的临时文件：FileSystemStorage 保存时直接移动（见 temporary_file_path）'''
+
+    def __init__(self, file, path):
+        super().__init__(file)
+        self._path = path
+
+    def temporary_file_path(self):
+        return self._path
+
+
+def _target(upload):
+    '''未保存的目标记录'''
+    title = upload.title or upload.fileName
+    if upload.target == 1:
+        return models.CourseFiles(course_id=upload.course_id, file_name=title)
+    if upload.target == 2:
+        return models.AssignmentFile(assignment_id=upload.assignment_id, file_name=title)
+    return models.AssignmentSubmit(assignment_id=upload.assignment_id, student_id=upload.owner_id, file_name=title)
+
+
+def _attach(obj, upload, path):
+    '''临时文件移动到目标记录的存储位置并保存记录'''
+    with open(path, 'rb') as f:
+        obj.file.save(upload.fileName, _PartFile(f, path), save=True)
+
+
+def _put_back(obj, path):
+    '''完成失败（事务已回滚）：已移动到存储位置的文件放回临时文件位置
+
+    Returns:
+        bool: 临时文件是否还在；放不回去时删除存储位置的文件，返回 False
+    '''
+    if os.path.exists(path):
+        return True
+    if obj is None or not obj.file.name:
+        return False
+    storage, name = obj.file.storage, obj.file.name
+    if not storage.exists(name):
+        return False
+    try:
+        os.replace(storage.path(name), path)
+        return True
+    except (OSError, NotImplementedError):
+        storage.delete(name)
+        return False
+
+
+def finalize(upload, checksum=''):
+    '''校验并生成目标记录
+
+    Args:
+        upload (Upload): 上传
+        checksum (str): "算法:摘要"，缺省使用 create() 时给出的校验和
+
+    Returns:
+        int: 生成的记录ID
+
+    Raises:
+        UploadError: 未上传完、缺少校验和、校验失败（已清空，需要重新上传）、正在由其他请求校验
+    '''
+    if upload.status == 3:
+        return upload.objectId
+    stale = timezone.now() - datetime.timedelta(seconds=settings.UPLOAD_FINALIZE_TIMEOUT)
+    if upload.status == 2 and upload.updatedAt >= stale:
+        raise UploadError('正在校验，请稍后重试')
+    if upload.offset != upload.size:
+        raise UploadError('文件还没有上传完')
+    algorithm, digest = _parse_checksum(checksum or upload.checksum)
+    # 只有一个请求能进入校验；校验中超时的视为上次完成请求已中断，重新接手
+    if not models.Upload.objects.filter(Q(status=1) | Q(status=2, updatedAt__lt=stale), id=upload.id) \
+            .update(status=2, updatedAt=timezone.now()):
+        upload.refresh_from_db()
+        return finalize(upload, checksum)
+
+    path = _path(upload)
+    obj = None
+    try:
+        with open(path, 'r+b') as f:
+            f.truncate(upload.size)
+        if _digest(path, algorithm) != digest:
+            open(path, 'wb').close()
+            models.Upload.objects.filter(id=upload.id).update(status=1, offset=0, updatedAt=timezone.now())
+            raise UploadError('校验失败，请重新上传')
+        with transaction.atomic():
+            obj = _target(upload)
+            _attach(obj, upload, path)
+            models.Upload.objects.filter(id=upload.id).update(status=3, objectId=obj.id, checksum=f'{algorithm}:{digest}',
+                                                              updatedAt=timezone.now())
+    except Exception:
+        # 任何失败都回到可续传状态；临时文件可能已被移走，放回原处，放不回时需要从头重新上传
+        if _put_back(obj, path):
+            models.Upload.objects.filter(id=upload.id).update(status=1, updatedAt=timezone.now())
+        else:
+            open(path, 'wb').close()
+            models.Upload.objects.filter(id=upload.id).update(status=1, offset=0, updatedAt=timezone.now())
+        raise
+    upload.status, upload.objectId = 3, obj.id
+    return obj.id
+
+
+def cancel(upload):
+    '''放弃未完成的上传'''
+    if upload.status == 3:
+        raise UploadError('上传已完成')
+    models.Upload.objects.filter(id=upload.id).delete()
+    _remove(_path(upload))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def as_dict(upload):
+    return {
+        'id': str(upload.id),
+        'target': upload.target,
+        'file_name': upload.fileName,
+        'size': upload.size,
+        'offset': upload.offset,
+        'status': upload.status,
+        'object_id': upload.objectId,
+    }
+
+
+def collect_garbage(hours=None):
+    '''清理超过 hours 小时没有写入的上传
+
+    先删除过期的上传记录，再删除没有对应记录且同样过期的临时文件
+    （也包括课程、任务或用户被删除时级联删除了记录的临时文件）。已完成的上传没有临时文件，只删除记录。
+
+    Returns:
+        dict: uploads 删除的上传记录数、files 删除的临时文件数
+    '''
+    hours = settings.UPLOAD_EXPIRE_HOURS if hours is None else hours
+    cutoff = timezone.now() - datetime.timedelta(hours=hours)
+    uploads, _ = models.Upload.objects.filter(updatedAt__lt=cutoff).delete()
+
+    files = 0
+    if os.path.isdir(_dir()):
+        live = {upload_id.hex for upload_id in models.Upload.objects.values_list('id', flat=True)}
+        for entry in os.scandir(_dir()):
+            name, ext = os.path.splitext(entry.name)
+            if ext == '.part' and name not in live and entry.stat().st_mtime < cutoff.timestamp():
+                _remove(entry.path)
+                files += 1
+    return {'uploads': uploads, 'files': files}
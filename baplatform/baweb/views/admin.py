@@ -3,8 +3,8 @@ from django.http import JsonResponse,HttpResponse
 from django.shortcuts import redirect
 from django.views.decorators.csrf import csrf_exempt
 
-from openpyxl import load_workbook
 from ..utils.encrypt import md5
+from ..utils import analytics, jobs
 
 @csrf_exempt
 def teacher_import(request):
@@ -14,17 +14,27 @@ def teacher_import(request):
         return JsonResponse({"status": False, "msg": "没有权限"})
 
     file_obj = request.FILES.get('file')
-    wb = load_workbook(file_obj)
-    sheet = wb.worksheets[0]
+    if not file_obj:
+        return JsonResponse({"status": False, "msg": "请选择文件"})
+    job = jobs.submit('roster.teachers', user, upload=file_obj)
+    return JsonResponse({"status": True, "job_id": job.id})
 
-    for row in sheet.iter_rows(min_row=5):
-        username = str(row[1].value)
-        exists = models.User.objects.filter(username=username).exists()
-        if not exists:
-            if row[1].value != None:
-                user = models.User.objects.create(username=username, password=md5(username), type=2)
-                models.TeacherInfo.objects.create(user=user)
-    return JsonResponse({"status": True})
+def analytics_overview(request):
+    '''
+        全院看板数据（所有课程，只读汇总表）
+
+        参数:
+            start, end: YYYY-MM-DD，缺省为最近 30 天
+    '''
+    info = request.session.get("info", "")
+    user = models.User.objects.filter(id=info["id"]).first()
+    if user.type != 3:
+        return JsonResponse({"status": False, "msg": "没有权限"})
+    try:
+        start, end = analytics.parse_range(request.GET.get('start'), request.GET.get('end'))
+    except ValueError:
+        return JsonResponse({"status": False, "msg": "日期格式应为 YYYY-MM-DD，范围不超过一年"})
+    return JsonResponse({"status": True, **analytics.dashboard(None, start, end)})
 
 @csrf_exempt
 def teacher_add(request):
@@ -4,6 +4,7 @@ from django.views.decorators.csrf import csrf_exempt
 
 from baweb import models
 from ..forms.announceform import AnnounceForm
+from ..utils import inbox, receipts
 
 @csrf_exempt
 def announce_add(request):
@@ -18,13 +19,14 @@ def announce_add(request):
             return JsonResponse({"status":False, "msg":"没有权限"}) 
         obj.teacher = teacher
         obj.save()
+        inbox.notify_announce(obj)
         return JsonResponse({"status":True})
     return JsonResponse({"status":False, "msg":"加载失败"}) 
 
 @csrf_exempt
 def announce_edit(request, id):
     '''更新通知'''
-    old_obj = models.Announce.objects.filter(id=id).first()
+    old_obj = models.Announce.objects.filter(id=id, course__isDeleted=False).first()
     form = AnnounceForm(request.POST ,instance=old_obj)
     if form.is_valid():
         obj = form.save(commit=False)
@@ -35,5 +37,13 @@ def announce_edit(request, id):
 @csrf_exempt
 def announce_delete(request, id):
     '''删除通知'''
-    models.Announce.objects.filter(id=id).delete()
+    models.Announce.objects.filter(id=id, course__isDeleted=False).delete()
     return redirect('/announce/')  
+
+def announce_receipts(request, id):
+    '''通知的已读情况：已读人数 / 选课人数和未读学生名单'''
+    announce = models.Announce.objects.filter(id=id, course__isDeleted=False).select_related('course').first()
+    info_dict = request.session.get('info')
+    if not announce or announce.course.teacher_id != info_dict['id']:
+        return JsonResponse({"status":False, "msg":"没有权限"})
+    return JsonResponse({"status":True, "data":receipts.summary(announce)})
@@ -1,11 +1,13 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, Http404
+from django.utils.dateparse import parse_date
 from django.views.decorators.csrf import csrf_exempt
 
 from baweb import models
 from baweb.forms.assignmentforms import AssignmentFileForm, AssignmentSubmitForm, AssignmentMarkForm
 from ..forms.courseforms import CourseAssignmentForm
 from ..forms.userforms import UserChangePasswordForm
+from ..utils import latest, schedule
 
 
 def assignment_list(request, id):
@@ -57,7 +59,7 @@ def assignment_add(request, id):
 @csrf_exempt
 def assignment_des_update(request, id):
     des_richtext = request.POST.get('description_richtext')
-    models.Assignment.objects.filter(id=id).update(
+    models.Assignment.objects.filter(id=id, course__isDeleted=False).update(
         description_richtext=des_richtext)
     return JsonResponse({"status": True})
 
@@ -65,7 +67,7 @@ def assignment_des_update(request, id):
 def assignment_update(request, id, aid):
     '''更新任务'''
     title = "更新任务"
-    old_obj = models.Assignment.objects.filter(id=aid).first()
+    old_obj = models.Assignment.objects.filter(id=aid, course__isDeleted=False).first()
     if request.method == 'GET':
         form = CourseAssignmentForm(instance=old_obj)
         context = {
@@ -84,7 +86,7 @@ def assignment_update(request, id, aid):
 
 def assignment_delete(request, id, aid):
     '''删除任务'''
-    models.Assignment.objects.filter(id=aid).delete()
+    models.Assignment.objects.filter(id=aid, course__isDeleted=False).delete()
     return redirect('/course/{}/assignment/list'.format(id))
 
 
@@ -93,20 +95,17 @@ def assignment_page(request, id):
     username = info['name']
     user_id = info['id']
     user = models.User.objects.filter(id=info['id']).first()
-    assignment = models.Assignment.objects.filter(id=id).first()
+    assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
+    if not assignment:
+        raise Http404
     changepwd_form = UserChangePasswordForm
     if user.type == 2:
         is_teacher = 1
-        total_submit_list = models.AssignmentSubmit.objects.filter(
-            assignment=assignment).all()
-        students = []
+        # 每个学生一行（最新提交），历史提交在 submitfile_list 中按需查看
+        latest_list = latest.for_assignment(assignment)
         submit_list = []
-        for submit in total_submit_list:
-            if submit.student not in students:
-                submit_list.append(submit)
-                students.append(submit.student)
     elif user.type == 1:
-        students = []
+        latest_list = []
         student = models.StudentInfo.objects.filter(user=user).first()
         submit_list = models.AssignmentSubmit.objects.filter(
             assignment=assignment, student=student).all()
@@ -128,7 +127,7 @@ def assignment_page(request, id):
         "assignmentsubmitform": assignmentsubmitform,
         "marksform": marksform,
         "submit_list": submit_list,
-        "students": students,
+        "latest_list": latest_list,
     }
     return render(request, 'assignment_page.html', content)
 
@@ -136,42 +135,66 @@ def assignment_page(request, id):
 @csrf_exempt
 def remind(request):
     info = request.session.get("info", "")
-    user_id = info['id']
-    user = models.User.objects.filter(id=user_id).first()
-    if user.type == 1:
-        course_list = []
-        student = models.StudentInfo.objects.filter(user=user).first()
-        studentcourse = models.StudentCourse.objects.filter(
-            student=student).all()
-        for obj in studentcourse:
-            course_list.append(obj.course)
-    elif user.type == 2:
-        teacher = models.TeacherInfo.objects.filter(user=user).first()
-        course_list = models.Course.objects.filter(teacher=teacher).all()
-    ddl_list = []
-    assignment_name_list = []
-    assingment_url_list = []
-    count = 0
-    for course in course_list:
-        assignment_list = models.Assignment.objects.filter(course=course).all()
-        for assignment in assignment_list:
-            year, month, date = str(assignment.ddl).split('-')
-            ddl = "{}-{}-{}".format(int(year), int(month), int(date))
-            ddl_list.append(ddl)
-            assignment_name_list.append(assignment.name)
-            assingment_url_list.append("/assignment/{}/page".format(assignment.id))
-            count += 1
-    if count == 0:
-        res = {
-            "status": False
-        }
-    else:
-        res = {
-            "status": True,
-            "count": count, 
-            "ddls": ddl_list,
-            "names": assignment_name_list,
-            "urls": assingment_url_list, 
-        }
-    print(count)
+    user = models.User.objects.filter(id=info['id']).first()
+    events = schedule.user_events(user)
+    if not events:
+        return JsonResponse({"status": False})
+    res = {
+        "status": True,
+        "count": len(events),
+        "ddls": ["{}-{}-{}".format(e['date'].year, e['date'].month, e['date'].day) for e in events],
+        "names": [e['name'] for e in events],
+        "urls": [e['url'] for e in events],
+    }
     return JsonResponse(res)
+
+
+def calendar_events(request):
+    """
+    日历区间查询
+    
+    参数:
+        start, end: YYYY-MM-DD，包含两端，缺省表示不限
+    
+    Returns:
+        JsonResponse: events 为 {id, name, date, course, url} 列表
+    """
+    info = request.session.get("info", "")
+    user = models.User.objects.filter(id=info['id']).first()
+    bounds = []
+    for value in (request.GET.get('start'), request.GET.get('end')):
+        try:
+            date = parse_date(value) if value else None
+        except ValueError:  # 格式正确但日期不存在，如 2023-02-30
+            date = None
+        if value and date is None:
+            return JsonResponse({"status": False, "msg": "日期格式应为 YYYY-MM-DD"})
+        bounds.append(date)
+    events = [
+        {"id": e['id'], "name": e['name'], "date": e['date'].isoformat(), "course": e['course'], "url": e['url']}
+        for e in schedule.events_between(user, *bounds)
+    ]
+    return JsonResponse({"status": True, "events": events})
+
+
+def calendar_ics(request, token):
+    """
+    日历订阅（iCalendar），链接中的令牌代替登录，支持 ETag / If-None-Match
+    
+    Args:
+        token: schedule.ics_token() 生成的签名令牌
+    """
+    user_id = schedule.ics_user_id(token)
+    user = models.User.objects.filter(id=user_id).first() if user_id else None
+    if not user:
+        raise Http404
+    events = schedule.user_events(user)
+    etag = schedule.events_etag(events)
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(schedule.to_ics(events, request.build_absolute_uri('/')[:-1]),
+                                content_type='text/calendar; charset=utf-8')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=300'
+    return response
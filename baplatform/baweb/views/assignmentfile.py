@@ -2,12 +2,16 @@ from django.shortcuts import render, redirect
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
+import json
 import os
+from django.db.models import Max
+from django.utils import timezone
 from baweb import models
 from ..forms.assignmentforms import AssignmentFileForm, AssignmentSubmitForm, AssignmentMarkForm
+from ..utils import submission, export, grading, gradestats, inbox, latest
 
 def file_list(request, id):
-    assignment = models.Assignment.objects.filter(id=id).first()
+    assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
     info_dict = request.session.get('info')
     user = models.User.objects.filter(id=info_dict['id']).first()
     if user.type == 2:
@@ -29,7 +33,7 @@ def file_add(request, id):
     if form.is_valid():
         names = request.POST.getlist("file_name")
         files = request.FILES.getlist("file")
-        assignment = models.Assignment.objects.filter(id=id).first()
+        assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
         for i in range(len(files)):
             if user.type == 1:
                 student = models.StudentInfo.objects.filter(user=user).first()
@@ -45,9 +49,9 @@ def file_update(request, id, fid):
     info_dict = request.session.get('info')
     user = models.User.objects.filter(id=info_dict['id']).first()
     if user.type == 2:
-        old_obj = models.AssignmentFile.objects.filter(id=fid).first()
+        old_obj = models.AssignmentFile.objects.filter(id=fid, assignment__course__isDeleted=False).first()
     elif user.type == 1:
-        old_obj = models.AssignmentSubmit.objects.filter(id=fid).first()
+        old_obj = models.AssignmentSubmit.objects.filter(id=fid, assignment__course__isDeleted=False).first()
     if request.method == 'GET':
         if user.type == 2:
             form = AssignmentFileForm(instance=old_obj)
@@ -64,7 +68,7 @@ def file_update(request, id, fid):
         form = AssignmentSubmitForm(request.POST, request.FILES, instance=old_obj)
     if form.is_valid():
         obj = form.save(commit=False)
-        assignment = models.Assignment.objects.filter(id=id).first()
+        assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
         obj.assignment = assignment
         if user.type == 1:
             student = models.StudentInfo.objects.filter(user=user).first()
@@ -79,54 +83,34 @@ def file_delete(request, id, fid):
     user = models.User.objects.filter(id=info_dict['id']).first()
     dir = 'media/'
     if user.type == 2:
-        deletefile = models.AssignmentFile.objects.filter(id=fid)
+        deletefile = models.AssignmentFile.objects.filter(id=fid, assignment__course__isDeleted=False)
         for i in deletefile:
             ##print(dir+'{}'.format(i.file.name))
             os.remove(dir+'{}'.format(i.file.name))
-        models.AssignmentFile.objects.filter(id=fid).delete()
+        models.AssignmentFile.objects.filter(id=fid, assignment__course__isDeleted=False).delete()
     elif user.type == 1:
-        deletefile = models.AssignmentSubmit.objects.filter(id=fid)
+        deletefile = models.AssignmentSubmit.objects.filter(id=fid, assignment__course__isDeleted=False)
         for i in deletefile:
             ##print(dir+'{}'.format(i.file.name))
             os.remove(dir+'{}'.format(i.file.name))
-        models.AssignmentSubmit.objects.filter(id=fid).delete()
+        models.AssignmentSubmit.objects.filter(id=fid, assignment__course__isDeleted=False).delete()
     return redirect('/assignment/{}/page'.format(id))
 
 
 @csrf_exempt
 def submit_info(request, id):
-    assignment = models.Assignment.objects.filter(id=id).first()
-    total_submit_list = models.AssignmentSubmit.objects.filter(assignment=assignment).all()
-    studentscourse = models.StudentCourse.objects.filter(course=assignment.course).all()
-    unsubmit_student_list = []
-    count = 0
-    for studentcourse in studentscourse:
-        unsubmit_student_list.append(studentcourse.student)
-        count += 1
-    total_number = count
-    students = []
-    for submit in total_submit_list:
-        if submit.student not in students:
-            students.append(submit.student)
-            if assignment.is_group:
-                groupmember = models.GroupMember.objects.filter(student=submit.student).first()
-                group = groupmember.group
-                groupmembers = models.GroupMember.objects.filter(group=group).all()
-                for member in groupmembers:
-                    unsubmit_student_list.remove(member.student)
-                    count -= 1
-            else:
-                unsubmit_student_list.remove(submit.student)
-                count -= 1
-    unsubmit_number = count
+    assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
+    status = submission.assignment_status(assignment)
+    late_number = len(status['late'])
     series = [
                 {
                     "name": '人数',
                     "type": 'pie',
                     "radius": '50%',
                     "data": [
-                        { "value": total_number-unsubmit_number, "name": '已提交' },
-                        { "value": unsubmit_number, "name": '未提交' },
+                        { "value": len(status['submitted']) - late_number, "name": '按时提交' },
+                        { "value": late_number, "name": '逾期提交' },
+                        { "value": len(status['unsubmitted']), "name": '未提交' },
                     ],
                     "emphasis": {
                         "itemStyle": {
@@ -140,40 +124,64 @@ def submit_info(request, id):
     return JsonResponse({"status":True, "series":series})
     
 
+def marks_stats(request, id):
+    '''任务成绩统计 JSON（平均分、中位数、分位数、直方图、各小组平均分）'''
+    assignment = _teacher_assignment(request, id)
+    if not assignment:
+        return JsonResponse({"status": False, "msg": "没有权限"})
+    return JsonResponse({"status": True, "stats": gradestats.assignment_stats(assignment)})
+
 def unsubmit_list(request, id):
     '''计算所有未提交作业的人数并且给出名单'''
-    assignment = models.Assignment.objects.filter(id=id).first()
-    total_submit_list = models.AssignmentSubmit.objects.filter(assignment=assignment).all()
-    studentscourse = models.StudentCourse.objects.filter(course=assignment.course).all()
-    unsubmit_student_list = []
-    count = 0
-    for studentcourse in studentscourse:
-        unsubmit_student_list.append(studentcourse.student)
-        count += 1
-    students = []
-    for submit in total_submit_list:
-        if submit.student not in students:
-            students.append(submit.student)
-            if assignment.is_group:
-                groupmember = models.GroupMember.objects.filter(student=submit.student).first()
-                group = groupmember.group
-                groupmembers = models.GroupMember.objects.filter(group=group).all()
-                for member in groupmembers:
-                    unsubmit_student_list.remove(member.student)
-                    count -= 1
-            else:
-                unsubmit_student_list.remove(submit.student)
-                count -= 1
+    assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
+    status = submission.assignment_status(assignment)
+    unsubmit_student_list = models.StudentInfo.objects.filter(user_id__in=status['unsubmitted']).order_by('user_id')
     context = {
-        'count':count, 
-        'unsubmit_student_list':unsubmit_student_list,
+        'count': len(status['unsubmitted']), 
+        'unsubmit_student_list': unsubmit_student_list,
     }
     return render(request, 'unsubmit_list.html', context)
 
+def export_status(request, id, fmt):
+    '''导出任务提交情况（csv / xlsx）'''
+    assignment = _teacher_assignment(request, id)
+    if not assignment:
+        return redirect('/')
+    status = submission.assignment_status(assignment)
+    students = models.StudentCourse.objects.filter(course_id=assignment.course_id) \
+        .order_by('student__user__username').values_list('student_id', 'student__user__username', 'student__name')
+
+    def lines():
+        chunk = []
+        for student in students.iterator(chunk_size=500):
+            chunk.append(student)
+            if len(chunk) == 500:
+                yield from _status_lines(assignment, status, chunk)
+                chunk = []
+        yield from _status_lines(assignment, status, chunk)
+
+    return export.response(fmt, '{}-提交情况'.format(assignment.name), ['学号', '姓名', '状态', '最后提交时间'], lines(), '提交情况')
+
+
+def _status_lines(assignment, status, chunk):
+    if not chunk:
+        return
+    last_submit = dict(submission.uploaded(assignment=assignment, student_id__in=[student[0] for student in chunk])
+        .values('student_id').annotate(last=Max('submit_time')).values_list('student_id', 'last'))
+    for student_id, username, name in chunk:
+        if student_id in status['late']:
+            state = '逾期提交'
+        elif student_id in status['submitted']:
+            state = '按时提交' if student_id in last_submit else '小组已提交'
+        else:
+            state = '未提交'
+        submitted_at = last_submit.get(student_id)
+        yield [username, name, state, timezone.localtime(submitted_at).strftime('%Y-%m-%d %H:%M') if submitted_at else '']
+
 def submitfile_list(request, id, sid):
-    assignment = models.Assignment.objects.filter(id=id).first()
+    assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
     student = models.StudentInfo.objects.filter(user_id=sid).first()
-    submit_list = models.AssignmentSubmit.objects.filter(assignment=assignment, student=student).all()
+    submit_list = models.AssignmentSubmit.objects.filter(assignment=assignment, student=student).order_by('-id')
     return render(request, 'submitfile_list.html', {'submit_list':submit_list})
 @csrf_exempt
 def marks_enter(request, id, sid):
@@ -186,24 +194,29 @@ def marks_enter(request, id, sid):
 
         }
         return render(request, 'change.html', content)
-    assignment = models.Assignment.objects.filter(id=id).first()
+    assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
     student = models.StudentInfo.objects.filter(user_id=sid).first()
-    obj = models.AssignmentSubmit.objects.filter(assignment=assignment, student=student).first()
+    obj = latest.submission_of(assignment, sid)
     form = AssignmentMarkForm(request.POST, instance=obj)
     if form.is_valid():
         assignmentsubmit = form.save(commit=False)
         assignmentsubmit.assignment = assignment
         assignmentsubmit.student = student
-        assignmentsubmit.save()
+        assignmentsubmit.gradedAt = timezone.now()
+        if obj:
+            # 只写分数，不改动提交时间
+            assignmentsubmit.save(update_fields=['marks', 'max_marks', 'gradedAt'])
+        else:
+            assignmentsubmit.file_name = ''
+            assignmentsubmit.save()
+        inbox.notify_grades(assignment, {sid: (assignmentsubmit.marks, assignmentsubmit.max_marks)})
     return redirect("/assignment/{}/page".format(id))
 
 @csrf_exempt
 def marks_get(request, id, uid):
-    assignment = models.Assignment.objects.filter(id=id).first()
-    student = models.StudentInfo.objects.filter(user_id=uid).first()
-    exists = models.AssignmentSubmit.objects.filter(assignment=assignment, student=student).exists()
-    if exists:
-        file_with_marks = models.AssignmentSubmit.objects.filter(assignment=assignment, student=student).first()
+    assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
+    file_with_marks = latest.submission_of(assignment, uid)
+    if file_with_marks:
         get_mark = file_with_marks.marks
         max_mark = file_with_marks.max_marks
         marks = "{}/{}".format(get_mark, max_mark)
@@ -211,9 +224,56 @@ def marks_get(request, id, uid):
 
     return JsonResponse({"status":False})
 
+def _teacher_assignment(request, id):
+    info_dict = request.session.get('info')
+    return models.Assignment.objects.filter(id=id, course__isDeleted=False, course__teacher_id=info_dict['id']).first()
+
+def _marks_response(result):
+    if not result['ok']:
+        return JsonResponse({"status": False, "msg": "成绩有误，未做任何修改", "errors": result['errors']})
+    del result['ok'], result['errors']
+    return JsonResponse({"status": True, "summary": result})
+
+@csrf_exempt
+def marks_batch(request, id):
+    '''批量打分
+
+    POST JSON：[{"student": 学生用户ID, "marks": 90, "max_marks": 100}, ...]，
+    也可以是 {"marks": [...]}；student 可换成 username（学号），max_marks 缺省为 100
+    '''
+    assignment = _teacher_assignment(request, id)
+    if not assignment:
+        return JsonResponse({"status": False, "msg": "没有权限"})
+    if request.method != 'POST':
+        return JsonResponse({"status": False, "msg": "请使用 POST"})
+    try:
+        entries = json.loads(request.body.decode('utf-8'))
+    except ValueError:
+        return JsonResponse({"status": False, "msg": "请求内容不是合法的 JSON"})
+    if isinstance(entries, dict):
+        entries = entries.get('marks')
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        return JsonResponse({"status": False, "msg": "marks 应为列表"})
+    return _marks_response(grading.apply_marks(assignment, entries))
+
+@csrf_exempt
+def marks_import(request, id):
+    '''上传成绩表（xlsx / csv / tsv，表头：学号、分数，可选满分）批量打分'''
+    assignment = _teacher_assignment(request, id)
+    if not assignment:
+        return JsonResponse({"status": False, "msg": "没有权限"})
+    file_obj = request.FILES.get('file')
+    if not file_obj:
+        return JsonResponse({"status": False, "msg": "请选择文件"})
+    try:
+        entries = grading.read_marks(file_obj)
+    except grading.MarksError as e:
+        return JsonResponse({"status": False, "msg": str(e)})
+    return _marks_response(grading.apply_marks(assignment, entries))
+
 @csrf_exempt
 def files_get(request, id, uid):
-    assignment = models.Assignment.objects.filter(id=id).first()
+    assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
     student = models.StudentInfo.objects.filter(user_id=uid).first()
     exists = models.AssignmentSubmit.objects.filter(assignment=assignment, student=student).exists()
     if exists:
@@ -7,7 +7,7 @@ from ..forms.courseforms import CourseCommentForm
 
 def comment_list(request, id):
     title = '任务评价'
-    assignment = models.Assignment.objects.filter(id=id).first()
+    assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
     comment_list = models.AssignmentComment.objects.filter(assignment=assignment).all()
     context = { 
         "comment_list":comment_list,
@@ -60,7 +60,7 @@ def comment_delete(request, id, cid):
 
 def mycomment_list(request, id):
     title = '我的评价'
-    assignment = models.Assignment.objects.filter(id=id).first()
+    assignment = models.Assignment.objects.filter(id=id, course__isDeleted=False).first()
     info_dict = request.session.get('info')
     user = models.User.objects.filter(id=info_dict['id']).first()
     comment_list = models.AssignmentComment.objects.filter(assignment=assignment, user=user).all()
@@ -1,11 +1,13 @@
+import datetime
+
 from django.shortcuts import render, redirect
 from baweb import models
 from django.http import JsonResponse
 from ..forms.courseforms import CourseCommentForm, CourseForm
 from ..forms.userforms import UserChangePasswordForm
 from django.views.decorators.csrf import csrf_exempt
-from openpyxl import load_workbook
 from ..utils.encrypt import md5
+from ..utils import readstate, purge, schedule, gradebook, gradestats, export, jobs, analytics, roster
 
 def course_list(request):
     info_dict = request.session.get('info')
@@ -18,9 +20,10 @@ def course_list(request):
         is_teacher = 0
         course_list = []
         student = models.StudentInfo.objects.filter(user=user).first()
-        studentcourse = models.StudentCourse.objects.filter(student=student).all()
+        studentcourse = models.StudentCourse.objects.filter(student=student, course__isDeleted=False).all()
         for obj in studentcourse:
             course_list.append(obj.course)
+    course_list = readstate.annotate_unread(user, course_list)
     return render(request, "course_list.html", {'is_teacher':is_teacher, "course_list":course_list})
 
 @csrf_exempt 
@@ -88,7 +91,9 @@ def course_delete(request, id):
             return redirect('/')
     else:
         return redirect('/')
-    models.Course.objects.filter(id=id).delete()
+    # 只标记删除，作业/提交/帖子等由后台批量清理
+    purge.mark_course_deleted(course)
+    schedule.invalidate_course(id, course.teacher_id)
     return redirect('/course')
 
 @csrf_exempt
@@ -103,23 +108,10 @@ def student_import(request, id):
     else:
         return JsonResponse({"status": False})
     file_obj = request.FILES.get('file')
-    wb = load_workbook(file_obj)
-    sheet = wb.worksheets[0]
-
-    for row in sheet.iter_rows(min_row=5):
-        username = str(row[1].value)
-        name = str(row[2].value)
-        exists = models.User.objects.filter(username=username).exists()
-        if not exists:
-            if row[1].value != None:
-                user = models.User.objects.create(username=username, password=md5(username), type=1)
-                student = models.StudentInfo.objects.create(user=user, name=name)
-                models.StudentCourse.objects.create(student=student, course=course)
-        else:
-            user = models.User.objects.filter(username=username).first()
-            student = models.StudentInfo.objects.filter(user=user).first() 
-            models.StudentCourse.objects.create(student=student, course=course)
-    return JsonResponse({"status": True})
+    if not file_obj:
+        return JsonResponse({"status": False, "msg": "请选择文件"})
+    job = jobs.submit('roster.students', user, {"course_id": course.id}, upload=file_obj)
+    return JsonResponse({"status": True, "job_id": job.id})
 
 @csrf_exempt
 def student_add(request, id):
@@ -136,7 +128,9 @@ def student_add(request, id):
     if exists:
         user = models.User.objects.filter(username=username).first()
         student = models.StudentInfo.objects.filter(user=user).first() 
-        models.StudentCourse.objects.create(student=student, course=course)
+        if not student:
+            return JsonResponse({"status": False, "msg": "该账号不是学生"})
+        models.StudentCourse.objects.get_or_create(student=student, course=course)
     else:
         user = models.User.objects.create(username=username, password=md5(username), type=1)
         student = models.StudentInfo.objects.create(user=user, name="未知")
@@ -172,16 +166,12 @@ def student_list(request, id):
     elif user.type == 1:
         is_teacher = 0
         return redirect('/')
-    studentcourses = models.StudentCourse.objects.filter(course=course).all()
-    student_list = []
-    for st in studentcourses:
-        student_list.append(st.student)
+    # 名单由页面通过 /course/<id>/roster 分页加载
     content = { 
         "username": username, 
         "id": user_id,
         "changepwd_form":changepwd_form,
         "course":course,
-        "student_list":student_list,
         "is_teacher": is_teacher,
     }
     return render(request, 'student_list.html', content)
@@ -189,40 +179,150 @@ def student_list(request, id):
 def marks_list(request, id):
     '''显示所有打分情况， 如果未提交，默认分数为0'''
     course = models.Course.objects.filter(id=id).first()
-    assignment_list = models.Assignment.objects.filter(course=course).all()
     info_dict = request.session.get('info')
-    user = models.User.objects.filter(id=info_dict['id']).first()
-    student = models.StudentInfo.objects.filter(user=user).first()
+    book = gradebook.build(course, [info_dict['id']])
     marks_list = []
-    for assignment in assignment_list:
-        marks = []
-        marks.append(assignment.id)
-        marks.append(assignment.name)
-        flag = 0
-        if assignment.is_group:
-            groupmember = models.GroupMember.objects.filter(student=student).first()
-            group = groupmember.group
-            groupmembers = models.GroupMember.objects.filter(group=group).all()
-            for member in groupmembers:
-                exists = models.AssignmentSubmit.objects.filter(assignment=assignment, student=member.student).exists()
-                if exists:
-                    submit = models.AssignmentSubmit.objects.filter(assignment=assignment, student=member.student).first()
-                    flag = 1
-                    marks.append(submit.marks)
-                    marks.append(submit.max_marks)
-        else:
-            exists = models.AssignmentSubmit.objects.filter(assignment=assignment, student=student).exists()
-            if exists:
-                submit = models.AssignmentSubmit.objects.filter(assignment=assignment, student=student).first()
-                flag = 1
-                marks.append(submit.marks)
-                marks.append(submit.max_marks)
-        if flag == 0:
-            marks.append(0)
-            marks.append(100)
-        marks_list.append(marks)
+    if book['rows']:
+        for assignment, cell in zip(book['assignments'], book['rows'][0]['cells']):
+            if cell:
+                marks_list.append([assignment['id'], assignment['name'], cell['marks'], cell['max_marks']])
+            else:
+                marks_list.append([assignment['id'], assignment['name'], 0, 100])
     return render(request, 'marks_list.html', {"marks_list":marks_list})
 
+
+def _gradebook_for(request, id):
+    '''任课老师看全班，选课学生只看自己；无权限返回 None'''
+    course = models.Course.objects.filter(id=id).first()
+    info_dict = request.session.get('info')
+    user = models.User.objects.filter(id=info_dict['id']).first()
+    if not course or not user:
+        return None, None, None
+    if user.type == 2 and course.teacher_id == user.id:
+        return course, user, gradebook.build(course)
+    if user.type == 1 and models.StudentCourse.objects.filter(course=course, student_id=user.id).exists():
+        return course, user, gradebook.build(course, [user.id])
+    return None, None, None
+
+
+def gradebook_page(request, id):
+    '''课程成绩册（学生 × 任务）'''
+    course, user, book = _gradebook_for(request, id)
+    if book is None:
+        return redirect('/')
+    content = {
+        "username": request.session['info']['name'],
+        "id": user.id,
+        "changepwd_form": UserChangePasswordForm,
+        "course": course,
+        "is_teacher": 1 if user.type == 2 else 0,
+        "gradebook": book,
+    }
+    return render(request, 'gradebook.html', content)
+
+
+def gradebook_json(request, id):
+    '''课程成绩册 JSON'''
+    course, user, book = _gradebook_for(request, id)
+    if book is None:
+        return JsonResponse({"status": False, "msg": "没有权限"})
+    for assignment in book['assignments']:
+        assignment['ddl'] = assignment['ddl'].isoformat()
+    return JsonResponse({"status": True, "course": course.id, **book})
+
+
+def _teacher_course(request, id):
+    '''当前用户任教的课程，否则返回 None'''
+    info_dict = request.session.get('info')
+    return models.Course.objects.filter(id=id, teacher_id=info_dict['id']).first()
+
+
+def course_analytics(request, id):
+    '''
+        课程看板数据（只读汇总表）
+
+        参数:
+            start, end: YYYY-MM-DD，缺省为最近 30 天
+            day: YYYY-MM-DD，同时返回当天每小时的提交数
+    '''
+    course = _teacher_course(request, id)
+    if not course:
+        return JsonResponse({"status": False, "msg": "没有权限"})
+    try:
+        start, end = analytics.parse_range(request.GET.get('start'), request.GET.get('end'))
+        data = analytics.dashboard([course.id], start, end)
+        if request.GET.get('day'):
+            data['hourly'] = analytics.submissions_per_hour([course.id], datetime.date.fromisoformat(request.GET['day']))
+    except ValueError:
+        return JsonResponse({"status": False, "msg": "日期格式应为 YYYY-MM-DD，范围不超过一年"})
+    return JsonResponse({"status": True, "course": course.id, **data})
+
+
+def roster_json(request, id):
+    '''
+        选课名单 JSON（键集分页）
+
+        参数:
+            q: 学号前缀，或姓名、全拼、拼音首字母的前缀
+            sort: username / name / submits / average，默认 username
+            order: asc / desc
+            cursor: 上一页返回的 next
+            limit: 每页人数，默认 50，最多 200
+    '''
+    course = _teacher_course(request, id)
+    if not course:
+        return JsonResponse({"status": False, "msg": "没有权限"})
+    try:
+        limit = int(request.GET.get('limit') or roster.PAGE_SIZE)
+        data = roster.page(course, q=request.GET.get('q', '').strip(), sort=request.GET.get('sort') or 'username',
+                           descending=request.GET.get('order') == 'desc', cursor=request.GET.get('cursor'), limit=limit)
+    except roster.CursorError:
+        return JsonResponse({"status": False, "msg": "分页参数不合法，请刷新后重试"})
+    except ValueError:
+        return JsonResponse({"status": False, "msg": "参数不合法"})
+    return JsonResponse({"status": True, "course": course.id, **data})
+
+
+def course_stats(request, id):
+    '''课程成绩汇总 JSON（学生总得分率的分布和各任务的平均得分率、提交率）'''
+    course = _teacher_course(request, id)
+    if not course:
+        return JsonResponse({"status": False, "msg": "没有权限"})
+    return JsonResponse({"status": True, "stats": gradestats.course_stats(course)})
+
+
+def export_gradebook(request, id, fmt):
+    '''导出成绩册（csv / xlsx）'''
+    course = _teacher_course(request, id)
+    if not course:
+        return redirect('/')
+    assignments, rows = gradebook.iter_rows(course)
+    header = ['学号', '姓名'] + [a['name'] for a in assignments] + ['总分', '满分', '得分率(%)']
+
+    def lines():
+        for row in rows:
+            yield [row['username'], row['name']] \
+                + [cell['marks'] if cell else '' for cell in row['cells']] \
+                + [row['total'], row['max_total'], row['percent']]
+
+    return export.response(fmt, '{}-成绩册'.format(course.name), header, lines(), '成绩册')
+
+
+def export_roster(request, id, fmt):
+    '''导出选课名单（csv / xlsx）'''
+    course = _teacher_course(request, id)
+    if not course:
+        return redirect('/')
+    genders = dict(models.StudentInfo.gender_choices)
+    students = models.StudentCourse.objects.filter(course=course).order_by('student__user__username') \
+        .values_list('student__user__username', 'student__name', 'student__gender', 'student__email', 'student__phone')
+
+    def lines():
+        for username, name, gender, email, phone in students.iterator(chunk_size=500):
+            yield [username, name, genders.get(gender, ''), email, phone]
+
+    return export.response(fmt, '{}-选课名单'.format(course.name), ['学号', '姓名', '性别', '邮箱', '手机号'], lines(), '选课名单')
+
 def comment(request, id):
     course = models.Course.objects.filter(id=id).first()
     info = request.session.get("info", "")
@@ -73,7 +73,7 @@ def file_update(request, id, fid):
             'title': title,
         }
         return render(request, "change.html", context)
-    old_obj = models.CourseFiles.objects.filter(id=fid).first()
+    old_obj = models.CourseFiles.objects.filter(id=fid, course__isDeleted=False).first()
     form = CourseFileForm(request.POST, request.FILES, instance=old_obj)
     if form.is_valid():
         obj = form.save(commit=False)
@@ -112,9 +112,9 @@ def file_add_batch(request, id):
 def file_delete(request, id, fid):
     '''删除课件'''
     dir = "media/"
-    deletefile = models.CourseFiles.objects.filter(id=fid)
+    deletefile = models.CourseFiles.objects.filter(id=fid, course__isDeleted=False)
     for i in deletefile:
         ##print(dir+'{}'.format(i.file.name))
         os.remove(dir+'{}'.format(i.file.name))
-    models.CourseFiles.objects.filter(id=fid).delete()
+    models.CourseFiles.objects.filter(id=fid, course__isDeleted=False).delete()
     return redirect('/course/{}/file/list'.format(id))
@@ -4,17 +4,19 @@
 """
 
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseNotModified
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
 from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.conf import settings
 from uuid import uuid4
 
 from baweb import models
 from ..forms.postforms import PostCreateForm, PostUpdateForm, PostCommentForm, PostSearchForm
+from ..utils import feed, expertise, inbox, livefeed, readstate, purge, archive
 
 
 def forum_index(request):
@@ -79,20 +81,26 @@ def forum_index(request):
     posts_page = paginator.get_page(page_num)
     
     # 获取所有课程用于筛选
-    courses = models.Course.objects.all().order_by('order')
+    courses = list(models.Course.objects.all().order_by('order'))
     
     # 获取所有分类
     categories = models.ContentCategory.objects.all()
     
     # 获取统计数据
     total_posts = models.Post.objects.count()
-    total_comments = models.PostComment.objects.count()
+    total_comments = models.PostComment.objects.filter(post__isDeleted=False).count()
     
     # 获取当前用户信息（包括积分）
     current_user = None
     if user_id:
         current_user = models.User.objects.filter(id=user_id).first()
     
+    # 我的课程的未读帖子数
+    if current_user:
+        unread = readstate.unread_counts(current_user, readstate.user_course_ids(current_user))
+        for course in courses:
+            course.unread_count = unread.get(course.id, 0)
+    
     # 处理标签
     for post in posts_page:
         if post.tags:
@@ -100,8 +108,17 @@ def forum_index(request):
         else:
             post.tags_list = []
     
+    # 搜索时同时检索归档帖子（只匹配标题和标签）
+    archived_posts = []
+    if keyword:
+        try:
+            archived_posts = archive.search(keyword, course_id, category_id)
+        except (ValueError, TypeError):
+            pass
+    
     context = {
         'posts': posts_page,
+        'archived_posts': archived_posts,
         'courses': courses,
         'categories': categories,
         'keyword': keyword,
@@ -215,10 +232,13 @@ def post_detail(request, post_id):
     info = request.session.get('info', {})
     user_id = info.get('id')
     
-    # 获取帖子
+    # 获取帖子（不在热表中时查找归档帖子）
     post = models.Post.objects.filter(postId=post_id).first()
     if not post:
-        return redirect('/')
+        archived = models.ArchivedPost.objects.filter(postId=post_id).select_related('author', 'course', 'category').first()
+        if not archived:
+            return redirect('/')
+        return _archived_detail(request, archived)
     
     # 增加浏览数
     post.viewCount += 1
@@ -239,6 +259,7 @@ def post_detail(request, post_id):
         if current_user:
             has_liked = models.PostLike.objects.filter(post=post, user=current_user).exists()
             has_collected = models.PostCollect.objects.filter(post=post, user=current_user).exists()
+            readstate.mark_post_read(current_user, post)
     
     # 评论表单
     comment_form = PostCommentForm()
@@ -253,6 +274,11 @@ def post_detail(request, post_id):
     if current_user and post.author == current_user and post.bountyPoints > 0 and not post.bestAnswer:
         can_select_best_answer = True
     
+    # 悬赏未解决时，向作者展示推荐的回答者
+    suggested_experts = []
+    if can_select_best_answer:
+        suggested_experts = [u for u, score in expertise.suggest_experts(post)]
+    
     context = {
         'post': post,
         'comments': comments_page,
@@ -263,11 +289,81 @@ def post_detail(request, post_id):
         'has_collected': has_collected,
         'tags_list': tags_list,
         'can_select_best_answer': can_select_best_answer,
+        'suggested_experts': suggested_experts,
     }
     
     return render(request, 'forum/post_detail.html', context)
 
 
+def _archived_detail(request, archived):
+    """
+    归档帖子详情（只读）
+    
+    Args:
+        archived: ArchivedPost
+    
+    Returns:
+        renders forum/post_detail.html（archived=True，只读）
+    """
+    info = request.session.get('info', {})
+    user_id = info.get('id')
+    
+    paginator = Paginator(archive.load_comments(archived), 10)
+    comments_page = paginator.get_page(request.GET.get('page', 1))
+    
+    tags_list = []
+    if archived.tags:
+        tags_list = [tag.strip() for tag in archived.tags.split(',') if tag.strip()]
+    
+    context = {
+        'post': archived,
+        'comments': comments_page,
+        'user_id': user_id,
+        'tags_list': tags_list,
+        'archived': True,
+    }
+    return render(request, 'forum/post_detail.html', context)
+
+
+@require_http_methods(["GET"])
+def post_events(request, post_id):
+    """
+    帖子实时事件（短轮询）
+    推送新评论、回复、点赞/收藏计数变化和最佳答案
+    
+    Args:
+        post_id: 帖子ID (postId)
+    
+    GET参数:
+        after: 客户端已收到的最后一个事件ID，为空时只返回当前的最后一个事件ID
+    
+    请求头:
+        If-None-Match: 与帖子当前的 ETag（最后一个事件ID）相同时返回 304
+    
+    Returns:
+        JsonResponse: events 事件列表、last_id 最后一个事件ID
+    """
+    post = models.Post.objects.filter(postId=post_id).only('id').first()
+    if not post:
+        return JsonResponse({"status": False, "msg": "帖子不存在"})
+    
+    latest = livefeed.latest_event_id(post)
+    etag = f'"{latest}"'
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponseNotModified()
+    else:
+        try:
+            last_id = int(request.GET.get('after', ''))
+        except ValueError:
+            last_id = latest
+        events = livefeed.events_after(post.id, last_id) if last_id < latest else []
+        response = JsonResponse({"status": True, "events": events,
+                                 "last_id": events[-1]['id'] if events else max(last_id, latest)})
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def post_create(request, course_id=None):
@@ -331,6 +427,15 @@ def post_create(request, course_id=None):
                 
                 post.save()
                 
+                # 写扩散到相关用户的动态流
+                feed.fanout_post(post)
+                
+                # 悬赏帖：推荐可能的回答者
+                experts = []
+                if post.bountyPoints > 0:
+                    experts = [{"id": u.id, "username": u.username}
+                               for u, score in expertise.suggest_experts(post)]
+                
                 # 重新获取用户对象，确保积分是最新的
                 user.refresh_from_db()
                 
@@ -339,7 +444,8 @@ def post_create(request, course_id=None):
                     "postId": post.postId, 
                     "msg": "帖子发布成功",
                     "bounty_points": post.bountyPoints,
-                    "user_points": user.points
+                    "user_points": user.points,
+                    "experts": experts,
                 })
             except Exception as e:
                 # 捕获所有异常，返回友好的错误信息
@@ -429,7 +535,10 @@ def post_delete(request, post_id):
     if post.author.id != user_id and user.type != 3:  # 作者或管理员
         return JsonResponse({"status": False, "msg": "没有权限删除"})
     
-    post.delete()
+    # 只标记删除，评论/点赞等由后台批量清理
+    post.isDeleted = True
+    post.save(update_fields=['isDeleted'])
+    purge.schedule_purge()
     return JsonResponse({"status": True, "msg": "帖子已删除"})
 
 
@@ -474,6 +583,7 @@ def post_like(request, post_id):
     # 更新热度
     post.heatScore = post.calculateHeat()
     post.save()
+    livefeed.publish(post, 3, livefeed.counters_payload(post))
     
     return JsonResponse({
         "status": True,
@@ -524,6 +634,7 @@ def post_collect(request, post_id):
     # 更新热度
     post.heatScore = post.calculateHeat()
     post.save()
+    livefeed.publish(post, 3, livefeed.counters_payload(post))
     
     return JsonResponse({
         "status": True,
@@ -578,6 +689,7 @@ def comment_add(request, post_id):
         comment.author = user
         comment.parentComment = parent_comment  # 设置父评论
         comment.save()
+        expertise.record_comment(comment)
         
         # 更新评论数和热度（只有顶级评论才增加评论数）
         if not parent_comment:
@@ -585,6 +697,10 @@ def comment_add(request, post_id):
         post.heatScore = post.calculateHeat()
         post.save()
         
+        feed.fanout_reply(post, user)
+        inbox.notify_comment(comment)
+        livefeed.publish(post, 2 if parent_comment else 1, livefeed.comment_payload(comment))
+        
         return JsonResponse({
             "status": True,
             "msg": "评论已发布",
@@ -626,11 +742,13 @@ def comment_delete(request, comment_id):
     post = comment.post
     post.commentCount = max(0, post.commentCount - 1)
     
+    deleted_comment_id = comment.commentId
     comment.delete()
     
     # 更新热度
     post.heatScore = post.calculateHeat()
     post.save()
+    livefeed.publish(post, 5, {"comment_id": deleted_comment_id, "comment_count": post.commentCount})
     
     return JsonResponse({
         "status": True,
@@ -676,11 +794,16 @@ def comment_reply(request, comment_id):
             reply_author=user,
             is_anonymous=form.cleaned_data.get('isAnonymous', False)
         )
+        expertise.record_comment(reply)
         
         # 更新热度（回复不增加评论数，因为评论数只统计顶级评论）
         post.heatScore = post.calculateHeat()
         post.save()
         
+        feed.fanout_reply(post, user)
+        inbox.notify_comment(reply)
+        livefeed.publish(post, 2, livefeed.comment_payload(reply))
+        
         return JsonResponse({
             "status": True,
             "msg": "回复已发布",
@@ -713,6 +836,7 @@ def comment_like(request, comment_id):
         return JsonResponse({"status": False, "msg": "评论不存在"})
     
     comment.like()
+    livefeed.publish(comment.post, 3, {"comment_id": comment.commentId, "comment_like_count": comment.likeCount})
     
     return JsonResponse({
         "status": True,
@@ -805,19 +929,25 @@ def my_collected(request):
     if not user:
         return redirect('/login/')
     
-    # 获取用户收藏的帖子
-    collects_query = models.PostCollect.objects.filter(user=user).select_related('post', 'post__author', 'post__course', 'post__category').order_by('-createdAt')
+    # 获取用户收藏的帖子（含已归档的帖子）
+    collects_query = models.PostCollect.objects.filter(user=user, post__isDeleted=False).select_related('post', 'post__author', 'post__course', 'post__category').order_by('-createdAt')
+    archived_query = models.ArchivedCollect.objects.filter(user=user).exclude(archived__course__isDeleted=True) \
+        .select_related('archived', 'archived__author', 'archived__course', 'archived__category').order_by('-createdAt')
     
-    # 搜索
+    # 搜索（归档帖子的正文已压缩，只按标题和标签搜索）
     keyword = request.GET.get('keyword', '')
     if keyword:
-        from django.db.models import Q
         collects_query = collects_query.filter(
             Q(post__title__icontains=keyword) | Q(post__content__icontains=keyword)
         )
+        archived_query = archived_query.filter(Q(archived__title__icontains=keyword) | Q(archived__tags__icontains=keyword))
+    
+    archived_collects = list(archived_query)
+    for collect in archived_collects:
+        collect.post = collect.archived
     
     # 分页
-    paginator = Paginator(collects_query, 15)
+    paginator = Paginator(sorted(list(collects_query) + archived_collects, key=lambda c: c.createdAt, reverse=True), 15)
     page_num = request.GET.get('page', 1)
     collects_page = paginator.get_page(page_num)
     
@@ -829,7 +959,8 @@ def my_collected(request):
             collect.post.tags_list = []
     
     # 统计数据
-    total_collected = models.PostCollect.objects.filter(user=user).count()
+    total_collected = models.PostCollect.objects.filter(user=user, post__isDeleted=False).count() + \
+        models.ArchivedCollect.objects.filter(user=user).exclude(archived__course__isDeleted=True).count()
     
     context = {
         'collects': collects_page,
@@ -841,6 +972,53 @@ def my_collected(request):
     return render(request, 'forum/my_collected.html', context)
 
 
+def my_feed(request):
+    """
+    我的动态页面
+    显示选课课程的新帖、任课老师的帖子以及收藏帖子的新回复
+    
+    GET参数:
+        before: 游标（上一页最后一条的 时间|帖子ID），为空表示第一页
+    
+    Returns:
+        renders forum/my_feed.html with feed items
+    """
+    info = request.session.get('info', {})
+    user_id = info.get('id')
+    
+    if not user_id:
+        return redirect('/login/')
+    
+    user = models.User.objects.filter(id=user_id).first()
+    if not user:
+        return redirect('/login/')
+    
+    cursor_time, _, cursor_id = (request.GET.get('before', '') or '').partition('|')
+    before = parse_datetime(cursor_time)
+    if before is not None:
+        before = (before, int(cursor_id) if cursor_id.isdigit() else 2 ** 31)
+    items, next_cursor = feed.read_feed(user, before=before, limit=20)
+    
+    # 处理标签
+    reasons = dict(models.FeedEntry.reason_choices)
+    feed_items = []
+    for created_at, reason, post in items:
+        if post.tags:
+            post.tags_list = [tag.strip() for tag in post.tags.split(',') if tag.strip()]
+        else:
+            post.tags_list = []
+        feed_items.append({'time': created_at, 'reason': reasons.get(reason, ''), 'post': post})
+    
+    context = {
+        'feed_items': feed_items,
+        'user': user,
+        'is_first_page': before is None,
+        'next_cursor': f'{next_cursor[0].isoformat()}|{next_cursor[1]}' if next_cursor else '',
+    }
+    
+    return render(request, 'forum/my_feed.html', context)
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def post_select_best_answer(request, post_id, comment_id):
@@ -872,6 +1050,9 @@ def post_select_best_answer(request, post_id, comment_id):
     
     # 选择最佳答案
     if post.selectBestAnswer(comment, user):
+        expertise.record_best_answer(comment)
+        inbox.notify_best_answer(comment)
+        livefeed.publish(post, 4, {"comment_id": comment.commentId})
         return JsonResponse({
             "status": True,
             "msg": "已选择最佳答案，积分已分配给回答者",
@@ -3,6 +3,7 @@ from django.shortcuts import render, redirect
 from django.http import JsonResponse
 
 from baweb import models
+from ..utils import groups, namesearch
 from ..forms.userforms import UserChangePasswordForm
 from ..forms.groupforms import GroupForm, GroupMemberForm
 
@@ -64,19 +65,19 @@ def group_delete(request, id, gid):
     exists = models.StudentCourse.objects.filter(student=student, coures=course)
     if not exists:
         return redirect("/")
-    group = models.Group.objects.filter(id=gid).first()
+    group = models.Group.objects.filter(id=gid, course__isDeleted=False).first()
     exists = models.GroupMember.objects.filter(group=group, student=student).exists
     if not exists:
         return redirect("/")
     member = models.GroupMember.objects.filter(group=group, student=student).first()
     if not member.is_head:
         return redirect("/course/{}/group/list".format(id))
-    models.Group.objects.filter(id=gid).delete()
+    models.Group.objects.filter(id=gid, course__isDeleted=False).delete()
     return redirect("/course/{}/group/list".format(id))
 
 def member_list(request, id):
     '''小组成员列表'''
-    group = models.Group.objects.filter(id=id).first()
+    group = models.Group.objects.filter(id=id, course__isDeleted=False).first()
     member_list = models.GroupMember.objects.filter(group=group).all()
     info_dict = request.session.get('info')
     username = info_dict['name']
@@ -104,7 +105,7 @@ def member_list(request, id):
 @csrf_exempt
 def member_add(request, id):
     '''添加小组成员'''
-    group = models.Group.objects.filter(id=id).first()
+    group = models.Group.objects.filter(id=id, course__isDeleted=False).first()
     info_dict = request.session.get('info')
     user = models.User.objects.filter(id=info_dict['id']).first()
     student = models.StudentInfo.objects.filter(user=user).first()
@@ -118,15 +119,39 @@ def member_add(request, id):
         student = models.StudentInfo.objects.filter(user=user).first()
         if models.GroupMember.objects.filter(group=group, student=student).exists():
             return JsonResponse({"status":False, "msg":"该同学已在小组"})
+        elif groups.group_id(group.course_id, user.id) is not None:
+            return JsonResponse({"status":False, "msg":"该同学已在本课程的其他小组"})
         else:    
             models.GroupMember.objects.create(group=group, student=student, is_head=False)
             return JsonResponse({"status":True})
     return JsonResponse({"status":False,"msg":"学号不存在"})
 
+
+def member_search(request, id):
+    '''
+        组长添加组员时按学号、姓名或拼音查找本课程还没有小组的学生
+
+        参数:
+            q: 学号前缀，或姓名、全拼、拼音首字母的前缀
+    '''
+    group = models.Group.objects.filter(id=id, course__isDeleted=False).first()
+    info_dict = request.session.get('info')
+    if not group or not models.GroupMember.objects.filter(group=group, student_id=info_dict['id'], is_head=True).exists():
+        return JsonResponse({"status":False,"msg":"没有权限"})
+    q = request.GET.get('q', '').strip()
+    if not q:
+        return JsonResponse({"status":True, "students":[]})
+    grouped = groups.group_of(group.course_id)
+    students = models.StudentCourse.objects.filter(course_id=group.course_id) \
+        .filter(namesearch.student_q(q)) \
+        .exclude(student_id__in=list(grouped)) \
+        .order_by('student__user__username').values_list('student__user__username', 'student__name')[:10]
+    return JsonResponse({"status":True, "students":[{"username":u, "name":n} for u, n in students]})
+
    
 def member_delete(request, id, sid):
     '''删除小组成员'''
-    group = models.Group.objects.filter(id=id).first()
+    group = models.Group.objects.filter(id=id, course__isDeleted=False).first()
     info_dict = request.session.get('info')
     user = models.User.objects.filter(id=info_dict['id']).first()
     student = models.StudentInfo.objects.filter(user=user).first()
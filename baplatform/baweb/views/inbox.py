@@ -0,0 +1,63 @@
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from baweb import models
+from ..utils import inbox
+
+
+def _current_user(request):
+    info = request.session.get("info", "")
+    return models.User.objects.filter(id=info['id']).first() if info else None
+
+
+def inbox_list(request):
+    '''
+        个人消息（键集分页）
+
+        参数:
+            before: 上一页返回的 next，为空表示第一页
+            limit: 每页条数，默认 20，最多 100
+    '''
+    user = _current_user(request)
+    if not user:
+        return JsonResponse({"status": False, "msg": "未登录"})
+    try:
+        before = int(request.GET.get('before') or 0)
+        limit = int(request.GET.get('limit') or inbox.PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"status": False, "msg": "参数不合法"})
+    items, next_cursor = inbox.page(user, before=before, limit=limit)
+    return JsonResponse({
+        "status": True,
+        "unread": inbox.unread_count(user.id),
+        "notifications": [inbox.as_dict(n) for n in items],
+        "next": next_cursor or "",
+    })
+
+
+def inbox_unread(request):
+    '''未读消息数'''
+    info = request.session.get("info", "")
+    if not info:
+        return JsonResponse({"status": False, "msg": "未登录"})
+    return JsonResponse({"status": True, "unread": inbox.unread_count(info['id'])})
+
+
+@csrf_exempt
+def inbox_read(request):
+    '''
+        标记已读
+
+        参数:
+            ids: 逗号分隔的消息ID，为空表示全部
+    '''
+    user = _current_user(request)
+    if not user:
+        return JsonResponse({"status": False, "msg": "未登录"})
+    ids = request.POST.get('ids', '')
+    try:
+        ids = [int(i) for i in ids.split(',') if i] if ids else None
+    except ValueError:
+        return JsonResponse({"status": False, "msg": "参数不合法"})
+    count = inbox.mark_read(user, ids)
+    return JsonResponse({"status": True, "count": count, "unread": inbox.unread_count(user.id)})
@@ -0,0 +1,15 @@
+from django.http import JsonResponse
+
+from baweb import models
+from ..utils import jobs
+
+
+def job_progress(request, id):
+    '''
+        后台任务进度（只有提交者可以查看）
+    '''
+    info = request.session.get("info", "")
+    job = models.Job.objects.filter(id=id, owner_id=info['id']).first()
+    if job is None:
+        return JsonResponse({"status": False, "msg": "任务不存在"})
+    return JsonResponse({"status": True, "job": jobs.as_dict(job)})
@@ -1,6 +1,7 @@
 from django.shortcuts import render, get_object_or_404
-from baweb.models import Course, Post, StudentCourse  # 导入模型
+from baweb.models import Course, Post, StudentCourse, User  # 导入模型
 from django.db.models import Q
+from baweb.utils import readstate
 
 def post_list(request, course_id):
     # 获取当前课程
@@ -13,6 +14,13 @@ def post_list(request, course_id):
         user_type = request.session.get('user_type')
         is_teacher = (user_type == 2)
     
+    # 进入课程论坛即视为已读到最新帖子
+    info = request.session.get('info', {})
+    if info.get('id'):
+        viewer = User.objects.filter(id=info['id']).first()
+        if viewer:
+            readstate.mark_course_seen(viewer, course)
+    
     # 基础查询：获取该课程的所有帖子
     posts_query = Post.objects.filter(course=course).select_related('author', 'category')
     
@@ -48,7 +56,6 @@ def post_list(request, course_id):
     current_user = None
     user_rank = 10
     if is_login:
-        from baweb.models import User
         user_id = request.session.get('user_id')
         try:
             current_user = User.objects.get(id=user_id)
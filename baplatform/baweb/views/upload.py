@@ -0,0 +1,101 @@
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from baweb import models
+from ..utils import uploads
+
+
+def _own_upload(request, key):
+    info = request.session.get("info", "")
+    return models.Upload.objects.filter(id=key, owner_id=info['id']).first()
+
+
+@csrf_exempt
+def upload_create(request):
+    '''
+        新建分片上传
+
+        参数:
+            target: coursefile（课件，id 为课程ID）/ assignmentfile（任务文档）/ submit（任务提交，id 为任务ID）
+            id: 课程或任务ID
+            file_name: 文件名
+            size: 文件大小（字节）
+            checksum: 可选，"算法:摘要"，算法为 crc32 / md5 / sha1 / sha256
+            title: 可选，课件名 / 文档名，缺省为文件名
+    '''
+    info = request.session.get("info", "")
+    user = models.User.objects.filter(id=info['id']).first()
+    try:
+        target_id = int(request.POST.get('id', ''))
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({"status": False, "msg": "参数不合法"})
+    try:
+        upload = uploads.create(user, request.POST.get('target', ''), target_id, request.POST.get('file_name', ''),
+                                size, request.POST.get('checksum', ''), request.POST.get('title', ''))
+    except uploads.UploadError as e:
+        return JsonResponse({"status": False, "msg": str(e)})
+    return JsonResponse({"status": True, "upload": uploads.as_dict(upload)})
+
+
+def upload_status(request, key):
+    '''上传进度（断点续传时从返回的 offset 继续）'''
+    upload = _own_upload(request, key)
+    if upload is None:
+        return JsonResponse({"status": False, "msg": "上传不存在"})
+    return JsonResponse({"status": True, "upload": uploads.as_dict(upload)})
+
+
+@csrf_exempt
+def upload_append(request, key):
+    '''
+        追加分片：请求体为分片的原始字节（application/offset+octet-stream）
+
+        请求头:
+            Upload-Offset: 分片在文件中的起始位置，必须等于当前 offset
+    '''
+    upload = _own_upload(request, key)
+    if upload is None:
+        return JsonResponse({"status": False, "msg": "上传不存在"})
+    try:
+        offset = int(request.META.get('HTTP_UPLOAD_OFFSET', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return JsonResponse({"status": False, "msg": "缺少 Upload-Offset", "offset": upload.offset})
+    try:
+        offset = uploads.append(upload, offset, request, length)
+    except uploads.UploadError as e:
+        return JsonResponse({"status": False, "msg": str(e), "offset": upload.offset})
+    return JsonResponse({"status": True, "offset": offset})
+
+
+@csrf_exempt
+def upload_finalize(request, key):
+    '''
+        完成上传：校验后生成课件 / 任务文档 / 任务提交
+
+        参数:
+            checksum: "算法:摘要"，新建时已给出的可以省略
+    '''
+    upload = _own_upload(request, key)
+    if upload is None:
+        return JsonResponse({"status": False, "msg": "上传不存在"})
+    try:
+        object_id = uploads.finalize(upload, request.POST.get('checksum', ''))
+    except uploads.UploadError as e:
+        upload.refresh_from_db()
+        return JsonResponse({"status": False, "msg": str(e), "offset": upload.offset})
+    return JsonResponse({"status": True, "id": object_id})
+
+
+@csrf_exempt
+def upload_cancel(request, key):
+    '''放弃上传'''
+    upload = _own_upload(request, key)
+    if upload is None:
+        return JsonResponse({"status": False, "msg": "上传不存在"})
+    try:
+        uploads.cancel(upload)
+    except uploads.UploadError as e:
+        return JsonResponse({"status": False, "msg": str(e)})
+    return JsonResponse({"status": True})
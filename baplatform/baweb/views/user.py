@@ -10,6 +10,7 @@ from ..forms.userforms import UserChangePasswordForm, UserModelForm, UserLoginFo
 from ..forms.studentforms import  StudentPicForm, StudentUpdateForm
 from ..forms.teacherforms import  TeacherPicForm, TeacherUpdateForm
 from ..utils.check_code import check_code
+from ..utils import dashboard, inbox, readstate, receipts, schedule
 from io import BytesIO
 
 # For user to sign up
@@ -123,11 +124,35 @@ def user_home(request):
         "username": username, 
         "id": id,
         "changepwd_form":changepwd_form,
-        "is_login": is_login
+        "is_login": is_login,
+        "is_student": is_login and models.User.objects.filter(id=id, type=1).exists(),
     }
     return render(request, "home.html", content)
 
 
+INBOX_PREVIEW = 5
+
+
+def user_dashboard(request):
+    '''
+        学生首页看板 JSON（一次请求返回首页全部内容，见 baweb/utils/dashboard.py）
+
+        Returns:
+            JsonResponse: inbox（最近消息和未读数）、courses、deadlines、announcements、grades、posts
+    '''
+    info = request.session.get("info", "")
+    user = models.User.objects.filter(id=info['id'], type=1).first() if info else None
+    if not user:
+        return JsonResponse({"status": False, "msg": "仅学生可用"})
+    # 个人消息不进看板缓存，已读状态需要实时
+    notifications, _ = inbox.page(user, limit=INBOX_PREVIEW)
+    return JsonResponse({
+        "status": True,
+        "inbox": {"unread": inbox.unread_count(user.id), "items": [inbox.as_dict(n) for n in notifications]},
+        **dashboard.student_dashboard(user),
+    })
+
+
 def user_info(request, pk):
     user = models.User.objects.filter(id=pk).first()
     if user.type == 1:
@@ -254,15 +279,17 @@ def user_announce(request):
     if user.type == 2:
         is_teacher = 1
         teacher = models.TeacherInfo.objects.filter(user=user).first()
-        announce_list = models.Announce.objects.filter(teacher=teacher).all()
+        announce_list = list(models.Announce.objects.filter(teacher=teacher, course__isDeleted=False).select_related('course'))
+        read_counts = receipts.read_counts(announce_list)
+        for announce in announce_list:
+            announce.read_count, announce.student_count = read_counts[announce.id]
     elif user.type == 1:
-        student = models.StudentInfo.objects.filter(user=user).first()
-        studentcourse_list = models.StudentCourse.objects.filter(student=student).all()
-        announce_list = []
-        for studentcourse in studentcourse_list:
-            announces = models.Announce.objects.filter(course=studentcourse.course).all()
-            for announce in announces:
-                announce_list.append(announce)
+        course_ids = readstate.user_course_ids(user)
+        announce_list = models.Announce.objects.filter(course_id__in=course_ids) \
+            .select_related('course', 'teacher').order_by('-created_at')
+        # 水位之后的通知都已看到：已读位图、课程通知消息和水位一起更新
+        inbox.mark_announces_read(user, readstate.unread_announces(course_ids, readstate.states_for(user, course_ids))
+                                  .only('id', 'course_id'))
         is_teacher = 0 
     content = { 
         "username": username, 
@@ -288,9 +315,10 @@ def user_course(request):
         is_teacher = 0
         course_list = []
         student = models.StudentInfo.objects.filter(user=user).first()
-        studentcourse = models.StudentCourse.objects.filter(student=student).all()
+        studentcourse = models.StudentCourse.objects.filter(student=student, course__isDeleted=False).all()
         for obj in studentcourse:
             course_list.append(obj.course)
+    course_list = readstate.annotate_unread(user, course_list)
     course_form = CourseForm
     content = { 
         "username": username, 
@@ -308,10 +336,13 @@ def user_calendar(request):
     username = info['name']
     id = info['id']
     changepwd_form = UserChangePasswordForm
+    user = models.User.objects.filter(id=id).first()
+    ics_url = request.build_absolute_uri('/calendar/ics/{}/'.format(schedule.ics_token(user)))
     content = { 
         "username": username, 
         "id": id,
-        "changepwd_form":changepwd_form
+        "changepwd_form":changepwd_form,
+        "ics_url": ics_url,
     }
     return render(request, "calendar.html", content)
 